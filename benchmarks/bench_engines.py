@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Every search engine checked against the reference, and timed.
+
+    python3 benchmarks/bench_engines.py [--path DIR] [--files N] [--query MODE:TEXT ...] [--engine NAME ...]
+
+Without --path a synthetic tree is searched. Each query runs on the
+reference (odfinder.reference) and then on every engine; documents where
+an engine disagrees are listed, and the exit status is 1 if any did. The
+time is for the whole tree, setup included: building the shard and
+starting the workers count against those engines.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_tree  # noqa: E402
+from odfinder.query import MODES, Query  # noqa: E402
+from odfinder.reference import ENGINES, compare, documents, reference_result  # noqa: E402
+
+QUERIES = ('or:migración', 'and:informe auditoría', 'phrase:servidor archivo', 'or:inexistente')
+
+
+def parse_query(text):
+    mode, _, content = text.partition(':')
+    if mode not in MODES:
+        raise argparse.ArgumentTypeError(f'unknown mode {mode!r}, expected MODE:TEXT')
+    return mode, content
+
+
+def run(root, queries, engines):
+    timings = dict.fromkeys(['reference', *engines], 0.0)
+    mismatches = []
+    for mode, content in queries:
+        for fold in (False, True):
+            query = Query(mode, content, fold)
+            started = time.perf_counter()
+            expected = {path: reference_result(path, mode, content, fold) for path in documents(root)}
+            timings['reference'] += time.perf_counter() - started
+
+            for name in engines:
+                started = time.perf_counter()
+                found = compare(root, query, [name], expected)
+                timings[name] += time.perf_counter() - started
+                mismatches.extend((mode, content, fold, mismatch) for mismatch in found)
+
+    return timings, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', help='search this tree instead of a synthetic one')
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--words', type=int, default=2000)
+    parser.add_argument('--query', action='append', type=parse_query, metavar='MODE:TEXT')
+    parser.add_argument('--engine', action='append', choices=sorted(ENGINES))
+    args = parser.parse_args()
+
+    queries = args.query or [parse_query(query) for query in QUERIES]
+    engines = args.engine or list(ENGINES)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.path or tmp
+        if args.path is None:
+            make_tree(tmp, files=args.files, words=args.words)
+        print(f'{sum(1 for _ in documents(root))} documents, {len(queries)} queries with and without accents')
+        timings, mismatches = run(root, queries, engines)
+
+    for name, seconds in timings.items():
+        speedup = timings['reference'] / seconds if seconds else 0
+        print(f'{name:>10}: {seconds:8.3f} s  {speedup:5.1f}x the reference')
+
+    for mode, content, fold, mismatch in mismatches:
+        print(
+            f'MISMATCH {mismatch.engine} {mode}:{content!r} fold={fold} {mismatch.path}: '
+            f'expected {mismatch.expected}, found {mismatch.found}'
+        )
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Cost of accent insensitive matching against the str.lower() and match it replaced.
+
+    python3 benchmarks/bench_normalize.py [--files N] [--words N]
+
+Documents are extracted once. The baseline then decodes every document,
+lowercases it with str.lower() and matches it, as each search used to.
+--ignore-accents is timed twice: folding every document and matching it,
+as a search without the text cache does, and matching text folded before.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import make_tree  # noqa: E402
+from odfinder.documents import extract_text, fold_document  # noqa: E402
+from odfinder.query import Query  # noqa: E402
+from odfinder.utils import remove_xml_markup  # noqa: E402
+
+QUERIES = (('or', 'migración'), ('and', 'informe auditoría'), ('phrase', 'servidor archivo'), ('or', 'inexistente'))
+
+
+def best(rounds, function):
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def lowered(document):
+    # the text every search used to match
+    text = ' '.join((document.content.decode(), remove_xml_markup(document.meta_xml).decode()))
+    return text.lower()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--words', type=int, default=5000)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_tree(tmp, files=args.files, words=args.words)
+        extract = best(args.rounds, lambda: [extract_text(path) for path in paths])
+        documents = [extract_text(path) for path in paths]
+
+    fold = best(args.rounds, lambda: [fold_document(document) for document in documents])
+    folded = [fold_document(document) for document in documents]
+    size = sum(len(document.content) for document in documents) / (1024 * 1024)
+    print(f'{args.files} documents, {size:.1f} MiB of text')
+    print(f'{"extraction":>28}: {extract:.3f} s (once per document)')
+    print(f'{"folding":>28}: {fold:.3f} s (once per document)')
+
+    for mode, text in QUERIES:
+        lower = Query(mode, text)
+        accents = Query(mode, text.replace('í', 'i').replace('ó', 'o'), fold=True)
+        baseline = best(args.rounds, lambda: sum(lower.match(lowered(document)) for document in documents))
+        uncached = best(
+            args.rounds, lambda: sum(accents.match_document(fold_document(document)) for document in documents)
+        )
+        cached = best(args.rounds, lambda: sum(accents.match_document(document) for document in folded))
+        print(
+            f'{mode + " " + repr(text):>28}: str.lower() {baseline:.3f} s, '
+            f'fold and match {uncached:.3f} s, folded {cached:.3f} s per search'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Cold cache scan with and without --readahead.
+
+    python3 benchmarks/bench_readahead.py [--path DIR] [--files N]
+
+On SSDs and tmpfs the difference is small; run it against a directory on
+the spinning or network storage you want to measure.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import evict, make_tree  # noqa: E402
+from odfinder.odfinder_app import ODFinderApp  # noqa: E402
+
+
+def scan(directory, readahead):
+    app = ODFinderApp({'content': ['presupuesto'], 'mode': 'or', 'path': directory, 'readahead': readahead})
+    app.add_line_to_results = lambda line: None
+    started = time.perf_counter()
+    app.recursive_search(None, None, directory)
+    return time.perf_counter() - started, app.ooo_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--path', help='directory for the corpus (temporary by default)')
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--readahead', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = args.path or tmp
+        paths = make_tree(directory, files=args.files)
+
+        for label, readahead in (('no readahead', 0), (f'readahead {args.readahead}', args.readahead)):
+            timings = []
+            for _ in range(args.rounds):
+                evict(paths)
+                elapsed, count = scan(directory, readahead)
+                timings.append(elapsed)
+            print(f'{label:>16}: best {min(timings):.3f} s, {count} documents')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Memory per tracked file: plain paths and dicts against a RecordStore.
+
+    python3 benchmarks/bench_records.py [--files N] [--per-dir N]
+
+Paths are synthetic, shaped like an archive tree; nothing is written to
+disk. Memory is what tracemalloc sees allocated while the records are kept.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from odfinder.records import MATCHED, RecordStore  # noqa: E402
+from odfinder.utils import get_filename_ext  # noqa: E402
+
+EXTENSIONS = ('odt', 'ods', 'odp', 'docx', 'xlsx', 'pptx')
+
+
+def make_paths(files, per_dir, seed=0):
+    rng = random.Random(seed)
+    for i in range(files):
+        directory = f'/srv/archive/{i // (per_dir * 100):03d}/proyecto-{i // per_dir:06d}'
+        yield f'{directory}/documento-{i:08d}-{rng.randrange(10**6)}.{rng.choice(EXTENSIONS)}'
+
+
+def keep_paths(paths):
+    return list(paths)
+
+
+def keep_dicts(paths):
+    return [
+        {'path': path, 'size': 123456, 'mtime_ns': 1700000000000000000, 'format': get_filename_ext(path), 'status': 0}
+        for path in paths
+    ]
+
+
+def keep_store(paths):
+    store = RecordStore()
+    for path in paths:
+        store.add(path, 123456, 1700000000000000000, MATCHED)
+    return store
+
+
+def measure(files, per_dir, keep):
+    tracemalloc.start()
+    records = keep(make_paths(files, per_dir))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--files', type=int, default=200000)
+    parser.add_argument('--per-dir', type=int, default=50)
+    args = parser.parse_args()
+
+    average = sum(len(path) for path in make_paths(args.files, args.per_dir)) / args.files
+    print(f'{args.files} files, {args.per_dir} per directory, paths of {average:.0f} characters on average')
+    for name, keep in (('list of str paths', keep_paths), ('list of dicts', keep_dicts), ('RecordStore', keep_store)):
+        size = measure(args.files, args.per_dir, keep)
+        print(f'{name:>20}: {size / (1024 * 1024):7.1f} MiB, {size / args.files:6.1f} bytes per file')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""Synthetic document trees shared by the benchmark scripts."""
+
+import os
+import random
+import zipfile
+
+WORDS = (
+    'informe',
+    'migración',
+    'auditoría',
+    'rendimiento',
+    'proyecto',
+    'factura',
+    'presupuesto',
+    'servidor',
+    'archivo',
+    'documento',
+    'reunión',
+    'acta',
+    'contrato',
+    'cliente',
+    'entrega',
+    'revisión',
+    'anexo',
+    'memoria',
+)
+
+CONTENT_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+    ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+    '<office:body><office:text>{paragraphs}</office:text></office:body></office:document-content>'
+)
+
+META_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-meta xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:meta="urn:oasis:names:tc:opendocument:xmlns:meta:1.0">'
+    '<office:meta><dc:title>{title}</dc:title><dc:creator>{author}</dc:creator>'
+    '<dc:date>{date}</dc:date></office:meta></office:document-meta>'
+)
+
+
+def random_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def make_odt(path, rng, words=2000):
+    paragraphs = ''.join(f'<text:p>{random_text(rng, 50)}</text:p>' for _ in range(max(1, words // 50)))
+    meta = META_XML.format(
+        title=random_text(rng, 3),
+        author=rng.choice(('García', 'López', 'Martínez')),
+        date=f'20{rng.randint(10, 26):02d}-{rng.randint(1, 12):02d}-01T10:00:00',
+    )
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr('mimetype', 'application/vnd.oasis.opendocument.text')
+        zf.writestr('content.xml', CONTENT_XML.format(paragraphs=paragraphs))
+        zf.writestr('meta.xml', meta)
+
+
+def make_tree(directory, files=500, words=2000, per_dir=50, seed=0):
+    """Create (or reuse) a tree of ODT documents and return its file list."""
+    rng = random.Random(seed)
+    paths = []
+    for i in range(files):
+        subdir = os.path.join(directory, f'd{i // per_dir:04d}')
+        os.makedirs(subdir, exist_ok=True)
+        path = os.path.join(subdir, f'doc{i:06d}.odt')
+        if not os.path.exists(path):
+            make_odt(path, rng, words)
+        paths.append(path)
+
+    return paths
+
+
+def evict(paths):
+    """Drop the files from the page cache, approximating a cold cache."""
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
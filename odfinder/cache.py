@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import gettext
+import os
+import threading
+import zlib
+
+from .documents import Document, extract_text, fold_document
+from .utils import SUPPORTED_EXTENSIONS, get_filename_ext, split_nested
+
+_ = gettext.gettext
+
+DEFAULT_CACHE_SIZE = 64  # MiB
+
+# Fast compression: extracted text shrinks several times even at level 1
+_COMPRESS_LEVEL = 1
+
+# under memory pressure the cache is halved down to 1/PRESSURE_FLOOR of its size
+PRESSURE_FLOOR = 8
+
+
+class TextCache:
+    """
+    Extracted document text kept in memory between searches.
+
+    Entries are validated by size and mtime, stored as zlib compressed bytes
+    and evicted least recently used first once max_bytes is exceeded.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.configured_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, path, st):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None or entry[:2] != (st.st_size, st.st_mtime_ns):
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(path)
+            self.hits += 1
+
+        # raw member bytes may hold anything, so texts are split by length
+        data = zlib.decompress(entry[3])
+        content_end, meta_end = entry[2]
+        return Document(data[:content_end], data[content_end:meta_end], data[meta_end:] if entry[4] else None)
+
+    def put(self, path, st, document):
+        folded = document.folded or b''
+        blob = zlib.compress(document.content + document.meta_xml + folded, _COMPRESS_LEVEL)
+        if len(blob) > self.max_bytes:
+            return
+
+        lengths = (len(document.content), len(document.content) + len(document.meta_xml))
+
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.bytes -= len(old[3])
+
+            self._entries[path] = (st.st_size, st.st_mtime_ns, lengths, blob, document.folded is not None)
+            self.bytes += len(blob)
+            self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes:
+            _, (_, _, _, evicted, _) = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def shrink(self, max_bytes):
+        """Lower the budget, evicting what no longer fits."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def relieve(self, pressure):
+        """
+        Halve the budget while memory is under pressure, down to a floor,
+        and restore the configured one once the pressure has ended.
+        """
+        if pressure:
+            self.shrink(max(self.max_bytes // 2, self.configured_bytes // PRESSURE_FLOOR))
+        elif self.max_bytes != self.configured_bytes:
+            with self._lock:
+                self.max_bytes = self.configured_bytes
+
+    def summary(self):
+        return [
+            _('Cache: %d documents, %.1f MiB') % (len(self), self.bytes / (1024 * 1024)),
+            _('Cache hits: %d, misses: %d, evictions: %d') % (self.hits, self.misses, self.evictions),
+        ]
+
+
+def extract_cached(cache, filename, query=None, budget=None):
+    """extract_text() going through cache when there is one."""
+    if cache is None or get_filename_ext(filename) not in SUPPORTED_EXTENSIONS:
+        return extract_text(filename, query, budget)
+
+    # a document inside an archive changes with the archive
+    st = os.stat(split_nested(filename)[0])
+    document = cache.get(filename, st)
+    if document is None:
+        document = extract_text(filename, query, budget)
+        # documents whose body was skipped are incomplete
+        if document is not None and document.content is not None:
+            cache.put(filename, st, document)
+    elif query is not None and query.fold and document.folded is None:
+        # folded once, then kept next to the text
+        document = fold_document(document)
+        cache.put(filename, st, document)
+
+    return document
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import contextlib
+import gettext
+import io
+import struct
+import time
+import zipfile
+import zlib
+
+from .normalize import fold
+from .utils import (
+    ARCHIVE_EXTENSIONS,
+    NESTED_SEP,
+    ODF_EXTENSIONS,
+    OOXML_EXTENSIONS,
+    PPTX_EXTENSIONS,
+    SUPPORTED_EXTENSIONS,
+    get_filename_ext,
+    remove_xml_markup,
+    split_nested,
+)
+
+_ = gettext.gettext
+
+CHUNK_SIZE = 1024 * 1024
+
+# documents inside others: embedded in OOXML documents or in .zip archives
+DEFAULT_DEPTH = 3
+DEFAULT_NESTED_SIZE = 64 * 1024 * 1024  # bytes
+DEFAULT_NESTED = 1000  # documents in one archive
+
+# folded is the accent insensitive searchable text, when it was asked for
+Document = collections.namedtuple('Document', ('content', 'meta_xml', 'folded'), defaults=(None,))
+
+
+class Cancelled(Exception):
+    pass
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, category, limit):
+        super().__init__(category, limit)
+        self.category = category  # 'size', 'members', 'time' or 'nested'
+        self.limit = limit
+
+
+class Budget:
+    """Per-document limits, checked while the members are being inflated."""
+
+    def __init__(
+        self,
+        max_size=None,
+        max_members=None,
+        max_time=None,
+        cancelled=None,
+        max_depth=DEFAULT_DEPTH,
+        max_nested_size=DEFAULT_NESTED_SIZE,
+        max_nested=DEFAULT_NESTED,
+    ):
+        self.max_size = max_size
+        self.max_members = max_members
+        self.max_time = max_time
+        self.cancelled = cancelled
+        # how deep nested documents are followed (0: never), how large
+        # each may be and how many one archive may hold
+        self.max_depth = max_depth
+        self.max_nested_size = max_nested_size
+        self.max_nested = max_nested
+
+    def meter(self, zf):
+        return _Meter(self, zf)
+
+
+class _Meter:
+    def __init__(self, budget, zf):
+        self.budget = budget
+        self.inflated = 0
+        self.started = time.thread_time()
+        self.check()
+
+        if budget.max_members is not None and len(zf.infolist()) > budget.max_members:
+            raise BudgetExceeded('members', budget.max_members)
+
+    def declare(self, infos):
+        # declared sizes can lie, consume() still counts the real ones
+        if self.budget.max_size is not None and sum(info.file_size for info in infos) > self.budget.max_size:
+            raise BudgetExceeded('size', self.budget.max_size)
+
+    def consume(self, size):
+        self.inflated += size
+        if self.budget.max_size is not None and self.inflated > self.budget.max_size:
+            raise BudgetExceeded('size', self.budget.max_size)
+
+        self.check()
+
+    def check(self):
+        if self.budget.cancelled is not None and self.budget.cancelled():
+            raise Cancelled()
+
+        if self.budget.max_time is not None and time.thread_time() - self.started > self.budget.max_time:
+            raise BudgetExceeded('time', self.budget.max_time)
+
+
+# limits of nested documents when no budget is given
+DEFAULT_BUDGET = Budget()
+
+
+# what zipfile raises for corrupt data, offsets out of the file and unknown
+# compression methods or versions, besides BadZipfile
+_BROKEN = (zlib.error, EOFError, NotImplementedError, ValueError)
+
+
+def _open_zip(fp):
+    try:
+        return zipfile.ZipFile(fp)
+    except _BROKEN as err:
+        raise zipfile.BadZipfile(str(err)) from err
+
+
+def read_member(zf, info, meter=None):
+    try:
+        if meter is None:
+            return zf.read(info)
+
+        chunks = []
+        with zf.open(info) as member:
+            while chunk := member.read(CHUNK_SIZE):
+                meter.consume(len(chunk))
+                chunks.append(chunk)
+    except _BROKEN as err:
+        raise zipfile.BadZipfile(_('Member %s cannot be read: %s') % (info.filename, str(err))) from err
+
+    return b''.join(chunks)
+
+
+def is_body_member(item, ext):
+    if ext in ODF_EXTENSIONS:
+        return item.endswith('content.xml') or item.endswith('document.xml')
+
+    if ext in PPTX_EXTENSIONS:
+        return len(item) >= 12 and item[4:12] == 'slides/s'
+
+    return item.endswith('document.xml') or item.endswith('sharedStrings.xml')
+
+
+def is_embedding(item, ext):
+    # embedded ODF objects are directories ('Object 1/content.xml'), read
+    # as body members; OOXML embeds whole documents
+    return (
+        ext in OOXML_EXTENSIONS + PPTX_EXTENSIONS
+        and '/embeddings/' in item
+        and get_filename_ext(item) in SUPPORTED_EXTENSIONS
+    )
+
+
+def meta_member(ext):
+    return 'meta.xml' if ext in ODF_EXTENSIONS else 'docProps/core.xml'
+
+
+class _Window(io.RawIOBase):
+    """The bytes of a stored member, read in place from the file of its archive."""
+
+    def __init__(self, fp, offset, size):
+        super().__init__()
+        self._fp = fp
+        self._offset = offset
+        self._size = size
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        return self._position
+
+    def readinto(self, buffer):
+        self._fp.seek(self._offset + self._position)
+        data = self._fp.read(max(0, min(len(buffer), self._size - self._position)))
+        buffer[: len(data)] = data
+        self._position += len(data)
+        return len(data)
+
+
+def _data_offset(zf, info):
+    zf.fp.seek(info.header_offset)
+    header = zf.fp.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipfile(_('Bad local header of member %s') % info.filename)
+
+    # the local header has its own name and extra field lengths
+    fields = struct.unpack(zipfile.structFileHeader, header)
+    return info.header_offset + zipfile.sizeFileHeader + fields[10] + fields[11]
+
+
+def open_nested(zf, info, meter=None):
+    """
+    ZipFile of the archive in member info of zf, without temporary files:
+    a stored member is read in place, a compressed one inflated once into
+    memory.
+    """
+    if info.flag_bits & 0x1:
+        raise zipfile.BadZipfile(_('Member %s is encrypted') % info.filename)
+
+    if info.compress_type == zipfile.ZIP_STORED:
+        if meter is not None:
+            meter.consume(info.file_size)
+        return _open_zip(_Window(zf.fp, _data_offset(zf, info), info.file_size))
+
+    return _open_zip(io.BytesIO(read_member(zf, info, meter)))
+
+
+def read_body(zf, ext, meter=None, depth=0):
+    members = [info for info in zf.infolist() if is_body_member(info.filename, ext)]
+    if meter is not None:
+        meter.declare(members)
+
+    text = remove_xml_markup(b''.join(read_member(zf, info, meter) for info in members))
+
+    budget = DEFAULT_BUDGET if meter is None else meter.budget
+    if depth < budget.max_depth:
+        for info in zf.infolist():
+            if not is_embedding(info.filename, ext) or info.file_size > budget.max_nested_size:
+                continue
+
+            # a broken embedding leaves the rest of the document searchable
+            try:
+                with open_nested(zf, info, meter) as nested:
+                    text += b' ' + read_body(nested, get_filename_ext(info.filename), meter, depth + 1)
+            except (KeyError, zipfile.BadZipfile):
+                continue
+
+    return text
+
+
+def read_document(zf, ext, query=None, meter=None, depth=0):
+    """Document of the open zf; see extract_text()."""
+    meta_xml = read_member(zf, zf.getinfo(meta_member(ext)), meter)
+    if query is not None and (not query.needs_body or not query.accepts_meta(meta_xml)):
+        return Document(None, meta_xml)
+
+    document = Document(read_body(zf, ext, meter, depth), meta_xml)
+    if query is not None and query.fold:
+        document = fold_document(document)
+    return document
+
+
+def extract_text(filename, query=None, budget=None):
+    """
+    Return the Document of a supported file, None for anything else.
+    Texts are UTF-8 bytes, not decoded: malformed text can still be
+    searched. The folded text is added when query ignores accents.
+    filename may name a document inside archives (see iter_archive()).
+
+    The metadata member is read first: when query rejects it, or needs
+    nothing else, the body is not inflated and content is None.
+    Raises KeyError, zipfile.BadZipfile and IOError for broken documents,
+    BudgetExceeded and Cancelled when budget says so.
+    """
+    ext = get_filename_ext(filename)
+    if ext not in SUPPORTED_EXTENSIONS:
+        return None
+
+    outer, members = split_nested(filename)
+    # One descriptor serves the signature check, the central directory
+    # and the members, saving a reopen and its seeks on slow storage
+    with open(outer, 'rb') as fp:
+        if not zipfile.is_zipfile(fp):
+            return None
+
+        with contextlib.ExitStack() as stack:
+            zf = stack.enter_context(_open_zip(fp))
+            for member in members:
+                zf = stack.enter_context(open_nested(zf, zf.getinfo(member)))
+
+            meter = None if budget is None else budget.meter(zf)
+            return read_document(zf, ext, query, meter, len(members))
+
+
+def _walk_archive(zf, path, query, budget, depth):
+    for info in zf.infolist():
+        ext = get_filename_ext(info.filename)
+        archive = ext in ARCHIVE_EXTENSIONS
+        if info.is_dir() or not archive and ext not in SUPPORTED_EXTENSIONS or archive and depth >= budget.max_depth:
+            continue
+
+        member = path + NESTED_SEP + info.filename
+        try:
+            if info.file_size > budget.max_nested_size:
+                raise BudgetExceeded('size', budget.max_nested_size)
+
+            with open_nested(zf, info) as nested:
+                if archive:
+                    yield from _walk_archive(nested, member, query, budget, depth + 1)
+                    continue
+
+                # each document gets the whole per-document budget
+                document = read_document(nested, ext, query, budget.meter(nested), depth)
+        except (KeyError, zipfile.BadZipfile, IOError, BudgetExceeded) as err:
+            yield member, None, err
+            continue
+
+        yield member, document, None
+
+
+def iter_archive(filename, query=None, budget=None):
+    """
+    Yield (path, document, error) for the supported documents inside the
+    .zip archive filename, and inside the archives in it up to
+    budget.max_depth levels. Paths name the members after their archive,
+    outer.zip!/dir/inner.odt; a member that cannot be read comes with its
+    error instead of a document. Past budget.max_nested documents, the
+    archive itself is yielded with BudgetExceeded and the walk stops.
+
+    Nothing is written to disk: see open_nested().
+    """
+    budget = DEFAULT_BUDGET if budget is None else budget
+    if budget.max_depth < 1:
+        return
+
+    with open(filename, 'rb') as fp:
+        if not zipfile.is_zipfile(fp):
+            return
+
+        with _open_zip(fp) as zf:
+            members = _walk_archive(zf, filename, query, budget, 1)
+            for count, member in enumerate(members, 1):
+                if count > budget.max_nested:
+                    members.close()
+                    yield filename, None, BudgetExceeded('nested', budget.max_nested)
+                    return
+
+                yield member
+
+
+def fold_document(document):
+    return document._replace(folded=fold(searchable_text(document)))
+
+
+def searchable_text(document, folded=False):
+    """
+    Text matched by queries as UTF-8 bytes: ASCII letters lowercased, or
+    fully folded (see normalize) when folded is True.
+    """
+    if folded:
+        return document.folded if document.folded is not None else fold(searchable_text(document))
+
+    return b' '.join(((document.content or b'').lower(), remove_xml_markup(document.meta_xml).lower()))
+
+
+def describe_error(filename, err):
+    """Warning shown for a document that could not be searched."""
+    if isinstance(err, KeyError):
+        return _("Warning: %s not found in '%s'") % (err, filename)
+    if isinstance(err, zipfile.BadZipfile):
+        return _('Warning: Supposed ZIP file %s could not be opened: %s') % (filename, str(err))
+    if isinstance(err, BudgetExceeded):
+        if err.category == 'size':
+            return _("Warning: '%s' skipped, inflated size over %d MiB") % (filename, err.limit // (1024 * 1024))
+        if err.category == 'members':
+            return _("Warning: '%s' skipped, more than %d members") % (filename, err.limit)
+        if err.category == 'nested':
+            return _("Warning: '%s' searched up to its first %d documents") % (filename, err.limit)
+        return _("Warning: '%s' skipped, extraction took over %g seconds") % (filename, err.limit)
+
+    return _('Warning: File %s could not be opened: %s') % (filename, str(err))
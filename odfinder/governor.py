@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Resource caps for scans running next to interactive work.
+
+CPU time and bytes read are paced with token buckets: every document is
+charged for what it used and its worker sleeps off any debt, so however
+many workers share a Governor they stay inside the budget together.
+"""
+
+import ctypes
+import gettext
+import os
+import platform
+import resource
+import threading
+import time
+
+_ = gettext.gettext
+
+# ioprio_set(2) is not wrapped by Python
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_SET = {
+    'x86_64': 251,
+    'i386': 289,
+    'i686': 289,
+    'aarch64': 30,
+    'riscv64': 30,
+    'armv7l': 314,
+    'ppc64le': 273,
+    's390x': 282,
+}
+
+
+class TokenBucket:
+    """
+    Tokens refill at rate per second, up to capacity (one second worth by
+    default). Taking more than there is leaves a debt the taker waits off.
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._stamp = clock()
+        self._lock = threading.Lock()
+
+    def take(self, amount):
+        """Take amount tokens, return the seconds waited for them."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate) - amount
+            self._stamp = now
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait:
+            self._sleep(wait)
+        return wait
+
+
+def current_rss():
+    """Resident set size of this process in bytes (peak size off Linux)."""
+    try:
+        with open('/proc/self/statm') as fp:
+            return int(fp.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def set_idle_priority():
+    """
+    Lowest CPU priority and the idle I/O class for this thread and those it
+    starts later. Returns False when the I/O class could not be set.
+    """
+    os.nice(19 - os.nice(0))
+
+    number = _IOPRIO_SET.get(platform.machine())
+    if number is None:
+        return False
+
+    libc = ctypes.CDLL(None, use_errno=True)
+    return libc.syscall(number, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT) == 0
+
+
+class Governor:
+    def __init__(self, max_cpu=None, max_read_rate=None, max_rss=None, clock=time.monotonic, sleep=time.sleep):
+        """max_cpu in percent of one core, max_read_rate in MB/s, max_rss in MiB."""
+        self.cpu = TokenBucket(max_cpu / 100, clock=clock, sleep=sleep) if max_cpu else None
+        self.reads = TokenBucket(max_read_rate * 1000 * 1000, clock=clock, sleep=sleep) if max_read_rate else None
+        self.max_rss = max_rss * 1024 * 1024 if max_rss else None
+
+        self.waited = 0.0
+        self.bytes_read = 0
+        self.peak_rss = 0
+        self.memory_pressure = 0
+        self._clock = clock
+        self._started = clock()
+        self._cpu_started = time.process_time()
+        self._lock = threading.Lock()
+
+    def _waited(self, seconds):
+        with self._lock:
+            self.waited += seconds
+
+    def before_read(self, size):
+        """Pace reading a document of size bytes."""
+        with self._lock:
+            self.bytes_read += size
+        if self.reads is not None:
+            self._waited(self.reads.take(size))
+
+    def after_document(self, cpu_seconds):
+        """Charge the CPU time one document took."""
+        if self.cpu is not None:
+            self._waited(self.cpu.take(cpu_seconds))
+
+    def memory_exceeded(self):
+        rss = current_rss()
+        self.peak_rss = max(self.peak_rss, rss)
+        if self.max_rss is None or rss <= self.max_rss:
+            return False
+
+        self.memory_pressure += 1
+        return True
+
+    def summary(self):
+        elapsed = max(self._clock() - self._started, 1e-9)
+        cpu = (time.process_time() - self._cpu_started) / elapsed * 100
+        rate = self.bytes_read / elapsed / (1000 * 1000)
+        return [
+            _('CPU: %d%%, read: %.1f MB/s, peak RSS: %d MiB') % (cpu, rate, self.peak_rss // (1024 * 1024)),
+            _('Throttled: %.1f s, memory pressure: %d') % (self.waited, self.memory_pressure),
+        ]
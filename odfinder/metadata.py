@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Document metadata (meta.xml / docProps/core.xml) and field-qualified terms.
+
+A query term such as ``author:garcia``, ``title=informe`` or
+``modified>2025-01-01`` becomes a filter on the metadata member.
+"""
+
+import re
+import xml.etree.ElementTree as ET
+
+TEXT_FIELDS = ('title', 'subject', 'description', 'keywords', 'author')
+DATE_FIELDS = ('created', 'modified')
+
+# ODF and OOXML element local names -> field
+_ELEMENTS = {
+    'title': 'title',
+    'subject': 'subject',
+    'description': 'description',
+    'keyword': 'keywords',
+    'keywords': 'keywords',
+    'initial-creator': 'author',
+    'creator': 'author',
+    'lastModifiedBy': 'author',
+    'creation-date': 'created',
+    'created': 'created',
+    'date': 'modified',
+    'modified': 'modified',
+}
+
+_RE_TERM = re.compile(r'^(?P<field>[a-z]+)(?P<op>:|=|>=|<=|>|<)(?P<value>.+)$')
+_RE_DATE = re.compile(r'^\d{4}(-\d{2}(-\d{2}(T[\d:]+)?)?)?$')
+
+
+def parse_metadata(meta_xml):
+    """Return {field: [values]} from the metadata member, {} if malformed."""
+    try:
+        root = ET.fromstring(meta_xml)
+    except ET.ParseError:
+        return {}
+
+    fields = {}
+    for element in root.iter():
+        field = _ELEMENTS.get(element.tag.rpartition('}')[2])
+        if field is not None and element.text and element.text.strip():
+            fields.setdefault(field, []).append(element.text.strip())
+
+    return fields
+
+
+class MetaFilter:
+    def __init__(self, field, op, value):
+        self.field = field
+        self.op = op
+        self.value = value.lower()
+
+    def __repr__(self):
+        return f'MetaFilter({self.field}{self.op}{self.value})'
+
+    def __eq__(self, other):
+        return isinstance(other, MetaFilter) and (self.field, self.op, self.value) == (
+            other.field,
+            other.op,
+            other.value,
+        )
+
+    def __hash__(self):
+        return hash((self.field, self.op, self.value))
+
+    def _compare(self, actual):
+        if self.field in DATE_FIELDS:
+            # ISO 8601 dates compare as strings once cut to the given precision
+            actual = actual[: len(self.value)]
+            return {
+                ':': actual == self.value,
+                '=': actual == self.value,
+                '>': actual > self.value,
+                '>=': actual >= self.value,
+                '<': actual < self.value,
+                '<=': actual <= self.value,
+            }[self.op]
+
+        actual = actual.lower()
+        return self.value in actual if self.op == ':' else actual == self.value
+
+    def match(self, metadata):
+        return any(self._compare(actual) for actual in metadata.get(self.field, ()))
+
+
+def parse_filter(term):
+    """Return the MetaFilter for a field-qualified term, None for a plain term."""
+    found = _RE_TERM.match(term)
+    if not found:
+        return None
+
+    field, op, value = found.group('field', 'op', 'value')
+    if field in TEXT_FIELDS and op in (':', '='):
+        return MetaFilter(field, op, value)
+    if field in DATE_FIELDS and _RE_DATE.match(value):
+        return MetaFilter(field, op, value)
+
+    return None
+
+
+def split_filters(text):
+    """Split a query into (metadata filters, remaining body text)."""
+    filters = []
+    body = []
+    for term in text.split():
+        meta_filter = parse_filter(term)
+        if meta_filter is None:
+            body.append(term)
+        else:
+            filters.append(meta_filter)
+
+    if not filters:
+        return [], text
+
+    return filters, ' '.join(body)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Accent and case insensitive text: NFKD, combining marks removed, casefold.
+
+Folding works on the UTF-8 bytes documents are matched as. ASCII only
+needs bytes.lower(); every other character is folded on its own, which
+gives the same result as folding the whole text because casefold is
+context free and the only characters NFKD reorders are marks. A document
+holds few distinct ones, so each is replaced everywhere at once.
+
+The accented letters of most Western languages, U+00C0 to U+00FF, share
+the lead byte 0xC3 and fold to one ASCII letter. When those are all a
+document holds besides characters that fold to themselves, one
+bytes.translate() deletes the lead byte and maps the second one; the few
+other characters whose bytes that touches are put back afterwards.
+"""
+
+import functools
+import re
+import unicodedata
+
+_NON_ASCII = re.compile(rb'[\x80-\xff]+')
+_ASCII = bytes(range(0x80))
+_LATIN_LEAD = b'\xc3'
+
+
+def _strip_marks(text):
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+@functools.lru_cache(maxsize=4096)
+def _fold_run(run):
+    # casefold may produce new marks ('İ' -> 'i̇'), strip them again
+    text = _strip_marks(_strip_marks(run.decode('utf-8', 'surrogateescape')).casefold())
+    return text.encode('utf-8', 'surrogateescape')
+
+
+def _fold_match(match):
+    return _fold_run(match.group())
+
+
+def _translate_latin(data, chars, changes):
+    try:
+        data.decode()
+    except UnicodeDecodeError:
+        return None
+
+    table = bytearray(range(256))
+    for char in chars:
+        if '\u00c0' <= char <= '\u00ff':
+            original, folded = changes.get(char, (None, b''))
+            if len(folded) != 1 or not folded.isascii():
+                return None
+            table[original[1]] = folded[0]
+
+    # the other characters as translate() leaves them, which must tell them
+    # apart, and what they fold to
+    fixes = {}
+    for char in chars:
+        if not '\u00c0' <= char <= '\u00ff':
+            original = char.encode()
+            translated = original.translate(table)
+            if translated in fixes:
+                return None
+            fixes[translated] = changes[char][1] if char in changes else original
+
+    data = data.translate(table, _LATIN_LEAD)
+    for translated, folded in fixes.items():
+        if translated != folded:
+            data = data.replace(translated, folded)
+    return data
+
+
+def fold(data):
+    """Fold UTF-8 bytes; invalid sequences are kept as they are."""
+    data = data.lower()
+    if data.isascii():
+        return data
+
+    # without ASCII, invalid bytes may join into a character data does not
+    # hold, which then replaces nothing
+    chars = set(data.translate(None, _ASCII).decode('utf-8', 'surrogateescape'))
+    changes = {}
+    for char in chars:
+        original = char.encode('utf-8', 'surrogateescape')
+        folded = _fold_run(original)
+        if folded != original:
+            changes[char] = (original, folded)
+
+    # invalid bytes could meet once a mark between them is removed, and a
+    # replacement could be replaced again: fold those run by run
+    invalid = any('\udc80' <= char <= '\udcff' for char in chars)
+    if invalid or any(char in changes for _, folded in changes.values() for char in folded.decode()):
+        return _NON_ASCII.sub(_fold_match, data)
+
+    translated = _translate_latin(data, chars, changes)
+    if translated is not None:
+        return translated
+    for original, folded in changes.values():
+        data = data.replace(original, folded)
+    return data
+
+
+def fold_text(text):
+    return fold(text.encode('utf-8', 'surrogateescape')).decode('utf-8', 'surrogateescape')
+
+
+def _original_offset(data, offset, end):
+    position = folded = 0
+    for match in _NON_ASCII.finditer(data):
+        # ASCII maps byte to byte
+        if offset <= folded + match.start() - position:
+            break
+
+        folded += match.start() - position
+        run = len(_fold_run(match.group()))
+        if offset < folded + run or (end and offset == folded + run):
+            return match.end() if end else match.start()
+
+        folded += run
+        position = match.end()
+
+    return position + offset - folded
+
+
+def original_span(data, start, end):
+    """
+    Map the span start:end of fold(data) back to data.
+
+    Spans inside a folded character cover the whole original character.
+    Only called for the few hits that are shown, so nothing is precomputed.
+    """
+    return _original_offset(data, start, False), _original_offset(data, end, True)
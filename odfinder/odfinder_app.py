@@ -16,10 +16,14 @@
 # along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import argparse
+import collections
+import copy
+import json
 import locale
 import os
-import re
 import sys
+import threading
+import time
 import zipfile
 from subprocess import Popen
 
@@ -32,7 +36,42 @@ import gettext  # noqa: E402
 
 from gi.repository import Gdk, Gio, GLib, Gtk  # noqa: E402
 
-from .utils import get_filename_ext, get_ui_resource, remove_xml_markup  # noqa: E402
+from . import server  # noqa: E402
+from .cache import DEFAULT_CACHE_SIZE, TextCache, extract_cached  # noqa: E402
+from .documents import (  # noqa: E402
+    DEFAULT_DEPTH,
+    DEFAULT_NESTED,
+    DEFAULT_NESTED_SIZE,
+    Budget,
+    BudgetExceeded,
+    Cancelled,
+    describe_error,
+    iter_archive,
+)
+from .governor import Governor, set_idle_priority  # noqa: E402
+from .query import compile_query  # noqa: E402
+from .ranking import STABLE_AFTER, Ranker, make_candidate  # noqa: E402
+from .readahead import Prefetcher  # noqa: E402
+from .records import FAILED, MATCHED, SKIPPED, RecordStore  # noqa: E402
+from .scheduler import (  # noqa: E402
+    DEFAULT_PER_MOUNT,
+    DEFAULT_WINDOW,
+    ORDERS,
+    Coverage,
+    iter_files,
+    merge_roots,
+    unique_roots,
+)
+from .shard import DEFAULT_TIMEOUT, Gather  # noqa: E402
+from .snippets import (  # noqa: E402
+    DEFAULT_CONTEXT,
+    DEFAULT_SNIPPETS,
+    make_snippets,
+    snippets_markup,
+    snippets_text,
+)
+from .stats import SearchStats  # noqa: E402
+from .utils import ARCHIVE_EXTENSIONS, get_filename_ext, get_ui_resource, split_nested  # noqa: E402
 
 _ = gettext.gettext
 
@@ -57,6 +96,11 @@ with open(version_file, encoding='utf_8') as f:
     __version__ = f.read().strip()
 
 
+# milliseconds without typing before a live search starts
+LIVE_SEARCH_DELAY = 300
+LIVE_SEARCH_MIN_CHARS = 3
+
+
 def idle_add_decorator(func):
     def callback(*args):
         def wrapper(*wargs):
@@ -79,10 +123,62 @@ class ODFinderApp(Gtk.Application):
         self.ooo_count = 0
         self.match_count = 0
         self.warnings = []
+        self.stats = SearchStats()
 
         self.options = options
         self.console = (self.options['content'] != [])
 
+        # a one-shot console search reads a document twice only to print
+        # snippets of it
+        cache_size = self.options.get('cache_size', DEFAULT_CACHE_SIZE)
+        reuse = not self.console or self.options.get('snippets')
+        self.text_cache = TextCache(cache_size * 1024 * 1024) if cache_size and reuse else None
+
+        # checked while inflating, so Stop and oversized documents never wait
+        # for a whole member to be read
+        self.skipped = collections.Counter()
+        # held for the counters and the ranking when several roots are
+        # searched by a pool of workers
+        self._state_lock = threading.Lock()
+        self.deadline_at = None  # time.monotonic() at which a --deadline search stops
+        max_file_size = self.options.get('max_file_size')
+        self.budget = Budget(
+            max_size=max_file_size * 1024 * 1024 if max_file_size else None,
+            max_members=self.options.get('max_members'),
+            max_time=self.options.get('max_file_time'),
+            cancelled=self.stop_requested,
+            max_depth=self.options.get('max_depth', DEFAULT_DEPTH),
+            max_nested_size=self.options.get('max_nested_size', DEFAULT_NESTED_SIZE // (1024 * 1024)) * 1024 * 1024,
+            max_nested=self.options.get('max_nested', DEFAULT_NESTED),
+        )
+
+        self.governor = None
+        if any(self.options.get(key) for key in ('max_cpu', 'max_read_rate', 'max_rss')):
+            self.governor = Governor(
+                self.options.get('max_cpu'), self.options.get('max_read_rate'), self.options.get('max_rss')
+            )
+
+        # Searches started from the GUI are numbered: a new one supersedes the
+        # one in flight and rows or status updates of older ones are dropped
+        self.generation = 0
+        self.run_generation = 0
+        self.gui_query = (_('Or'), '')
+        self.previous_run = None  # (roots, query, records) of the last complete search
+        self._search_lock = threading.Lock()
+        self._rows_lock = threading.Lock()
+        self._pending_rows = []
+        self._live_source = None
+
+        # spans of the hits of each result, for snippets built on display
+        self.keep_hits = not self.console or bool(self.options.get('snippets'))
+        self.hits = {}
+        # results and unreadable files of the current search, compact for huge ones
+        self.records = RecordStore()
+        self.coverage = Coverage()  # of the current search
+        self._snippet_markup = {}
+        self.ranker = None  # set while a --top search runs
+        self.newest_first = False  # candidates come exactly by mtime-desc
+
     def do_activate(self):
         self.builder = Gtk.Builder()
         self.builder.add_from_file(get_ui_resource(f'{self.APP_DIALOG_ID}.ui'))
@@ -107,6 +203,13 @@ class ODFinderApp(Gtk.Application):
         tree_view_column.pack_start(cell_renderer_text, True)
         tree_view_column.add_attribute(cell_renderer_text, 'text', 0)
 
+        # only rows being drawn ask for their snippets
+        cell_renderer_snippets = Gtk.CellRendererText()
+        snippets_column = Gtk.TreeViewColumn(title=_('Context'))
+        self.tree_matches.append_column(snippets_column)
+        snippets_column.pack_start(cell_renderer_snippets, True)
+        snippets_column.set_cell_data_func(cell_renderer_snippets, self.on_snippets_cell_data)
+
         self.dialog = self.builder.get_object('window1')
         self.dialog.set_title(self.APP_NAME)
         self.dialog.set_icon_name(self.APP_ICON)
@@ -135,12 +238,16 @@ class ODFinderApp(Gtk.Application):
 
         self.dialog.set_default_widget(self.btn_search)
 
-        self.builder.get_object('txt_path').set_text(self.options['path'])
+        self.builder.get_object('txt_path').set_text(os.pathsep.join(split_paths(self.options['path'])))
         self.builder.get_object('txt_content').grab_focus()
 
         self.builder.get_object('txt_path').set_activates_default(True)
         self.builder.get_object('txt_content').set_activates_default(True)
 
+        if self.options.get('live_search', True):
+            self.builder.get_object('txt_content').connect('changed', self.on_query_changed)
+            cbb_mode.connect('changed', self.on_query_changed)
+
         self.dialog.present()
 
     def on_window1_close_request(self, window):
@@ -156,30 +263,82 @@ class ODFinderApp(Gtk.Application):
     def on_btn_exit_clicked(self, widget):
         self.quit()
 
+    def on_snippets_cell_data(self, column, cell, model, iter_, data=None):
+        filename = model[iter_][0]
+        markup = self._snippet_markup.get(filename)
+        if markup is None:
+            # read by a worker, the row is empty until then
+            markup = self._snippet_markup[filename] = ''
+            Gio.io_scheduler_push_job(
+                self.build_snippets,
+                (filename, self.generation),
+                GLib.PRIORITY_DEFAULT_IDLE,
+                None
+            )
+        cell.set_property('markup', markup)
+
+    def build_snippets(self, job, cancellable, data):
+        filename, generation = data
+        # the limits of the search, but only a new search stops it
+        budget = copy.copy(self.budget)
+        budget.cancelled = lambda: generation != self.generation
+        try:
+            markup = snippets_markup(self.snippets(filename, budget))
+        except Cancelled:
+            return
+        GLib.idle_add(self._show_snippets, filename, markup, generation)
+
+    def _show_snippets(self, filename, markup, generation):
+        if generation == self.generation:
+            self._snippet_markup[filename] = markup
+            self.tree_matches.queue_draw()
+        return False
+
     def on_tree_matches_row_activated(self, tree_view, path, column):
         (model, iter_) = tree_view.get_selection().get_selected()
         if iter_:
-            Popen(['xdg-open', model[iter_][0]])
+            # a document inside an archive opens the archive
+            Popen(['xdg-open', split_nested(model[iter_][0])[0]])
 
     @idle_add_decorator
     def on_btn_stop_clicked(self, widget):
         self.btn_stop.set_sensitive(False)
         self.btn_search.set_sensitive(True)
 
+        if self._live_source is not None:
+            GLib.source_remove(self._live_source)
+            self._live_source = None
+
         self.stopped = True
         self.cancellable.cancel()
 
     @idle_add_decorator
     def on_btn_search_clicked(self, widget):
-        self.ooo_count = 0
-        self.match_count = 0
-        self.warnings.clear()
-        self.btn_warnings.set_visible(False)
+        self.start_search(interactive=True)
 
-        self.matches.clear()
+    def on_query_changed(self, widget):
+        if self._live_source is not None:
+            GLib.source_remove(self._live_source)
+
+        self._live_source = GLib.timeout_add(LIVE_SEARCH_DELAY, self.on_live_search_timeout)
+
+    def on_live_search_timeout(self):
+        self._live_source = None
+        if len(self.builder.get_object('txt_content').get_text().strip()) >= LIVE_SEARCH_MIN_CHARS:
+            self.start_search(interactive=False)
+
+        return False
+
+    def start_search(self, interactive):
         path = self.builder.get_object('txt_path').get_text()
-        if not os.path.exists(path):
-            msg = _('Error: path %s does not exist') % path
+        lbl_status = self.builder.get_object('lbl_status')
+        missing = [directory for directory in split_paths(path) if not os.path.exists(directory)]
+        if missing:
+            msg = _('Error: path %s does not exist') % missing[0]
+            if not interactive:
+                lbl_status.set_text(msg)
+                return
+
             dialog = Gtk.MessageDialog(
                 transient_for=self.dialog,
                 modal=True,
@@ -190,26 +349,37 @@ class ODFinderApp(Gtk.Application):
             dialog.format_secondary_text(_('Ensure path is correct.'))
             dialog.connect('response', lambda d, r: d.destroy())
             dialog.present()
-        else:
-            self.btn_search.set_sensitive(False)
-            self.btn_stop.set_sensitive(True)
-
-            lbl_status = self.builder.get_object('lbl_status')
-            lbl_status.set_text(_('Searching in %s...') % path)
-            GLib.idle_add(
-                self.schedule_search,
-                path
-            )
+            return
+
+        # supersede the search in flight, if any: it stops inside the
+        # document being extracted and the new one starts right after
+        self.cancellable.cancel()
+        self.generation += 1
+        self.gui_query = (
+            self.builder.get_object('cbb_mode').get_active_text(),
+            self.builder.get_object('txt_content').get_text(),
+        )
+
+        self.matches.clear()
+        self._snippet_markup.clear()
+        self.btn_warnings.set_visible(False)
+        self.btn_stop.set_sensitive(True)
+        lbl_status.set_text(_('Searching in %s...') % path)
+        GLib.idle_add(self.schedule_search, path, self.generation)
 
-    def schedule_search(self, *args):
+    def schedule_search(self, path, generation):
         Gio.io_scheduler_push_job(
-            self.recursive_search,
-            args[0],  # path
+            self.run_search,
+            (path, generation),
             GLib.PRIORITY_DEFAULT_IDLE,
             self.cancellable
         )
         return False
 
+    def run_search(self, job, cancellable, data):
+        path, generation = data
+        self.recursive_search(job, cancellable, path, generation)
+
     @idle_add_decorator
     def on_btn_about_clicked(self, widget):
         about = Gtk.AboutDialog(transient_for=self.dialog)
@@ -225,7 +395,7 @@ class ODFinderApp(Gtk.Application):
         dialog = Gtk.FileDialog.new()
         dialog.set_title(_('Please choose a folder'))
 
-        initial_path = self.builder.get_object('txt_path').get_text()
+        initial_path = split_paths(self.builder.get_object('txt_path').get_text())[0]
         if os.path.exists(initial_path):
             dialog.set_initial_folder(Gio.File.new_for_path(initial_path))
 
@@ -242,10 +412,19 @@ class ODFinderApp(Gtk.Application):
         self.builder.get_object('txt_content').grab_focus()
 
     @idle_add_decorator
-    def search_completed(self):
+    def search_completed(self, generation):
+        if generation != self.generation:
+            return
+
         lbl_status = self.builder.get_object('lbl_status')
         msg = _('%d matches in %d files') % (self.match_count, self.ooo_count)
+        if not self.coverage.complete:
+            if self.coverage.percent() is not None:
+                msg += ' ' + _('(partial results, about %d%% searched)') % self.coverage.percent()
+            else:
+                msg += ' ' + _('(partial results)')
         lbl_status.set_text(msg)
+        lbl_status.set_tooltip_text('\n'.join(self.stats_summary()))
 
         self.btn_search.set_sensitive(True)
         self.btn_stop.set_sensitive(False)
@@ -257,13 +436,17 @@ class ODFinderApp(Gtk.Application):
             self.btn_warnings.set_visible(False)
 
     @idle_add_decorator
-    def search_cancelled(self):
+    def search_cancelled(self, generation):
+        if generation != self.generation:
+            return
+
         lbl_status = self.builder.get_object('lbl_status')
         msg = _('%d matches so far in %d files (search stopped)') % (
             self.match_count,
             self.ooo_count,
         )
         lbl_status.set_text(msg)
+        lbl_status.set_tooltip_text('\n'.join(self.stats_summary()))
         self.btn_search.set_sensitive(True)
         self.btn_stop.set_sensitive(False)
 
@@ -291,172 +474,517 @@ class ODFinderApp(Gtk.Application):
 
     def add_line_to_results(self, line):
         if self.console:
-            print(line)
-        else:
-            GLib.idle_add(self._append_to_matches, line)
+            print(self.format_result(line))
+            return
+
+        # rows reach the model in batches, one idle callback per batch
+        with self._rows_lock:
+            self._pending_rows.append((self.run_generation, line))
+            if len(self._pending_rows) > 1:
+                return
+
+        GLib.idle_add(self._append_to_matches)
+
+    def _append_to_matches(self):
+        with self._rows_lock:
+            rows, self._pending_rows = self._pending_rows, []
+
+        for generation, line in rows:
+            if generation == self.generation:
+                self.matches.append([line])
 
-    def _append_to_matches(self, line):
-        self.matches.append([line])
         return False
 
-    def match(self, text):
+    def search_query(self):
         mode = self.options['mode']
         query = ' '.join(self.options['content'])
         if not self.console:
-            mode = self.builder.get_object('cbb_mode').get_active_text()
-            query = self.builder.get_object('txt_content').get_text()
+            mode, query = self.gui_query
 
-        if mode == _('Phrase') or mode == 'phrase':
-            regex = re.compile(re.escape(query.lower()), re.DOTALL)
-            if regex.search(text):
-                return True
-        else:
-            parts = re.split(r'\s+', query.strip())
-            if mode == _('And') or mode == 'and':
-                for part in parts:
-                    regex = re.compile(re.escape(part.lower()), re.DOTALL)
-                    if not regex.search(text):
-                        return False
-                return True
-            elif mode == _('Or') or mode == 'or':
-                for part in parts:
-                    regex = re.compile(re.escape(part.lower()), re.DOTALL)
-                    if regex.search(text):
-                        return True
-                return False
-            else:
-                print(_("Error: unknown search mode '%s'") % mode)
+        mode = {_('Or'): 'or', _('And'): 'and', _('Phrase'): 'phrase'}.get(mode, mode)
+        return compile_query(mode, query, self.options.get('ignore_accents', False))
+
+    def match(self, text):
+        try:
+            return self.search_query().match(text)
+        except ValueError as err:
+            print(_("Error: unknown search mode '%s'") % err)
 
         return False
 
+    def search_document(self, document):
+        try:
+            return self.search_query().search_document(document)
+        except ValueError as err:
+            print(_("Error: unknown search mode '%s'") % err)
+
+        return None
+
+    def match_document(self, document):
+        return self.search_document(document) is not None
+
     def process_file(self, filename):
-        ext = get_filename_ext(filename)
         try:
-            # Handle OpenOffice.org files:
-            if ext in (
-                'sxw', 'stw',
-                'sxc', 'stc',
-                'sxi', 'sti',
-                'sxg',
-                'sxm',
-                'sxd', 'std',
-                'odt', 'ott',
-                'odp', 'otp',
-                'odf',
-                'odg', 'otg',
-                'ods', 'ots',
-            ) and zipfile.is_zipfile(filename):
-                with zipfile.ZipFile(filename) as zf:
-                    content = ''
-                    try:
-                        archives = zf.namelist()
-                        for item in archives:
-                            if item.endswith('content.xml'):
-                                content += zf.read(item).decode()
-
-                            if item.endswith('document.xml'):
-                                content += zf.read(item).decode()
-
-                        content = remove_xml_markup(content)
-                        doc_info = remove_xml_markup(zf.read('meta.xml').decode())
-                        self.ooo_count += 1
-                    except KeyError as err:
-                        msg = _("Warning: %s not found in '%s'") % (err, filename)
-                        print(msg)
-                        self.warnings.append(msg)
-                        return None
-
-                    return self.match(f'{content.lower()} {doc_info.lower()}')
-
-            # Handle MS-Office (>= 2007) files:
-            if ext in (
-                'docx', 'dotx',
-                'xlsx', 'xltx',
-            ) and zipfile.is_zipfile(filename):
-                with zipfile.ZipFile(filename) as zf:
-                    content = ''
-                    try:
-                        archives = zf.namelist()
-                        for item in archives:
-                            if item.endswith('document.xml'):
-                                content += zf.read(item).decode()
-
-                            if item.endswith('sharedStrings.xml'):
-                                content += zf.read(item).decode()
-
-                        content = remove_xml_markup(content)
-                        doc_info = remove_xml_markup(zf.read('docProps/core.xml').decode())
-                        self.ooo_count += 1
-                    except KeyError as err:
-                        msg = _("Warning: %s not found in '%s'") % (err, filename)
-                        print(msg)
-                        self.warnings.append(msg)
-                        return None
-
-                    return self.match(f'{content.lower()} {doc_info.lower()}')
-
-            # Handle MS-Office (>= 2007) MS-PowerPoint files:
-            if ext in (
-                'pptx',
-            ) and zipfile.is_zipfile(filename):
-                with zipfile.ZipFile(filename) as zf:
-                    try:
-                        archives = zf.namelist()
-                        slides = []
-                        for item in archives:
-                            if len(item) >= 12 and item[4:12] == 'slides/s':
-                                slides.append(item)
-
-                        content = ''
-                        for item in slides:
-                            content += zf.read(item).decode()
-
-                        content = remove_xml_markup(content)
-                        doc_info = remove_xml_markup(zf.read('docProps/core.xml').decode())
-                        self.ooo_count += 1
-                    except KeyError as err:
-                        msg = _("Warning: %s not found in '%s'") % (err, filename)
-                        print(msg)
-                        self.warnings.append(msg)
-                        return None
-
-                    return self.match(f'{content.lower()} {doc_info.lower()}')
-
-        except zipfile.BadZipfile as err:
-            msg = _('Warning: Supposed ZIP file %s could not be opened: %s') % (filename, str(err))
-            print(msg)
-            self.warnings.append(msg)
-        except IOError as err:
-            msg = _('Warning: File %s could not be opened: %s') % (filename, str(err))
-            print(msg)
-            self.warnings.append(msg)
+            query = self.search_query()
+        except ValueError:
+            query = None  # reported by search_document()
+
+        try:
+            document = extract_cached(self.text_cache, filename, query, self.budget)
+        except Cancelled:
+            return False
+        except (KeyError, zipfile.BadZipfile, IOError, BudgetExceeded) as err:
+            self.unreadable(filename, err)
+            return None if isinstance(err, KeyError) else False
+
+        if document is None:
+            return False
+
+        return self.match_file(filename, query, document)
+
+    def unreadable(self, filename, err):
+        self.warn(describe_error(filename, err))
+        with self._state_lock:
+            if isinstance(err, BudgetExceeded):
+                self.skipped[err.category] += 1
+            self.records.add(filename, status=SKIPPED if isinstance(err, BudgetExceeded) else FAILED)
+
+    def match_file(self, filename, query, document):
+        spans = self.search_document(document)
+        if spans is not None and self.keep_hits:
+            self.hits[filename] = spans
+        with self._state_lock:
+            self.ooo_count += 1
+            if self.ranker is not None:
+                self.rank(filename, query, document, spans)
+
+        return spans is not None
+
+    def process_archive(self, filename):
+        """(path, matched) of every document inside the .zip archive filename."""
+        try:
+            query = self.search_query()
+        except ValueError:
+            query = None  # reported by search_document()
+
+        results = []
+        try:
+            for path, document, err in iter_archive(filename, query, self.budget):
+                if err is not None:
+                    self.unreadable(path, err)
+                    results.append((path, False))
+                elif document is not None:
+                    results.append((path, self.match_file(path, query, document)))
+        except Cancelled:
+            pass
+        except (zipfile.BadZipfile, IOError) as err:
+            self.unreadable(filename, err)
+
+        return results
+
+    def process_entries(self, filename):
+        """(path, matched) of the documents of a file: the file itself, or those inside an archive."""
+        if get_filename_ext(filename) in ARCHIVE_EXTENSIONS:
+            return self.process_archive(filename)
+
+        return [(filename, self.process_file(filename))]
+
+    def rank(self, filename, query, document, spans):
+        try:
+            mtime = os.stat(split_nested(filename)[0]).st_mtime
+        except OSError:
+            return
+
+        # later documents are older only when the order is exact
+        self.ranker.observe(mtime if self.newest_first else None)
+        if spans is None:
+            return
+
+        self.ranker.add(make_candidate(filename, query, document, mtime))
+
+    def show_ranking(self, generation, final=False):
+        ranking = self.ranker.ranking()
+        if not self.console:
+            records = RecordStore()
+            for filename, _score in ranking:
+                records.add(filename)
+            GLib.idle_add(self._replace_matches, records, generation)
+        elif final:
+            for rank, (filename, score) in enumerate(ranking, 1):
+                print(self.format_result(filename, rank, score))
+        elif self.options.get('format') == 'jsonl':
+            # the snapshot the window shows, without snippets to extract
+            snapshot = [
+                {'path': filename, 'rank': rank, 'score': round(score, 4)}
+                for rank, (filename, score) in enumerate(ranking, 1)
+            ]
+            print(json.dumps({'ranking': snapshot, 'final': False}, ensure_ascii=False), flush=True)
+        else:
+            print(_('Ranking so far:'), file=sys.stderr)
+            for filename, _score in ranking:
+                print(f'    {filename}', file=sys.stderr)
+
+    def _replace_matches(self, records, generation):
+        if generation == self.generation:
+            self.matches.clear()
+            records.append_to(self.matches)
 
         return False
 
-    def recursive_search(self, job, cancellable, directory):
-        for root, _, files in os.walk(directory):
-            for file_ in files:
-                if self.cancellable.is_cancelled():
-                    self.cancellable.reset()
-                    if not self.console:
-                        self.search_cancelled()
+    def add_record(self, filename):
+        try:
+            st = os.stat(filename)
+        except OSError:
+            st = None  # inside an archive, or a path of a remote server or shard
+
+        # workers add the files they cannot read
+        with self._state_lock:
+            if st is None:
+                self.records.add(filename)
+            else:
+                self.records.add(filename, st.st_size, st.st_mtime_ns)
+
+    def process_governed(self, filename):
+        try:
+            self.governor.before_read(os.path.getsize(filename))
+        except OSError:
+            pass
+
+        started = time.thread_time()
+        entries = self.process_entries(filename)
+        self.governor.after_document(time.thread_time() - started)
+        pressure = self.governor.memory_exceeded()
+        if self.text_cache is not None:
+            # extracted text is the memory a search can give back
+            self.text_cache.relieve(pressure)
+
+        return entries
+
+    def past_deadline(self):
+        return self.deadline_at is not None and time.monotonic() >= self.deadline_at
 
+    def stop_requested(self):
+        # interrupts the document being read as well as the walk
+        return self.cancellable.is_cancelled() or self.past_deadline()
+
+    def warn(self, msg):
+        # keep JSON lines parseable
+        print(msg, file=sys.stderr if self.options.get('format') == 'jsonl' else sys.stdout)
+        self.warnings.append(msg)
+
+    def snippets(self, filename, budget=None):
+        """Snippets of a result, built when it is displayed or printed."""
+        try:
+            query = self.search_query()
+            document = extract_cached(self.text_cache, filename, query, budget)
+        except (ValueError, KeyError, zipfile.BadZipfile, IOError, BudgetExceeded):
+            return []
+
+        if document is None:
+            return []
+
+        return make_snippets(
+            query,
+            document,
+            self.hits.get(filename),
+            self.options.get('snippets') or DEFAULT_SNIPPETS,
+            self.options.get('context', DEFAULT_CONTEXT),
+        )
+
+    def format_result(self, filename, rank=None, score=None):
+        if self.options.get('format') == 'jsonl':
+            record = {'path': filename}
+            if rank is not None:
+                record.update(rank=rank, score=round(score, 4))
+            if self.options.get('snippets'):
+                record['snippets'] = [snippet._asdict() for snippet in self.snippets(filename)]
+            return json.dumps(record, ensure_ascii=False)
+
+        if not self.options.get('snippets'):
+            return filename
+
+        lines = snippets_text(self.snippets(filename), bold=sys.stdout.isatty())
+        return '\n'.join([filename] + [f'    {line}' for line in lines])
+
+    def stats_summary(self):
+        lines = self.stats.summary(self.ooo_count)
+        if self.records.count(FAILED):
+            lines.append(_('Unreadable documents: %d') % self.records.count(FAILED))
+        if self.skipped:
+            lines.append(_('Skipped over budget: %d (size %d, members %d, time %d)') % (
+                sum(self.skipped.values()),
+                self.skipped['size'],
+                self.skipped['members'],
+                self.skipped['time'],
+            ))
+        if self.text_cache is not None:
+            lines.extend(self.text_cache.summary())
+        if self.governor is not None:
+            lines.extend(self.governor.summary())
+        if self.options.get('deadline'):
+            lines.extend(self.coverage.summary())
+
+        return lines
+
+    def print_stats(self):
+        if self.console and self.options.get('stats'):
+            for line in self.stats_summary():
+                print(line, file=sys.stderr)
+
+    def print_coverage(self):
+        if not self.console or not self.options.get('deadline'):
+            return
+
+        if self.options.get('format') == 'jsonl':
+            # the last line, after the results it describes
+            print(json.dumps({'coverage': self.coverage.as_dict()}, ensure_ascii=False))
+        elif not self.options.get('stats'):
+            for line in self.coverage.summary():
+                print(line, file=sys.stderr)
+
+    def candidates(self, directory):
+        order = self.options.get('order', 'walk')
+        # a ranked search can stop early only on an exactly ordered scan
+        self.newest_first = self.ranker is not None and order == 'mtime-desc'
+        files = iter_files(
+            directory,
+            order,
+            None if self.newest_first else DEFAULT_WINDOW,
+            progress=self.coverage.walk(directory),
+            stop=self.stop_requested,
+        )
+        if self.options.get('readahead'):
+            # walk order carries no meaning, so disk order can replace it
+            files = Prefetcher(self.options['readahead']).iter(files, reorder=(order == 'walk'))
+
+        return files
+
+    def local_results(self, roots, query):
+        self.newest_first = False
+        files = None
+        if self.previous_run is not None and query is not None:
+            previous_roots, previous_query, records = self.previous_run
+            # a narrowed query only needs to look at what the last one found
+            if previous_roots == roots and query.narrows(previous_query):
+                files = records.paths(MATCHED)
+                self.coverage.total = records.count(MATCHED)
+
+        process = self.process_entries if self.governor is None else self.process_governed
+        if files is None and len(roots) > 1:
+            for _, entries in merge_roots(
+                roots,
+                process,
+                self.options.get('workers', server.DEFAULT_WORKERS),
+                self.options.get('per_mount_workers', DEFAULT_PER_MOUNT),
+                self.options.get('order', 'walk'),
+                self.coverage,
+                self.stop_requested,
+            ):
+                self.count_scanned()
+                yield from entries
+            return
+
+        if files is None:
+            files = self.candidates(roots[0])
+
+        for filename in files:
+            entries = process(filename)
+            self.count_scanned()
+            yield from entries
+
+    def count_scanned(self):
+        # a document interrupted by the deadline was not searched; one
+        # finished just before it is left out too, so coverage never overstates
+        if not self.stop_requested():
+            self.coverage.scanned += 1
+
+    def remote_results(self, roots):
+        query = self.search_query()
+        files = 0
+        for directory in roots:
+            request = {
+                'path': os.path.abspath(directory),
+                'mode': query.mode,
+                'content': query.text,
+                'ignore_accents': query.fold,
+                'order': self.options.get('order', 'walk'),
+            }
+            if self.deadline_at is not None:
+                request['deadline'] = max(0, self.deadline_at - time.monotonic())
+            try:
+                for message in server.query(self.options['connect'], request):
+                    if 'match' in message:
+                        yield message['match'], True
+                    elif 'warning' in message:
+                        self.warn(message['warning'])
+                    elif 'error' in message:
+                        print(message['error'])
+                    elif 'done' in message:
+                        files += message['files']
+                        self.ooo_count = files
+                        # from a server without deadlines when absent
+                        if 'coverage' in message:
+                            self.coverage.scanned += message['coverage']['scanned']
+                            self.coverage.complete &= message['complete']
+            except OSError as err:
+                print(_('Error: cannot connect to server %s: %s') % (self.options['connect'], str(err)))
+                return
+
+    def shard_results(self):
+        query = self.search_query()
+        request = {'mode': query.mode, 'content': query.text, 'ignore_accents': query.fold}
+        # every shard searches the roots it was built from
+        timeout = self.options.get('shard_timeout', DEFAULT_TIMEOUT)
+        if self.deadline_at is not None:
+            timeout = min(timeout, max(0, self.deadline_at - time.monotonic()))
+        gather = Gather(self.options['shard_server'], request, timeout, self.ranker)
+        for filename in gather:
+            yield filename, True
+
+        for msg in gather.warnings:
+            self.warn(msg)
+        for address, reason in gather.missing.items():
+            self.warn(_('Warning: partial results, shard %s left out: %s') % (address, reason))
+        self.ooo_count = gather.files
+        self.coverage.scanned = self.coverage.total = gather.files
+        self.coverage.complete = not gather.missing
+
+    def recursive_search(self, job, cancellable, directory, generation=None):
+        # one search at a time: a superseded one releases the lock as soon
+        # as it notices its cancellation
+        with self._search_lock:
+            if generation is not None:
+                if generation != self.generation:
                     return
-                filename = os.path.join(root, file_)
-                if self.process_file(filename):
-                    self.add_line_to_results(filename)
-                    self.match_count += 1
 
+                self.cancellable.reset()
+                self.ooo_count = 0
+                self.match_count = 0
+                self.warnings.clear()
+                self.skipped.clear()
+                self.hits.clear()
+            else:
+                generation = self.generation
+
+            self.run_generation = generation
+            self._search(directory, generation)
+
+    def _cancel(self, results, generation):
+        results.close()
+        self.cancellable.reset()
+        self.stats.stop()
         if not self.console:
-            self.search_completed()
+            if self.ranker is not None:
+                self.show_ranking(generation)
+            self.search_cancelled(generation)
+
+    def _search(self, directory, generation):
+        try:
+            query = self.search_query()
+        except ValueError:
+            query = None  # reported by search_document()
+
+        # overlapping roots are searched once
+        paths = split_paths(directory)
+        roots = tuple(unique_roots(paths) or paths[:1])
+
+        self.coverage = Coverage()
+        self.coverage.missing_roots = [path for path in paths if path not in roots and not os.path.exists(path)]
+        deadline = self.options.get('deadline')
+        self.deadline_at = time.monotonic() + deadline if deadline else None
+
+        self.stats.start()
+        self.ranker = None
+        if self.options.get('connect'):
+            results = self.remote_results(roots)
+        else:
+            if self.options.get('top') and query is not None:
+                self.ranker = Ranker(self.options['top'], len(query.terms))
+            if self.options.get('shard_server'):
+                results = self.shard_results()
+            else:
+                results = self.local_results(roots, query)
+
+        self.records = RecordStore()
+        complete = True
+        for filename, matched in results:
+            if self.cancellable.is_cancelled():
+                self._cancel(results, generation)
+                return
+
+            if matched:
+                if self.ranker is None:
+                    self.add_line_to_results(filename)
+                self.match_count += 1
+                self.stats.add_result()
+                self.add_record(filename)
+
+            if self.ranker is not None:
+                if self.ranker.settled():
+                    results.close()
+                    complete = False
+                    break
+                # shown again once it stops changing
+                if self.ranker.stable_for == STABLE_AFTER:
+                    self.show_ranking(generation)
+
+            if self.past_deadline():
+                results.close()
+                self.coverage.complete = complete = False
+                break
+        else:
+            # the walk ends by itself once stopped: its files are not all there
+            if self.cancellable.is_cancelled():
+                self._cancel(results, generation)
+                return
+            if self.past_deadline():
+                self.coverage.complete = complete = False
+
+        if self.ranker is not None:
+            self.show_ranking(generation, final=True)
+        remote = self.options.get('connect') or self.options.get('shard_server')
+        if query is not None and complete and not remote and generation == self.generation:
+            self.previous_run = (roots, query, self.records)
+
+        self.stats.stop()
+        self.print_stats()
+        self.print_coverage()
+        if not self.console:
+            self.search_completed(generation)
 
     def run(self):
-        if self.console:
+        # before any thread starts, so that all of them inherit it
+        if self.options.get('idle') and not set_idle_priority():
+            print(_('Warning: the idle I/O scheduling class is not available'), file=sys.stderr)
+
+        if self.options.get('serve'):
+            query_server = server.QueryServer(
+                self.options.get('workers', server.DEFAULT_WORKERS),
+                self.options.get('cache_size', DEFAULT_CACHE_SIZE),
+                max_size=self.budget.max_size,
+                max_members=self.budget.max_members,
+                max_time=self.budget.max_time,
+                governor=self.governor,
+            )
+            try:
+                query_server.serve(self.options['serve'])
+            except OSError as err:
+                print(_('Error: cannot listen on %s: %s') % (self.options['serve'], err.strerror), file=sys.stderr)
+                sys.exit(1)
+        elif self.console:
             self.recursive_search(None, None, self.options['path'])
         else:
             super().run([sys.argv[0]])
 
 
+def split_paths(path):
+    """Roots of a search: a list of them, or a string separating them with os.pathsep."""
+    if isinstance(path, str):
+        return [directory for directory in path.split(os.pathsep) if directory] or [path]
+
+    return list(path)
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description=ODFinderApp.APP_DESCRIPTION,
@@ -464,9 +992,8 @@ def parse_args():
 
     parser.add_argument(
         '-p', '--path',
-        action='store',
-        help=_('path to search (home by default)'),
-        default=os.getenv('HOME'),
+        action='append',
+        help=_('path to search, may be repeated (home by default)'),
     )
 
     parser.add_argument(
@@ -477,6 +1004,230 @@ def parse_args():
         help=_('search mode (or by default)'),
     )
 
+    parser.add_argument(
+        '-a', '--ignore-accents',
+        action='store_true',
+        help=_('match regardless of accents and case: "migracion" finds "Migración"'),
+    )
+
+    parser.add_argument(
+        '-o', '--order',
+        action='store',
+        choices=ORDERS,
+        default='walk',
+        help=_('scan order: likely hits first with mtime-desc or size-asc (walk by default)'),
+    )
+
+    parser.add_argument(
+        '--readahead',
+        action='store',
+        type=int,
+        default=0,
+        metavar='N',
+        help=_('prefetch the next N documents in disk order (disabled by default)'),
+    )
+
+    parser.add_argument(
+        '--no-live-search',
+        action='store_false',
+        dest='live_search',
+        help=_('only search when the Search button is pressed in the window'),
+    )
+
+    parser.add_argument(
+        '--serve',
+        action='store',
+        metavar='SOCKET',
+        help=_('run a resident query server listening on SOCKET'),
+    )
+
+    parser.add_argument(
+        '--connect',
+        action='store',
+        metavar='SOCKET',
+        help=_('send searches to the query server listening on SOCKET'),
+    )
+
+    parser.add_argument(
+        '--workers',
+        action='store',
+        type=int,
+        default=server.DEFAULT_WORKERS,
+        help=_(
+            'number of worker threads of the query server or of a search of several paths (%d by default)'
+        ) % server.DEFAULT_WORKERS,
+    )
+
+    parser.add_argument(
+        '--per-mount-workers',
+        action='store',
+        type=int,
+        default=DEFAULT_PER_MOUNT,
+        metavar='N',
+        help=_('at most N workers reading from one filesystem at a time (%d by default)') % DEFAULT_PER_MOUNT,
+    )
+
+    parser.add_argument(
+        '--shard-server',
+        action='append',
+        metavar='ADDRESS',
+        help=_('search the shard server at HOST:PORT or Unix socket ADDRESS instead of the path, may be repeated'),
+    )
+
+    parser.add_argument(
+        '--shard-timeout',
+        action='store',
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        metavar='SECONDS',
+        help=_('leave out shards that have not answered within SECONDS (%g by default)') % DEFAULT_TIMEOUT,
+    )
+
+    parser.add_argument(
+        '--cache-size',
+        action='store',
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        metavar='MIB',
+        help=_('memory for extracted text reused by later searches of the GUI and the server, 0 disables it '
+               '(%d MiB by default)') % DEFAULT_CACHE_SIZE,
+    )
+
+    parser.add_argument(
+        '--max-file-size',
+        action='store',
+        type=int,
+        metavar='MIB',
+        help=_('skip documents inflating to more than MIB (no limit by default)'),
+    )
+
+    parser.add_argument(
+        '--max-members',
+        action='store',
+        type=int,
+        metavar='N',
+        help=_('skip documents with more than N archive members (no limit by default)'),
+    )
+
+    parser.add_argument(
+        '--max-file-time',
+        action='store',
+        type=float,
+        metavar='SECONDS',
+        help=_('skip documents taking more than SECONDS of CPU time to extract (no limit by default)'),
+    )
+
+    parser.add_argument(
+        '--max-depth',
+        action='store',
+        type=int,
+        default=DEFAULT_DEPTH,
+        metavar='N',
+        help=_(
+            'follow documents embedded in documents and inside .zip archives N levels deep, 0 to ignore them '
+            '(%d by default)'
+        ) % DEFAULT_DEPTH,
+    )
+
+    parser.add_argument(
+        '--max-nested-size',
+        action='store',
+        type=int,
+        default=DEFAULT_NESTED_SIZE // (1024 * 1024),
+        metavar='MB',
+        help=_('skip nested documents and archives larger than MB MiB (%d by default)')
+        % (DEFAULT_NESTED_SIZE // (1024 * 1024)),
+    )
+
+    parser.add_argument(
+        '--max-nested',
+        action='store',
+        type=int,
+        default=DEFAULT_NESTED,
+        metavar='N',
+        help=_('search up to N documents inside one archive (%d by default)') % DEFAULT_NESTED,
+    )
+
+    parser.add_argument(
+        '--max-cpu',
+        action='store',
+        type=float,
+        metavar='PERCENT',
+        help=_('pace the scan to use at most PERCENT of one CPU core (no limit by default)'),
+    )
+
+    parser.add_argument(
+        '--max-read-rate',
+        action='store',
+        type=float,
+        metavar='MBPS',
+        help=_('pace the scan to read at most MBPS megabytes of documents per second (no limit by default)'),
+    )
+
+    parser.add_argument(
+        '--max-rss',
+        action='store',
+        type=int,
+        metavar='MIB',
+        help=_(
+            'shrink the text cache while the process uses more than MIB of memory; '
+            'console searches keep no cache and only report it (no limit by default)'
+        ),
+    )
+
+    parser.add_argument(
+        '--idle',
+        action='store_true',
+        help=_('run with the lowest CPU priority and the idle I/O scheduling class'),
+    )
+
+    parser.add_argument(
+        '--top',
+        action='store',
+        type=int,
+        metavar='K',
+        help=_('rank results by relevance and show the best K only (local searches)'),
+    )
+
+    parser.add_argument(
+        '--deadline',
+        action='store',
+        type=float,
+        metavar='SECONDS',
+        help=_('stop the search after SECONDS and report how much of it was done (no limit by default)'),
+    )
+
+    parser.add_argument(
+        '--format',
+        action='store',
+        choices=['text', 'jsonl'],
+        default='text',
+        help=_('output of the console search: one path per line or one JSON object per line (text by default)'),
+    )
+
+    parser.add_argument(
+        '--snippets',
+        action='store',
+        type=int,
+        metavar='N',
+        help=_('show up to N snippets of context for each result (%d in the window by default)') % DEFAULT_SNIPPETS,
+    )
+
+    parser.add_argument(
+        '--context',
+        action='store',
+        type=int,
+        default=DEFAULT_CONTEXT,
+        metavar='CHARS',
+        help=_('characters of context on each side of a hit (%d by default)') % DEFAULT_CONTEXT,
+    )
+
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help=_('print search statistics to stderr when done'),
+    )
+
     parser.add_argument(
         'content',
         nargs='*',  # optional
@@ -484,7 +1235,10 @@ def parse_args():
         help=_('content to search'),
     )
 
-    return vars(parser.parse_args())
+    args = vars(parser.parse_args())
+    # set here, as a default would be appended to
+    args['path'] = args['path'] or [os.getenv('HOME')]
+    return args
 
 
 def main():
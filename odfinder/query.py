@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import functools
+import re
+
+from .documents import searchable_text
+from .metadata import parse_metadata, split_filters
+from .normalize import fold_text
+
+MODES = ('or', 'and', 'phrase')
+
+
+@functools.cache
+def _case_variants():
+    """Non-ASCII characters of the BMP keyed by their lowercase form, when that is a single character."""
+    variants = collections.defaultdict(list)
+    for code in range(0x80, 0x10000):
+        char = chr(code)
+        lower = char.lower()
+        if len(lower) == 1 and lower != char:
+            variants[lower].append(char)
+    return variants
+
+
+def _char_pattern(char):
+    lower = char.lower()
+    if len(lower) > 1:
+        # U+0130 lowercases to 'i' and a combining dot: either form matches
+        return b'(?:' + re.escape(char.encode('utf-8')) + b'|' + b''.join(_char_pattern(c) for c in lower) + b')'
+
+    alternatives = [lower, *_case_variants().get(lower, ())]
+    if lower in ('\u03c3', '\u03c2'):
+        # str.lower() picks the final form of sigma from context
+        alternatives = ['\u03c3', '\u03c2', '\u03a3']
+    encoded = [re.escape(alternative.encode('utf-8', 'surrogateescape')) for alternative in alternatives]
+    return encoded[0] if len(encoded) == 1 else b'(?:' + b'|'.join(encoded) + b')'
+
+
+def _bytes_pattern(term):
+    """
+    Compile term, as typed, into a regex for UTF-8 text lowercased by
+    bytes.lower().
+
+    That only folds ASCII, so every character of term also matches the
+    characters lowercasing to the same form. The pattern is built from the
+    typed characters, not their lowercase form: one lowercasing to several
+    characters (U+0130) still matches itself.
+    """
+    return re.compile(b''.join(_char_pattern(char) for char in term), re.DOTALL)
+
+
+class Query:
+    def __init__(self, mode, text, fold=False):
+        if mode not in MODES:
+            raise ValueError(mode)
+
+        self.mode = mode
+        self.text = text
+        self.fold = fold
+        # metadata filters always narrow the result, whatever the mode
+        self.filters, body = split_filters(text)
+        typed = [body] if mode == 'phrase' else re.split(r'\s+', body.strip())
+        self.terms = [term.lower() for term in typed]
+        if fold:
+            self.terms = [fold_text(term) for term in self.terms]
+        self.regexes = [re.compile(re.escape(term), re.DOTALL) for term in self.terms]
+        # documents are matched as bytes, the query is encoded here once;
+        # folded text needs no case variants
+        if fold:
+            self.bytes_regexes = [re.compile(re.escape(term.encode('utf-8', 'surrogateescape'))) for term in self.terms]
+        else:
+            self.bytes_regexes = [_bytes_pattern(term) for term in typed]
+        self.needs_body = not self.filters or bool(body.strip())
+
+    def accepts_meta(self, meta_xml):
+        if not self.filters:
+            return True
+
+        metadata = parse_metadata(meta_xml)
+        return all(meta_filter.match(metadata) for meta_filter in self.filters)
+
+    def search(self, text):
+        """
+        Spans of the hits deciding that text matches, None when it does not.
+
+        text is prepared by searchable_text(), or the same as str. Spans are
+        what matching finds anyway: the first hit of every term in 'and'
+        mode, of the first term found otherwise.
+        """
+        regexes = self.regexes if isinstance(text, str) else self.bytes_regexes
+        spans = []
+        for regex in regexes:
+            hit = regex.search(text)
+            if hit is not None:
+                spans.append(hit.span())
+                if self.mode != 'and':
+                    break
+            elif self.mode == 'and':
+                return None
+
+        return spans or None
+
+    def match(self, text):
+        return self.search(text) is not None
+
+    def count(self, text):
+        """Occurrences of each term in text prepared by searchable_text()."""
+        return [len(regex.findall(text)) if term else 0 for term, regex in zip(self.terms, self.bytes_regexes)]
+
+    def narrows(self, other):
+        """
+        True when every document matching self is known to match other.
+
+        A search can then check the previous hits of other instead of the
+        whole tree. Terms are substrings, so a term implies any term it
+        contains: 'and'/'phrase' terms are all present, 'or' terms any.
+        """
+        if self.fold != other.fold or not set(other.filters) <= set(self.filters):
+            return False
+
+        def implies(term, terms, all_of):
+            check = all if all_of else any
+            return check(required in term for required in terms)
+
+        other_all = other.mode != 'or'
+        if self.mode != 'or':
+            # the document contains every term of self
+            if other_all:
+                return all(any(required in term for term in self.terms) for required in other.terms)
+            return any(implies(term, other.terms, False) for term in self.terms)
+
+        # the document contains at least one term of self, any of them
+        return all(implies(term, other.terms, other_all) for term in self.terms)
+
+    def search_document(self, document):
+        if document.content is None and self.needs_body or not self.accepts_meta(document.meta_xml):
+            return None
+
+        return self.search(searchable_text(document, self.fold))
+
+    def match_document(self, document):
+        return self.search_document(document) is not None
+
+
+@functools.lru_cache(maxsize=128)
+def compile_query(mode, text, fold=False):
+    return Query(mode, text, fold)
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Relevance ranking of matching documents, keeping only the best k.
+
+Scores are BM25 over the searchable text plus boosts for a hit in the
+title and for recent documents. With no index to take document
+frequencies from, they are estimated from the documents scanned so far.
+The k documents kept are rescored whenever the ranking is read, and
+while scanning only once an estimate has grown by RESCORE_GROWTH: until
+then a new document is compared with the scores they were kept with.
+"""
+
+import collections
+import heapq
+import itertools
+import math
+import time
+
+from .documents import searchable_text
+from .metadata import parse_metadata
+from .normalize import fold_text
+
+K1 = 1.2
+B = 0.75
+TITLE_BOOST = 1.0
+RECENCY_BOOST = 1.0
+RECENCY_HALF_LIFE = 365 * 24 * 3600  # seconds
+
+# documents scanned without a change in the top k before it is shown
+STABLE_AFTER = 100
+
+# growth of the document counts that makes the scores of the top k stale
+RESCORE_GROWTH = 1.1
+
+Candidate = collections.namedtuple('Candidate', ('path', 'frequencies', 'length', 'title', 'mtime'))
+
+
+def make_candidate(path, query, document, mtime):
+    """Candidate of a document matching query."""
+    text = searchable_text(document, query.fold)
+    title = ' '.join(parse_metadata(document.meta_xml).get('title', ()))
+    title = fold_text(title) if query.fold else title.lower()
+    title_hit = any(term and term in title for term in query.terms)
+    return Candidate(path, query.count(text), len(text), title_hit, mtime)
+
+
+class Ranker:
+    def __init__(self, k, terms, now=None):
+        self.k = k
+        self.terms = terms
+        self.now = time.time() if now is None else now
+        self.documents = 0
+        self.stable_for = 0
+
+        self._document_frequency = [0] * terms
+        self._matched = 0
+        self._total_length = 0
+        self._heap = []  # (score, sequence, candidate), worst first
+        self._counter = itertools.count()
+        self._floor = None  # no later document is newer
+        self._scored_with = ()  # estimates the top k was last scored with
+
+    def __len__(self):
+        return len(self._heap)
+
+    def observe(self, mtime=None):
+        """Count a scanned document; pass its mtime when the scan is exactly newest first."""
+        self.documents += 1
+        self.stable_for += 1
+        if mtime is not None:
+            self._floor = mtime
+
+    def idf(self, index):
+        frequency = self._document_frequency[index]
+        return math.log(1 + (self.documents - frequency + 0.5) / (frequency + 0.5))
+
+    def recency(self, mtime):
+        return RECENCY_BOOST * 0.5 ** (max(0.0, self.now - mtime) / RECENCY_HALF_LIFE)
+
+    def score(self, candidate):
+        average = self._total_length / self._matched if self._matched else candidate.length
+        norm = K1 * (1 - B + B * candidate.length / max(average, 1))
+        score = sum(
+            self.idf(index) * frequency * (K1 + 1) / (frequency + norm)
+            for index, frequency in enumerate(candidate.frequencies)
+            if frequency
+        )
+        return score + TITLE_BOOST * candidate.title + self.recency(candidate.mtime)
+
+    def add(self, candidate):
+        """Score a matching document, True when it enters the top k."""
+        self._matched += 1
+        self._total_length += candidate.length
+        for index, frequency in enumerate(candidate.frequencies):
+            if frequency:
+                self._document_frequency[index] += 1
+
+        return self.offer(candidate)
+
+    def offer(self, candidate):
+        """Score a document already counted in the statistics (see merge()), True when it enters the top k."""
+        if len(self._heap) == self.k and self._stale():
+            self._rescore()
+
+        item = (self.score(candidate), next(self._counter), candidate)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, item)
+        elif item[0] > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+        else:
+            return False
+
+        self.stable_for = 0
+        return True
+
+    def _estimates(self):
+        return (self.documents, self._matched, *self._document_frequency)
+
+    def _stale(self):
+        if not self._scored_with:
+            return True
+        return any(now > RESCORE_GROWTH * then for now, then in zip(self._estimates(), self._scored_with))
+
+    def _rescore(self):
+        self._scored_with = self._estimates()
+        self._heap = [(self.score(candidate), sequence, candidate) for _, sequence, candidate in self._heap]
+        heapq.heapify(self._heap)
+
+    def statistics(self):
+        """What the scores are estimated from, to merge() into the ranker of another part of the corpus."""
+        return {
+            'documents': self.documents,
+            'matched': self._matched,
+            'length': self._total_length,
+            'frequencies': list(self._document_frequency),
+        }
+
+    def merge(self, statistics):
+        self.documents += statistics['documents']
+        self._matched += statistics['matched']
+        self._total_length += statistics['length']
+        for index, frequency in enumerate(statistics['frequencies']):
+            self._document_frequency[index] += frequency
+
+    def ranking(self):
+        """The top k as (path, score), best first."""
+        self._rescore()
+        return [(item[2].path, item[0]) for item in sorted(self._heap, key=lambda item: (-item[0], item[1]))]
+
+    def candidates(self):
+        """The top k Candidates, best first."""
+        self._rescore()
+        return [item[2] for item in sorted(self._heap, key=lambda item: (-item[0], item[1]))]
+
+    def settled(self):
+        """
+        True when no document left can enter the top k.
+
+        Only known when the scan is newest first: a later document scores at
+        most every term saturated, a title hit and the recency of the last
+        one scanned.
+        """
+        if self._floor is None or len(self._heap) < self.k:
+            return False
+
+        # rescored only when the kept scores already say so
+        if not self._beats_any_later():
+            return False
+        self._rescore()
+        return self._beats_any_later()
+
+    def _beats_any_later(self):
+        best = sum(self.idf(index) * (K1 + 1) for index in range(self.terms))
+        return self._heap[0][0] >= best + TITLE_BOOST + self.recency(self._floor)
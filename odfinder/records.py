@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Compact per-file records for huge result sets.
+
+A RecordStore keeps its files in columns rather than one object per file:
+directories are interned and referenced by index, basenames are packed in
+one buffer of file system encoded bytes, sizes and mtimes are int64 arrays
+and format and status take a byte each. Records are built back into
+tuples only when read; see benchmarks/bench_records.py for the memory
+each tracked file takes.
+
+The app keeps the results and the unreadable files of a search here, to
+narrow the next query and to count them. Results are printed and shown
+as they are found, without going through the store.
+"""
+
+import array
+import collections
+import os
+
+from .utils import SUPPORTED_EXTENSIONS, get_filename_ext
+
+# status of a file in a search
+MATCHED = 0
+FAILED = 1  # could not be read: broken or unreadable
+SKIPPED = 2  # over the extraction budget
+
+# format codes; 0 for an extension the searches do not read
+FORMATS = ('',) + tuple(sorted(SUPPORTED_EXTENSIONS))
+_FORMAT_CODES = {ext: code for code, ext in enumerate(FORMATS)}
+
+UNKNOWN = -1  # size or mtime not known
+
+Record = collections.namedtuple('Record', ('path', 'size', 'mtime_ns', 'format', 'status'))
+
+
+class RecordStore:
+    def __init__(self):
+        self._directories = []
+        self._directory_codes = {}
+        self._directory = array.array('I')
+        self._names = bytearray()
+        self._ends = array.array('Q')  # end of each basename in _names
+        self._size = array.array('q')
+        self._mtime_ns = array.array('q')
+        self._format = bytearray()
+        # appended last: a record is complete for readers once its status is there
+        self._status = bytearray()
+
+    def __len__(self):
+        return len(self._status)
+
+    def add(self, path, size=UNKNOWN, mtime_ns=UNKNOWN, status=MATCHED):
+        """Track path, returning its index."""
+        directory, name = os.path.split(path)
+        code = self._directory_codes.get(directory)
+        if code is None:
+            code = self._directory_codes[directory] = len(self._directories)
+            self._directories.append(directory)
+
+        self._directory.append(code)
+        self._names += os.fsencode(name)
+        self._ends.append(len(self._names))
+        self._size.append(size)
+        self._mtime_ns.append(mtime_ns)
+        self._format.append(_FORMAT_CODES.get(get_filename_ext(name), 0))
+        self._status.append(status)
+        return len(self._status) - 1
+
+    def path(self, index):
+        start, end = self._ends[index - 1] if index else 0, self._ends[index]
+        name = os.fsdecode(bytes(self._names[start:end]))
+        return os.path.join(self._directories[self._directory[index]], name)
+
+    def __getitem__(self, index):
+        index = range(len(self))[index]  # negative indices, IndexError
+        return Record(
+            self.path(index),
+            self._size[index],
+            self._mtime_ns[index],
+            FORMATS[self._format[index]],
+            self._status[index],
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def count(self, status=MATCHED):
+        return self._status.count(status)
+
+    def paths(self, status=None):
+        """Paths in the order they were added, of the records with status only when given."""
+        start = 0
+        directories = self._directories
+        for index in range(len(self)):
+            end = self._ends[index]
+            if status is None or self._status[index] == status:
+                yield os.path.join(directories[self._directory[index]], os.fsdecode(bytes(self._names[start:end])))
+            start = end
+
+    def append_to(self, model, status=MATCHED):
+        """Bulk export to a model taking one-column rows, such as the Gtk.ListStore of the results."""
+        for path in self.paths(status):
+            model.append([path])
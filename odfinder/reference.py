@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Reference implementation of what a search matches, and the harness
+comparing every search engine of odfinder with it.
+
+The reference reads whole members into str and matches with the plain
+'in' operator, the way the first versions of odfinder did. It is slow on
+purpose and must stay obvious: optimised paths (byte level matching,
+metadata first reads, the text cache, shards...) are checked against it,
+never the other way round. Metadata filters and the limits of a Budget
+are not modelled (see SKIPPED).
+
+Known difference: str.lower() turns a capital sigma into 'σ' or 'ς'
+depending on the letters around it, in the document as in the query.
+The byte matcher cannot look at that context and lets every form of
+sigma match the others, so it finds a few documents the reference does
+not.
+"""
+
+import collections
+import io
+import os
+import re
+import tempfile
+import unicodedata
+import zipfile
+import zlib
+
+from .cache import TextCache, extract_cached
+from .documents import DEFAULT_DEPTH, Budget, BudgetExceeded, extract_text, iter_archive
+from .server import QueryServer
+from .shard import ShardServer, build_shard
+from .utils import ARCHIVE_EXTENSIONS, NESTED_SEP, SUPPORTED_EXTENSIONS, get_filename_ext, split_nested
+
+ODF_EXTENSIONS = (
+    'sxw',
+    'stw',
+    'sxc',
+    'stc',
+    'sxi',
+    'sti',
+    'sxg',
+    'sxm',
+    'sxd',
+    'std',
+    'odt',
+    'ott',
+    'odp',
+    'otp',
+    'odf',
+    'odg',
+    'otg',
+    'ods',
+    'ots',
+)
+
+OOXML_EXTENSIONS = (
+    'docx',
+    'dotx',
+    'xlsx',
+    'xltx',
+)
+
+PPTX_EXTENSIONS = ('pptx',)
+
+# what a broken document raises in the reference
+UNREADABLE = (KeyError, zipfile.BadZipfile, OSError, EOFError, NotImplementedError, ValueError, zlib.error)
+
+# result of a document an engine skipped over a Budget limit: the reference
+# has no limits, so these documents are left out of the comparison; a
+# declared size can lie, and make an engine skip a small document
+SKIPPED = 'skipped'
+
+Mismatch = collections.namedtuple('Mismatch', ('engine', 'path', 'expected', 'found'))
+
+# search(root, paths, query) returns {path: result} for paths, the documents
+# under root; nested engines get documents inside archives too, and only
+# engines reporting errors tell unreadable documents (None) from others
+Engine = collections.namedtuple('Engine', ('search', 'nested', 'errors'))
+
+
+def _remove_markup(text):
+    text = re.sub('<!--.*?-->', '', text, flags=re.DOTALL)
+    return re.sub('<[^>]*>', '', text, flags=re.DOTALL)
+
+
+def _strip_marks(text):
+    return ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+
+
+def fold(text):
+    return _strip_marks(_strip_marks(text).casefold())
+
+
+def _member(zf, name):
+    info = zf.getinfo(name)
+    if info.compress_type != zipfile.ZIP_STORED:
+        return zf.read(info)
+
+    # odfinder reads documents stored in archives in place, where the CRC
+    # of the archive member is never checked: the members of the document
+    # have CRCs of their own
+    with zf.open(info) as member:
+        member._expected_crc = None
+        data = member.read()
+    if len(data) != info.file_size:
+        raise zipfile.BadZipfile(f'Member {name} is truncated')
+    return data
+
+
+def _body(zf, ext, depth):
+    content = ''
+    for item in zf.namelist():
+        if ext in ODF_EXTENSIONS:
+            if item.endswith('content.xml') or item.endswith('document.xml'):
+                content += zf.read(item).decode('utf-8', 'surrogateescape')
+        elif ext in PPTX_EXTENSIONS:
+            if len(item) >= 12 and item[4:12] == 'slides/s':
+                content += zf.read(item).decode('utf-8', 'surrogateescape')
+        elif item.endswith('document.xml') or item.endswith('sharedStrings.xml'):
+            content += zf.read(item).decode('utf-8', 'surrogateescape')
+    content = _remove_markup(content)
+
+    if depth >= DEFAULT_DEPTH or ext in ODF_EXTENSIONS:
+        return content
+
+    # OOXML documents embedded in this one, skipped when broken
+    for item in zf.namelist():
+        if '/embeddings/' in item and get_filename_ext(item) in SUPPORTED_EXTENSIONS:
+            try:
+                with zipfile.ZipFile(io.BytesIO(_member(zf, item))) as embedded:
+                    content += ' ' + _body(embedded, get_filename_ext(item), depth + 1)
+            except UNREADABLE:
+                continue
+
+    return content
+
+
+def _text(zf, ext, depth):
+    meta = 'meta.xml' if ext in ODF_EXTENSIONS else 'docProps/core.xml'
+    doc_info = _remove_markup(zf.read(meta).decode('utf-8', 'surrogateescape'))
+    return f'{_body(zf, ext, depth).lower()} {doc_info.lower()}'
+
+
+def reference_text(filename):
+    """
+    Searchable text of a document, None when it is not one. filename may
+    name a document inside archives. Raises one of UNREADABLE when broken.
+    """
+    ext = get_filename_ext(filename)
+    if ext not in SUPPORTED_EXTENSIONS:
+        return None
+
+    outer, members = split_nested(filename)
+    if not zipfile.is_zipfile(outer):
+        return None
+
+    with open(outer, 'rb') as fp:
+        data = fp.read()
+    for member in members:
+        with zipfile.ZipFile(io.BytesIO(data)) as zf:
+            data = _member(zf, member)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return _text(zf, ext, len(members))
+
+
+def reference_match(text, mode, query, fold_accents=False):
+    """True when the text of reference_text() matches query in mode."""
+    if mode == 'phrase':
+        terms = [query.lower()]
+    else:
+        terms = [part.lower() for part in re.split(r'\s+', query.strip())]
+    if fold_accents:
+        text = fold(text)
+        terms = [fold(term) for term in terms]
+
+    if mode == 'and':
+        return all(term in text for term in terms)
+    return any(term in text for term in terms)
+
+
+def reference_result(filename, mode, query, fold_accents=False):
+    """True or False, or None for a document that cannot be read."""
+    try:
+        text = reference_text(filename)
+    except UNREADABLE:
+        return None
+
+    return text is not None and reference_match(text, mode, query, fold_accents)
+
+
+def _archive_members(zf, path, depth):
+    for name in zf.namelist():
+        ext = get_filename_ext(name)
+        if name.endswith('/'):
+            continue
+
+        member = path + NESTED_SEP + name
+        if ext in SUPPORTED_EXTENSIONS:
+            yield member
+        elif ext in ARCHIVE_EXTENSIONS and depth < DEFAULT_DEPTH:
+            # a broken archive holds no documents
+            try:
+                with zipfile.ZipFile(io.BytesIO(_member(zf, name))) as nested:
+                    yield from _archive_members(nested, member, depth + 1)
+            except UNREADABLE:
+                continue
+
+
+def documents(root, nested=True):
+    """Documents under root in walk order, and those inside its archives when nested."""
+    for directory, _, files in os.walk(root):
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            ext = get_filename_ext(name)
+            if ext in SUPPORTED_EXTENSIONS:
+                yield path
+            elif nested and ext in ARCHIVE_EXTENSIONS and zipfile.is_zipfile(path):
+                try:
+                    with zipfile.ZipFile(path) as zf:
+                        yield from _archive_members(zf, path, 1)
+                except UNREADABLE:
+                    continue
+
+
+# ── Engines ─────────────────────────────────────────────────────────
+
+
+def _result(extract, path, query):
+    try:
+        document = extract(path)
+    except BudgetExceeded:
+        return SKIPPED
+    except (KeyError, zipfile.BadZipfile, OSError):
+        return None
+    except Exception as err:  # a crash, reported as the result
+        return repr(err)
+
+    return document is not None and query.match_document(document)
+
+
+def _search_extract(root, paths, query):
+    return {path: _result(lambda path: extract_text(path, query), path, query) for path in paths}
+
+
+def _search_metered(root, paths, query):
+    # members are inflated chunk by chunk, counted by the meter
+    budget = Budget()
+    return {path: _result(lambda path: extract_text(path, query, budget), path, query) for path in paths}
+
+
+def _search_cache(root, paths, query):
+    # filled without the query, as by an earlier search, then searched
+    cache = TextCache(64 * 1024 * 1024)
+    results = {}
+    for path in paths:
+        _result(lambda path: extract_cached(cache, path), path, query)
+        results[path] = _result(lambda path: extract_cached(cache, path, query), path, query)
+    return results
+
+
+def _search_archive(root, paths, query):
+    # as the app does: archives are walked, documents in them never extracted by path
+    results = {}
+    walked = set()
+    for path in paths:
+        outer, members = split_nested(path)
+        if not members:
+            results[path] = _result(lambda path: extract_text(path, query), path, query)
+        elif outer not in walked:
+            walked.add(outer)
+            try:
+                for member, document, err in iter_archive(outer, query):
+                    if isinstance(err, BudgetExceeded):
+                        results[member] = SKIPPED
+                    else:
+                        results[member] = None if err is not None else query.match_document(document)
+            except (zipfile.BadZipfile, OSError):
+                pass
+    return results
+
+
+def _request(query, **request):
+    return {'mode': query.mode, 'content': query.text, 'ignore_accents': query.fold, **request}
+
+
+def _matched(paths, messages):
+    matches = {message['match'] for message in messages if 'match' in message}
+    return {path: path in matches for path in paths}
+
+
+def _search_server(root, paths, query):
+    messages = []
+    server = QueryServer(workers=2)
+    try:
+        server.search(_request(query, path=root), messages.append)
+    finally:
+        server.scheduler.close()
+    return _matched(paths, messages)
+
+
+def _search_shard(root, paths, query):
+    messages = []
+    with tempfile.TemporaryDirectory() as tmp:
+        index = os.path.join(tmp, 'shard.db')
+        build_shard(index, [root], warn=lambda msg: None)
+        ShardServer(index).search(_request(query), messages.append)
+    return _matched(paths, messages)
+
+
+ENGINES = {
+    'extract': Engine(_search_extract, nested=True, errors=True),
+    'metered': Engine(_search_metered, nested=True, errors=True),
+    'cache': Engine(_search_cache, nested=True, errors=True),
+    'archive': Engine(_search_archive, nested=True, errors=True),
+    'server': Engine(_search_server, nested=False, errors=False),
+    'shard': Engine(_search_shard, nested=False, errors=False),
+}
+
+
+def compare(root, query, engines=None, expected=None):
+    """
+    Mismatches of the engines (names of ENGINES, all by default) with the
+    reference on the documents under root. expected, the reference
+    results by path, is computed when not given.
+    """
+    if expected is None:
+        expected = {path: reference_result(path, query.mode, query.text, query.fold) for path in documents(root)}
+
+    mismatches = []
+    for name in engines or ENGINES:
+        engine = ENGINES[name]
+        paths = [path for path in expected if engine.nested or not split_nested(path)[1]]
+        try:
+            found = engine.search(root, paths, query)
+        except Exception as err:  # a crash is a mismatch on every document
+            found = dict.fromkeys(paths, repr(err))
+        for path in paths:
+            wanted = expected[path] if engine.errors else bool(expected[path])
+            if found.get(path, 'missing') not in (wanted, SKIPPED):
+                mismatches.append(Mismatch(name, path, wanted, found.get(path, 'missing')))
+
+    return mismatches
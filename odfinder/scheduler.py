@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import concurrent.futures
+import gettext
+import heapq
+import itertools
+import os
+import queue
+import threading
+
+from .utils import ARCHIVE_EXTENSIONS, SUPPORTED_EXTENSIONS, get_filename_ext
+
+ORDERS = ('walk', 'mtime-desc', 'size-asc', 'path')
+
+# Number of pending candidates kept in the priority queue. Ordering is exact
+# inside this window and approximate beyond it, which keeps memory flat on
+# huge trees while still surfacing likely hits long before the walk ends.
+# None orders exactly, keeping every candidate path until the walk ends.
+DEFAULT_WINDOW = 1024
+
+# workers of the shared pool busy on one filesystem at most
+DEFAULT_PER_MOUNT = 2
+
+# files the walk of a root gets ahead of the pool, when searching several
+_WALK_AHEAD = 64
+
+# documents, and the archives that may hold some
+_CANDIDATE_EXTENSIONS = SUPPORTED_EXTENSIONS | ARCHIVE_EXTENSIONS
+
+_ = gettext.gettext
+
+_visited_lock = threading.Lock()
+
+_ORDER_KEYS = {
+    'mtime-desc': lambda entry: -entry.stat().st_mtime,
+    'size-asc': lambda entry: entry.stat().st_size,
+    'path': lambda entry: entry.path,
+}
+
+
+class ScanProgress:
+    """
+    What the walk of one root has found so far. The candidate files of
+    the directories still to visit are estimated from the average of
+    those already visited.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.directories = 1  # found, the root included
+        self.visited = 0
+        self.files = 0  # candidates found
+        self.finished = False
+
+    def estimate(self):
+        """Candidate files under the root, None before its first directory is read."""
+        if self.finished:
+            return self.files
+        if not self.visited:
+            return None
+
+        return self.files + round((self.directories - self.visited) * self.files / self.visited)
+
+
+class Coverage:
+    """How much of its candidate files a search went through."""
+
+    def __init__(self):
+        self.scanned = 0
+        self.total = None  # when known exactly: the files of a narrowed search
+        self.missing_roots = []
+        self.complete = True  # every candidate was searched, or the results cannot change
+        self.progress = []
+
+    def walk(self, root):
+        """ScanProgress to pass to the walk of root."""
+        progress = ScanProgress(root)
+        self.progress.append(progress)
+        return progress
+
+    @property
+    def estimated_total(self):
+        if self.total is not None:
+            return self.total
+
+        estimates = [progress.estimate() for progress in self.progress]
+        known = [estimate for estimate in estimates if estimate is not None]
+        return max(self.scanned, sum(known)) if known else None
+
+    @property
+    def skipped_roots(self):
+        """Roots missing, and those not reached before the search stopped."""
+        return self.missing_roots + [progress.root for progress in self.progress if not progress.visited]
+
+    def as_dict(self):
+        return {
+            'scanned': self.scanned,
+            'estimated_total': self.estimated_total,
+            'skipped_roots': self.skipped_roots,
+            'complete': self.complete,
+        }
+
+    def percent(self):
+        """Share of the candidates searched, None while their number is unknown."""
+        total = self.estimated_total
+        return 100 * self.scanned // total if total else None
+
+    def summary(self):
+        if self.percent() is not None:
+            lines = [_('Searched %d of about %d files (%d%%)') % (self.scanned, self.estimated_total, self.percent())]
+        else:
+            lines = [_('Searched %d files') % self.scanned]
+        if self.skipped_roots:
+            lines.append(_('Skipped roots: %s') % ', '.join(self.skipped_roots))
+        lines.append(_('Results complete') if self.complete else _('Results partial'))
+        return lines
+
+
+def _first_visit(path, visited):
+    """Record directory path in visited by (dev, inode), False if it was there already."""
+    if visited is None:
+        return True
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+
+    key = (st.st_dev, st.st_ino)
+    # roots may be walked by several threads
+    with _visited_lock:
+        if key in visited:
+            return False
+
+        visited.add(key)
+    return True
+
+
+def walk_files(directory, visited=None, progress=None, stop=None):
+    for root, dirs, files in os.walk(directory):
+        if stop is not None and stop():
+            return
+        if progress is not None:
+            progress.visited += 1
+        if not _first_visit(root, visited):
+            dirs[:] = []
+            continue
+
+        if progress is not None:
+            progress.directories += len(dirs)
+            progress.files += len(files)
+        for file_ in files:
+            yield os.path.join(root, file_)
+
+    if progress is not None:
+        progress.finished = True
+
+
+def scan_documents(directory, visited=None, progress=None, stop=None):
+    stack = [directory]
+    while stack:
+        if stop is not None and stop():
+            return
+        path = stack.pop()
+        if progress is not None:
+            progress.visited += 1
+        if not _first_visit(path, visited):
+            continue
+
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                            if progress is not None:
+                                progress.directories += 1
+                        elif entry.is_file() and get_filename_ext(entry.name) in _CANDIDATE_EXTENSIONS:
+                            if progress is not None:
+                                progress.files += 1
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+    if progress is not None:
+        progress.finished = True
+
+
+def iter_files(directory, order='walk', window=DEFAULT_WINDOW, visited=None, progress=None, stop=None):
+    """
+    Candidate files under directory in order. Directories already in
+    visited, a set of (dev, inode) shared between roots, are skipped.
+    progress, a ScanProgress, follows the walk. The walk ends early, with
+    the files it holds left out, once stop() returns True.
+    """
+    if order == 'walk':
+        yield from walk_files(directory, visited, progress, stop)
+        return
+
+    key = _ORDER_KEYS[order]
+    counter = itertools.count()
+    heap = []
+    for entry in scan_documents(directory, visited, progress, stop):
+        try:
+            item = (key(entry), next(counter), entry.path)
+        except OSError:
+            continue
+
+        if window is None or len(heap) < window:
+            heapq.heappush(heap, item)
+        else:
+            yield heapq.heappushpop(heap, item)[2]
+
+    while heap and not (stop is not None and stop()):
+        yield heapq.heappop(heap)[2]
+
+
+def unique_roots(paths):
+    """paths that exist, without those naming the same directory as an earlier one."""
+    seen = set()
+    roots = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+
+        if (st.st_dev, st.st_ino) not in seen:
+            seen.add((st.st_dev, st.st_ino))
+            roots.append(path)
+
+    return roots
+
+
+def merge_roots(roots, process, workers, per_mount=DEFAULT_PER_MOUNT, order='walk', coverage=None, stop=None):
+    """
+    Yield (path, process(path)) for the files of every root, as they complete.
+
+    Every root is walked by a thread of its own, a few files ahead of the
+    pool, so a slow mount only holds up its own walk. One pool of workers
+    serves all roots, taking files from them in turn. At most per_mount
+    workers are busy on one filesystem, so a slow mount leaves the rest of
+    the pool to the others. Overlapping roots are walked once. coverage,
+    when given, follows the walk of every root; stop ends the walks early
+    (see iter_files()).
+    """
+    per_mount = max(1, per_mount)
+    visited = set()
+    devices = {}  # directory -> st_dev
+    closed = threading.Event()
+    # a token per file walked and per file processed: something may have changed
+    wakeups = queue.Queue()
+
+    def device(path):
+        directory = os.path.dirname(path)
+        if directory not in devices:
+            try:
+                devices[directory] = os.stat(directory).st_dev
+            except OSError:
+                devices[directory] = None
+        return devices[directory]
+
+    def stopped():
+        return closed.is_set() or (stop is not None and stop())
+
+    def walk(root, files):
+        progress = None if coverage is None else coverage.walk(root)
+        try:
+            for path in iter_files(root, order, visited=visited, progress=progress, stop=stopped):
+                if not _put(files, (path, device(path)), closed):
+                    return
+                wakeups.put(None)
+        finally:
+            _put(files, None, closed)
+            wakeups.put(None)
+
+    heads = []  # [files walked, file waiting for its filesystem]
+    for root in roots:
+        files = queue.Queue(_WALK_AHEAD)
+        threading.Thread(target=walk, args=(root, files), name='odfinder-walk', daemon=True).start()
+        heads.append([files, None])
+
+    busy = collections.Counter()
+    pending = {}
+    executor = concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix='odfinder-scan')
+    try:
+        while heads or pending:
+            for head in list(heads):
+                if len(pending) == workers:
+                    break
+                if head[1] is None:
+                    try:
+                        head[1] = head[0].get_nowait()
+                    except queue.Empty:
+                        continue  # still walking
+                    if head[1] is None:
+                        heads.remove(head)
+                        continue
+
+                path, dev = head[1]
+                if busy[dev] < per_mount:
+                    busy[dev] += 1
+                    future = executor.submit(process, path)
+                    future.add_done_callback(lambda _: wakeups.put(None))
+                    pending[future] = head[1]
+                    head[1] = None
+
+            done = [future for future in pending if future.done()]
+            if not done:
+                if heads or pending:
+                    # what happened while waiting is looked at all at once
+                    wakeups.get()
+                    while not wakeups.empty():
+                        wakeups.get_nowait()
+                continue
+
+            for future in done:
+                path, dev = pending.pop(future)
+                busy[dev] -= 1
+                yield path, future.result()
+    finally:
+        closed.set()
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _put(files, item, closed):
+    """Queue item for the dispatcher unless it has stopped taking files, True once queued."""
+    while not closed.is_set():
+        try:
+            files.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
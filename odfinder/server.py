@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Resident query server.
+
+Keeps the extracted text of the documents it has seen, the compiled
+queries and a pool of workers alive between searches. Clients talk JSON
+lines over a Unix domain socket: one request per line, answered by a
+stream of ``match``/``warning`` messages and a final ``done`` (or
+``error``) message.
+"""
+
+import collections
+import errno
+import gettext
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+import zipfile
+
+from .cache import DEFAULT_CACHE_SIZE, TextCache, extract_cached
+from .documents import Budget, BudgetExceeded, Cancelled, describe_error
+from .query import compile_query
+from .scheduler import Coverage, iter_files
+from .utils import SUPPORTED_EXTENSIONS, get_filename_ext
+
+_ = gettext.gettext
+
+DEFAULT_WORKERS = 4
+
+
+class SearchJob:
+    def __init__(self, query, files, emit, deadline=None):
+        self.query = query
+        self.budget = None
+        self.files = 0
+        self.matches = 0
+        self.scanned = 0  # files handed to the workers
+        self.cancelled = False
+        self.deadline = None if deadline is None else time.monotonic() + deadline
+        self.timed_out = False  # files were left unsearched at the deadline
+        self.done = threading.Event()
+
+        self._files = iter(files)
+        self._emit = emit
+        self._lock = threading.Lock()
+        self._emit_lock = threading.Lock()
+        self._pending = 0
+        self._exhausted = False
+
+    def next_file(self):
+        with self._lock:
+            if not self._exhausted and not self.cancelled:
+                try:
+                    self._pending += 1
+                    if self.past_deadline():
+                        self.timed_out = True
+                        raise StopIteration
+                    filename = next(self._files)
+                    self.scanned += 1
+                    return filename
+                except StopIteration:
+                    self._pending -= 1
+
+            self._exhausted = True
+            if not self._pending:
+                self.done.set()
+
+            return None
+
+    def past_deadline(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def stopped(self):
+        return self.cancelled or self.past_deadline()
+
+    def file_done(self, counted, matched):
+        with self._lock:
+            self.files += counted
+            self.matches += matched
+            self._pending -= 1
+            if self._exhausted and not self._pending:
+                self.done.set()
+
+    def emit(self, message):
+        try:
+            with self._emit_lock:
+                self._emit(message)
+        except OSError:
+            # the client went away: stop feeding its files to the workers
+            self.cancelled = True
+
+
+class FairScheduler:
+    """
+    Worker pool shared by all running searches.
+
+    Jobs are served round-robin one file at a time, so a huge search cannot
+    starve a small one started after it.
+    """
+
+    def __init__(self, process, workers=DEFAULT_WORKERS):
+        self._process = process
+        self._jobs = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._work, name=f'odfinder-worker-{i}', daemon=True) for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, job):
+        with self._cond:
+            self._jobs.append(job)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._jobs and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                job = self._jobs.popleft()
+
+            filename = job.next_file()
+            if filename is None:
+                continue
+
+            with self._cond:
+                self._jobs.append(job)
+                self._cond.notify()
+
+            self._process(job, filename)
+
+
+class QueryServer:
+    def __init__(
+        self,
+        workers=DEFAULT_WORKERS,
+        cache_size=DEFAULT_CACHE_SIZE,
+        max_size=None,
+        max_members=None,
+        max_time=None,
+        governor=None,
+    ):
+        self.cache = TextCache(cache_size * 1024 * 1024)
+        self.limits = {'max_size': max_size, 'max_members': max_members, 'max_time': max_time}
+        self.governor = governor  # shared by the workers, so they stay inside it together
+        self.scheduler = FairScheduler(self._process, workers)
+        self.ready = threading.Event()  # set once the socket accepts connections
+        self._server = None
+
+    def search(self, request, emit):
+        """Run one request, streaming its messages to emit. Returns the final message."""
+        try:
+            query = compile_query(
+                request.get('mode', 'or'), request.get('content', ''), bool(request.get('ignore_accents'))
+            )
+        except ValueError as err:
+            message = {'error': _("Error: unknown search mode '%s'") % err}
+            emit(message)
+            return message
+
+        if not os.path.exists(request.get('path', '')):
+            message = {'error': _('Error: path %s does not exist') % request.get('path')}
+            emit(message)
+            return message
+
+        coverage = Coverage()
+        files = iter_files(request['path'], request.get('order', 'walk'), progress=coverage.walk(request['path']))
+        job = SearchJob(query, files, emit, request.get('deadline'))
+        job.budget = Budget(cancelled=job.stopped, **self.limits)
+        self.scheduler.submit(job)
+        job.done.wait()
+
+        message = {'done': True, 'files': job.files, 'matches': job.matches}
+        if job.deadline is not None:
+            coverage.scanned = job.scanned
+            coverage.complete = not job.timed_out
+            message.update(complete=coverage.complete, coverage=coverage.as_dict())
+        job.emit(message)
+        return message
+
+    def _read_document(self, job, filename):
+        try:
+            return extract_cached(self.cache, filename, job.query, job.budget)
+        except Cancelled:
+            if job.past_deadline():
+                job.timed_out = True
+            return None
+        except (KeyError, zipfile.BadZipfile, IOError, BudgetExceeded) as err:
+            job.emit({'warning': describe_error(filename, err)})
+            return None
+
+    def _process(self, job, filename):
+        document = None
+        matched = False
+        try:
+            if get_filename_ext(filename) in SUPPORTED_EXTENSIONS:
+                if self.governor is not None:
+                    self._govern(filename)
+                started = time.thread_time()
+                document = self._read_document(job, filename)
+                matched = document is not None and job.query.match_document(document)
+                if matched:
+                    job.emit({'match': filename})
+                if self.governor is not None:
+                    self.governor.after_document(time.thread_time() - started)
+        finally:
+            job.file_done(document is not None, matched)
+
+    def _govern(self, filename):
+        try:
+            self.governor.before_read(os.path.getsize(filename))
+        except OSError:
+            pass
+
+        self.cache.relieve(self.governor.memory_exceeded())
+
+    def serve(self, socket_path):
+        try:
+            self._server = listen(socket_path, self)
+        except OSError:
+            self.scheduler.close()
+            raise
+
+        self.ready.set()
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            self.scheduler.close()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        def emit(message):
+            self.wfile.write(json.dumps(message).encode() + b'\n')
+            self.wfile.flush()
+
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                emit({'error': _('Error: malformed request')})
+                continue
+
+            try:
+                self.server.query_server.search(request, emit)
+            except OSError:
+                return  # the client went away
+
+
+def parse_address(address):
+    """(host, port) for HOST:PORT, address itself (a Unix socket path) otherwise."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and os.sep not in address:
+        return host or 'localhost', int(port)
+
+    return address
+
+
+def listen(address, owner):
+    """
+    Threaded server answering JSON lines requests with owner.search().
+    address is a Unix socket path or (host, port); port 0 picks a free one.
+
+    There is no access control in the protocol: a Unix socket is only
+    open to its owner, and a stale one left by an earlier run is replaced,
+    but nothing else is: not a file, nor a socket a server still listens
+    on. A TCP port is open to anyone who can reach it.
+    """
+    if isinstance(address, tuple):
+        server = socketserver.ThreadingTCPServer(address, _RequestHandler, bind_and_activate=False)
+        server.allow_reuse_address = True
+        server.server_bind()
+        server.server_activate()
+    else:
+        try:
+            mode = os.lstat(address).st_mode
+        except FileNotFoundError:
+            pass
+        else:
+            if not stat.S_ISSOCK(mode):
+                raise FileExistsError(errno.EEXIST, _('File exists and is not a socket'), address)
+            _unlink_stale(address)
+
+        server = socketserver.ThreadingUnixStreamServer(address, _RequestHandler, bind_and_activate=False)
+        server.server_bind()
+        # before listen(): no one else may connect in between
+        os.chmod(address, 0o600)
+        server.server_activate()
+
+    server.daemon_threads = True
+    server.query_server = owner
+    return server
+
+
+def _unlink_stale(address):
+    """Remove the Unix socket address if no server listens on it any more."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(address)
+        except ConnectionRefusedError:
+            os.unlink(address)
+            return
+
+    raise OSError(errno.EADDRINUSE, os.strerror(errno.EADDRINUSE), address)
+
+
+def query(address, request, timeout=None):
+    """
+    Send one request to a running server and yield its messages. address
+    is a Unix socket path or (host, port); timeout bounds each wait for
+    the server, raising socket.timeout.
+    """
+    family = socket.AF_INET if isinstance(address, tuple) else socket.AF_UNIX
+    with socket.socket(family, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(address)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as rfile:
+            for line in rfile:
+                message = json.loads(line)
+                yield message
+                if 'done' in message or 'error' in message:
+                    return
@@ -0,0 +1,399 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Sharded search for archives too large for one machine.
+
+Each node extracts the documents of some roots, or of a hash partition of
+the paths (see shard_of()), into its own SQLite shard file and answers
+queries on it with a ShardServer. A coordinator (Gather) sends every
+query to all the shard servers and merges their answers into one stream,
+leaving out and reporting the shards that fail or do not answer in time.
+
+Shards keep the extracted text rather than an inverted index, so that
+they match substrings with the same expressions as a local search:
+
+    python -m odfinder.shard build --index FILE [--shard I --shards N] ROOT...
+    python -m odfinder.shard serve --index FILE [--listen HOST:PORT|SOCKET]
+
+Servers listen on the loopback interface by default: the protocol has no
+access control, so one reachable from other hosts answers anyone.
+"""
+
+import argparse
+import collections
+import gettext
+import ipaddress
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import urllib.parse
+import zipfile
+import zlib
+
+from . import server
+from .documents import Budget, BudgetExceeded, Document, describe_error, extract_text, fold_document
+from .query import compile_query
+from .ranking import Candidate, Ranker, make_candidate
+from .scheduler import iter_files, unique_roots
+from .utils import SUPPORTED_EXTENSIONS, get_filename_ext
+
+_ = gettext.gettext
+
+DEFAULT_TIMEOUT = 30.0  # seconds
+
+# reachable from this host only, see main()
+DEFAULT_LISTEN = '127.0.0.1:7400'
+
+# documents written between commits of a build
+BATCH = 256
+
+# paths are stored as bytes: they need not be valid UTF-8
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS documents ('
+    ' path BLOB PRIMARY KEY,'
+    ' size INTEGER NOT NULL,'
+    ' mtime_ns INTEGER NOT NULL,'
+    ' content BLOB NOT NULL,'
+    ' meta BLOB NOT NULL,'
+    ' folded BLOB NOT NULL'
+    ')'
+)
+
+
+def shard_of(path, shards):
+    """Shard of path in a hash partition of shards, stable across nodes and runs."""
+    return zlib.crc32(os.fsencode(path)) % shards
+
+
+def build_shard(index_path, roots, shard=0, shards=1, budget=None, warn=print):
+    """
+    Bring the shard file index_path up to date with the documents under
+    roots that hash to shard. Unchanged documents (same size and mtime) are
+    not read again. Documents gone, or that can no longer be extracted, are
+    dropped. Returns a Counter of added, updated, unchanged, removed and
+    failed documents.
+    """
+    counts = collections.Counter()
+    seen = set()
+    db = sqlite3.connect(index_path)
+    try:
+        db.execute(SCHEMA)
+        known = {
+            bytes(path): (size, mtime_ns)
+            for path, size, mtime_ns in db.execute('SELECT path, size, mtime_ns FROM documents')
+        }
+        visited = set()
+        for root in unique_roots(roots):
+            for path in iter_files(root, visited=visited):
+                if get_filename_ext(path) not in SUPPORTED_EXTENSIONS or shard_of(path, shards) != shard:
+                    continue
+
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+
+                key = os.fsencode(path)
+                if known.get(key) == (st.st_size, st.st_mtime_ns):
+                    seen.add(key)
+                    counts['unchanged'] += 1
+                    continue
+
+                # kept only once extracted again, the old text is dropped otherwise
+
+                try:
+                    document = extract_text(path, budget=budget)
+                except (KeyError, zipfile.BadZipfile, IOError, BudgetExceeded) as err:
+                    warn(describe_error(path, err))
+                    counts['failed'] += 1
+                    continue
+
+                if document is None:
+                    continue
+
+                document = fold_document(document)
+                db.execute(
+                    'INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?, ?, ?)',
+                    (
+                        key,
+                        st.st_size,
+                        st.st_mtime_ns,
+                        zlib.compress(document.content),
+                        zlib.compress(document.meta_xml),
+                        zlib.compress(document.folded),
+                    ),
+                )
+                seen.add(key)
+                counts['updated' if key in known else 'added'] += 1
+                if (counts['added'] + counts['updated']) % BATCH == 0:
+                    db.commit()
+
+        gone = known.keys() - seen
+        db.executemany('DELETE FROM documents WHERE path = ?', ((path,) for path in gone))
+        counts['removed'] = len(gone)
+        db.commit()
+    finally:
+        db.close()
+
+    return counts
+
+
+class ShardServer:
+    """
+    Answers the requests of server.query() on a shard file: a stream of
+    match messages and a final done (or error) message. A request with
+    'top' set gets the statistics message of the shard and its own top k
+    matches, each with its 'candidate' to be ranked again by the coordinator.
+    """
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.ready = threading.Event()  # set once the socket accepts connections
+        self._server = None
+
+    def search(self, request, emit):
+        try:
+            query = compile_query(
+                request.get('mode', 'or'), request.get('content', ''), bool(request.get('ignore_accents'))
+            )
+        except ValueError as err:
+            message = {'error': _("Error: unknown search mode '%s'") % err}
+            emit(message)
+            return message
+
+        ranker = Ranker(request['top'], len(query.terms)) if request.get('top') else None
+        files = matches = 0
+        try:
+            # read only, so a missing shard is an error rather than a new empty one
+            uri = 'file:{}?mode=ro'.format(urllib.parse.quote(os.path.abspath(self.index_path)))
+            db = sqlite3.connect(uri, uri=True)
+            try:
+                for path, mtime_ns, content, meta, folded in db.execute(
+                    'SELECT path, mtime_ns, content, meta, folded FROM documents'
+                ):
+                    files += 1
+                    # metadata only queries leave the body compressed
+                    document = Document(
+                        zlib.decompress(content) if query.needs_body else None,
+                        zlib.decompress(meta),
+                        zlib.decompress(folded) if query.fold else None,
+                    )
+                    if ranker is not None:
+                        ranker.observe()
+                    if query.search_document(document) is None:
+                        continue
+
+                    matches += 1
+                    if ranker is None:
+                        emit({'match': os.fsdecode(path)})
+                    else:
+                        ranker.add(make_candidate(os.fsdecode(path), query, document, mtime_ns / 1e9))
+            finally:
+                db.close()
+        except sqlite3.Error as err:
+            message = {'error': _('Error: shard %s cannot be read: %s') % (self.index_path, str(err))}
+            emit(message)
+            return message
+
+        if ranker is not None:
+            emit({'statistics': ranker.statistics()})
+            for candidate in ranker.candidates():
+                emit({'match': candidate.path, 'candidate': candidate._asdict()})
+
+        message = {'done': True, 'files': files, 'matches': matches}
+        emit(message)
+        return message
+
+    def serve(self, address):
+        self._server = server.listen(address, self)
+        self.ready.set()
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+            if isinstance(address, str) and os.path.exists(address):
+                os.unlink(address)
+
+    @property
+    def address(self):
+        return self._server.server_address if self._server is not None else None
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class Gather:
+    """
+    Matches of every shard server as one stream of paths.
+
+    Shards are asked in parallel. One that fails, or has not finished
+    timeout seconds after the search started, is left out and listed in
+    missing: the results are then partial. With a ranker, the top k of
+    every shard are ranked again under the statistics of all of them, and
+    the overall top k yielded, best first, once every shard has answered.
+    """
+
+    def __init__(self, addresses, request, timeout=DEFAULT_TIMEOUT, ranker=None):
+        self.addresses = list(addresses)
+        self.request = dict(request, top=ranker.k) if ranker is not None else dict(request)
+        self.timeout = timeout
+        self.ranker = ranker
+        self.files = 0
+        self.matches = 0
+        self.warnings = []
+        self.missing = {}  # address -> reason
+
+    @property
+    def partial(self):
+        return bool(self.missing)
+
+    def _ask(self, address, messages):
+        try:
+            for message in server.query(server.parse_address(address), self.request, self.timeout):
+                messages.put((address, message))
+                if 'done' in message or 'error' in message:
+                    return
+            reason = _('connection closed before the end of the results')
+        except TimeoutError:
+            reason = _('no answer within %g seconds') % self.timeout
+        except (OSError, ValueError) as err:
+            reason = str(err) or err.__class__.__name__
+
+        messages.put((address, {'error': reason}))
+
+    def __iter__(self):
+        messages = queue.Queue()
+        for address in self.addresses:
+            threading.Thread(target=self._ask, args=(address, messages), daemon=True).start()
+
+        deadline = time.monotonic() + self.timeout
+        waiting = set(self.addresses)
+        candidates = []
+        while waiting:
+            try:
+                address, message = messages.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                for address in waiting:
+                    self.missing[address] = _('no answer within %g seconds') % self.timeout
+                break
+
+            if address not in waiting:
+                continue
+            if 'match' in message:
+                if self.ranker is None:
+                    yield message['match']
+                else:
+                    candidates.append(Candidate(**message['candidate']))
+            elif 'statistics' in message:
+                self.ranker.merge(message['statistics'])
+            elif 'warning' in message:
+                self.warnings.append(message['warning'])
+            elif 'error' in message:
+                self.missing[address] = message['error']
+                waiting.discard(address)
+            elif 'done' in message:
+                self.files += message['files']
+                self.matches += message['matches']
+                waiting.discard(address)
+
+        if self.ranker is not None:
+            for candidate in candidates:
+                self.ranker.offer(candidate)
+            for candidate in self.ranker.candidates():
+                yield candidate.path
+
+
+def _is_loopback(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False  # a host name, which may resolve to anything
+
+
+def main():
+    parser = argparse.ArgumentParser(description=_('Build or serve a shard of a sharded odfinder index'))
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help=_('extract the documents of a shard into its shard file'))
+    build.add_argument('--index', required=True, metavar='FILE', help=_('shard file to create or update'))
+    build.add_argument('--shard', type=int, default=0, metavar='I', help=_('shard of the paths kept (0 by default)'))
+    build.add_argument(
+        '--shards', type=int, default=1, metavar='N', help=_('number of shards paths are hashed into (1 by default)')
+    )
+    build.add_argument('--max-file-size', type=int, metavar='MB', help=_('skip documents inflating to over MB MiB'))
+    build.add_argument('roots', nargs='+', metavar='ROOT', help=_('directory to index'))
+
+    serve = commands.add_parser('serve', help=_('answer queries on a shard file'))
+    serve.add_argument('--index', required=True, metavar='FILE', help=_('shard file to search'))
+    serve.add_argument(
+        '--listen',
+        default=DEFAULT_LISTEN,
+        metavar='ADDRESS',
+        help=_('HOST:PORT (port 0 picks a free one) or Unix socket path (%s by default)') % DEFAULT_LISTEN,
+    )
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        budget = Budget(max_size=args.max_file_size * 1024 * 1024 if args.max_file_size else None)
+        counts = build_shard(args.index, args.roots, args.shard, args.shards, budget)
+        print(
+            _('Added %d, updated %d, unchanged %d, removed %d, failed %d')
+            % (counts['added'], counts['updated'], counts['unchanged'], counts['removed'], counts['failed'])
+        )
+        return
+
+    shard_server = ShardServer(args.index)
+    address = server.parse_address(args.listen)
+    if isinstance(address, tuple) and not _is_loopback(address[0]):
+        print(
+            _('Warning: %s is reachable from other hosts and anyone reaching it can search the shard') % args.listen,
+            file=sys.stderr,
+        )
+    errors = []
+
+    def serve():
+        try:
+            shard_server.serve(address)
+        except OSError as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    while not shard_server.ready.wait(0.1):
+        if not thread.is_alive():
+            print(_('Error: cannot listen on %s: %s') % (args.listen, errors[0].strerror), file=sys.stderr)
+            sys.exit(1)
+    # the address actually bound, for callers asking for a free port
+    bound = shard_server.address
+    print(_('Listening on %s') % ('%s:%d' % bound[:2] if isinstance(bound, tuple) else bound), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        shard_server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+Context around the hits of a result, built only when a result is shown.
+"""
+
+import collections
+import itertools
+import re
+from xml.sax.saxutils import escape
+
+from .documents import searchable_text
+from .normalize import original_span
+from .utils import remove_xml_markup
+
+DEFAULT_SNIPPETS = 3  # per document
+DEFAULT_CONTEXT = 40  # characters on each side of a hit
+
+ELLIPSIS = '…'
+
+Snippet = collections.namedtuple('Snippet', ('before', 'match', 'after'))
+
+_RE_SPACES = re.compile(r'\s+')
+
+
+def _char_start(data, offset):
+    # step back out of a UTF-8 continuation byte
+    while 0 < offset < len(data) and data[offset] & 0xC0 == 0x80:
+        offset -= 1
+    return offset
+
+
+def _decode(data):
+    return _RE_SPACES.sub(' ', data.decode('utf-8', 'replace'))
+
+
+def _hits(query, document, limit):
+    # the first limit hits of every term, overlaps are dropped later
+    text = searchable_text(document, query.fold)
+    spans = []
+    for term, regex in zip(query.terms, query.bytes_regexes):
+        if term:
+            spans.extend(hit.span() for hit in itertools.islice(regex.finditer(text), limit))
+    return spans
+
+
+def make_snippets(query, document, spans=None, limit=DEFAULT_SNIPPETS, context=DEFAULT_CONTEXT):
+    """
+    Snippets around the hits of query in document, at most limit of them.
+
+    spans are the hits recorded while searching; they are looked for again
+    when missing (results of a query server). They hold one hit per term
+    at most, so more are looked for when they are fewer than limit.
+    """
+    if spans is None:
+        spans = query.search_document(document) or []
+    if spans and len(spans) < limit:
+        spans = _hits(query, document, limit)
+
+    # offsets of searchable_text(), which only lowercases this
+    text = b' '.join((document.content or b'', remove_xml_markup(document.meta_xml)))
+    snippets = []
+    last_end = 0
+    for start, end in sorted(spans):
+        if len(snippets) == limit:
+            break
+        if start == end:
+            continue  # empty query
+        if query.fold:
+            start, end = original_span(text, start, end)
+        if snippets and start < last_end:
+            continue  # already shown
+
+        # bytes per character vary, 4 is the most UTF-8 needs
+        low = _char_start(text, max(0, start - 4 * context))
+        high = _char_start(text, end + 4 * context)
+        before = _decode(text[low:start])
+        after = _decode(text[end:high])
+        snippets.append(
+            Snippet(
+                (ELLIPSIS if len(before) > context or low > 0 else '') + before[-context:],
+                _decode(text[start:end]),
+                after[:context] + (ELLIPSIS if len(after) > context or high < len(text) else ''),
+            )
+        )
+        last_end = end
+
+    return snippets
+
+
+def snippets_text(snippets, bold=False):
+    template = '\x1b[1m%s\x1b[0m' if bold else '%s'
+    return [snippet.before + template % snippet.match + snippet.after for snippet in snippets]
+
+
+def snippets_markup(snippets):
+    """Pango markup: one line per snippet, hits in bold."""
+    return '\n'.join(
+        f'{escape(snippet.before)}<b>{escape(snippet.match)}</b>{escape(snippet.after)}' for snippet in snippets
+    )
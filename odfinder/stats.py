@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2017-2026 Jose Antonio Chavarría <jachavar@gmail.com>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+import gettext
+import time
+
+_ = gettext.gettext
+
+
+class SearchStats:
+    def __init__(self, milestone=10):
+        self.milestone = milestone
+        self.start()
+
+    def start(self):
+        self.started = time.monotonic()
+        self.finished = None
+        self.results = 0
+        self.first_result = None
+        self.milestone_result = None
+
+    def stop(self):
+        self.finished = time.monotonic()
+
+    def elapsed(self):
+        end = self.finished if self.finished is not None else time.monotonic()
+        return end - self.started
+
+    def add_result(self):
+        self.results += 1
+        if self.results == 1:
+            self.first_result = self.elapsed()
+        if self.results == self.milestone:
+            self.milestone_result = self.elapsed()
+
+    @staticmethod
+    def _seconds(value):
+        return '-' if value is None else f'{value:.3f} s'
+
+    def summary(self, files):
+        return [
+            _('Files scanned: %d') % files,
+            _('Matches: %d') % self.results,
+            _('Elapsed: %s') % self._seconds(self.elapsed()),
+            _('Time to first result: %s') % self._seconds(self.first_result),
+            _('Time to %d results: %s') % (self.milestone, self._seconds(self.milestone_result)),
+        ]
@@ -21,9 +21,45 @@ import sys
 
 _RE_COMMENTS = re.compile('<!--.*?-->', re.DOTALL)
 _RE_TAGS = re.compile('<[^>]*>', re.DOTALL)
+_RE_BYTES_COMMENTS = re.compile(b'<!--.*?-->', re.DOTALL)
+_RE_BYTES_TAGS = re.compile(b'<[^>]*>', re.DOTALL)
 
 _PKG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# OpenOffice.org / LibreOffice documents
+ODF_EXTENSIONS = (
+    'sxw', 'stw',
+    'sxc', 'stc',
+    'sxi', 'sti',
+    'sxg',
+    'sxm',
+    'sxd', 'std',
+    'odt', 'ott',
+    'odp', 'otp',
+    'odf',
+    'odg', 'otg',
+    'ods', 'ots',
+)
+
+# MS-Office (>= 2007) documents
+OOXML_EXTENSIONS = (
+    'docx', 'dotx',
+    'xlsx', 'xltx',
+)
+
+# MS-Office (>= 2007) MS-PowerPoint documents
+PPTX_EXTENSIONS = (
+    'pptx',
+)
+
+SUPPORTED_EXTENSIONS = frozenset(ODF_EXTENSIONS + OOXML_EXTENSIONS + PPTX_EXTENSIONS)
+
+# plain archives searched for the documents inside them
+ARCHIVE_EXTENSIONS = frozenset(('zip',))
+
+# separates an archive from the path of a member: outer.zip!/dir/inner.odt
+NESTED_SEP = '!/'
+
 
 def get_ui_resource(name):
     installed = os.path.join(sys.prefix, 'share', 'odfinder', 'ui', name)
@@ -34,6 +70,12 @@ def get_ui_resource(name):
 
 
 def remove_xml_markup(s, replace_with_space=False):
+    # UTF-8 continuation bytes never look like '<' or '>', so raw member
+    # bytes can be stripped without decoding them first
+    if isinstance(s, bytes):
+        s = _RE_BYTES_COMMENTS.sub(b'', s)
+        return _RE_BYTES_TAGS.sub(b' ' if replace_with_space else b'', s)
+
     s = _RE_COMMENTS.sub('', s)
     s = _RE_TAGS.sub(' ' if replace_with_space else '', s)
     return s
@@ -42,3 +84,12 @@ def remove_xml_markup(s, replace_with_space=False):
 def get_filename_ext(filename):
     _, ext = os.path.splitext(filename)
     return ext.lstrip('.').lower()
+
+
+def split_nested(path):
+    """(file, members) of a path that may name a document inside archives."""
+    if NESTED_SEP not in path or os.path.exists(path):
+        return path, []
+
+    outer, *members = path.split(NESTED_SEP)
+    return outer, members
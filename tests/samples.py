@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""Hand-built and random documents shared by the test modules."""
+
+import io
+import os
+import zipfile
+
+CONTENT_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+    ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
+    '<office:body><office:text>'
+    '<text:p>Migración exitosa a GTK4 con búsquedas avanzadas</text:p>'
+    '</office:text></office:body></office:document-content>'
+)
+
+META_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-meta xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/">'
+    '<office:meta><dc:title>Documento de prueba</dc:title></office:meta>'
+    '</office:document-meta>'
+)
+
+DOCX_DOCUMENT_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:body><w:p><w:r><w:t>Informe de auditoría</w:t></w:r></w:p></w:body></w:document>'
+)
+
+DOCX_CORE_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/">'
+    '<dc:title>Auditoría</dc:title></cp:coreProperties>'
+)
+
+PPTX_SLIDE_XML = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<p:sld xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
+    ' xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
+    '<p:cSld><p:spTree><p:sp><p:txBody><a:p><a:r>'
+    '<a:t>Diapositiva sobre rendimiento</a:t>'
+    '</a:r></a:p></p:txBody></p:sp></p:spTree></p:cSld></p:sld>'
+)
+
+
+def make_odt(path, content_xml=CONTENT_XML, meta_xml=META_XML):
+    with zipfile.ZipFile(str(path), 'w') as zf:
+        zf.writestr('content.xml', content_xml)
+        zf.writestr('meta.xml', meta_xml)
+
+
+def make_docx(path, document_xml=DOCX_DOCUMENT_XML, core_xml=DOCX_CORE_XML):
+    with zipfile.ZipFile(str(path), 'w') as zf:
+        zf.writestr('word/document.xml', document_xml)
+        zf.writestr('docProps/core.xml', core_xml)
+
+
+def make_pptx(path, slide_xml=PPTX_SLIDE_XML, core_xml=DOCX_CORE_XML):
+    with zipfile.ZipFile(str(path), 'w') as zf:
+        zf.writestr('ppt/slides/slide1.xml', slide_xml)
+        zf.writestr('docProps/core.xml', core_xml)
+
+
+# ── Random documents ────────────────────────────────────────────────
+
+# accents composed and decomposed, case changes that are not one to one,
+# compatibility characters, entities left as they are and non-Latin text;
+# no capital sigma, whose lowercase form depends on context (see reference)
+RANDOM_WORDS = (
+    'informe',
+    'Migración',
+    'ÁRBOL',
+    'niño',
+    'Über',
+    'café',
+    'ﬁcha',
+    'STRAẞE',
+    'straße',
+    'İstanbul',
+    'AT&amp;T',
+    '&lt;b&gt;',
+    '&#233;t&#xE9;',
+    '€100',
+    '中文',
+    'Ωμέγα',
+    'x²',
+    'GTK4',
+    'a-b',
+    'façade',
+)
+
+RANDOM_MEMBERS = {
+    'odt': ('content.xml', 'Object 1/content.xml'),
+    'ods': ('content.xml',),
+    'docx': ('word/document.xml', 'word/glossary/document.xml'),
+    'xlsx': ('xl/sharedStrings.xml',),
+    'pptx': ('ppt/slides/slide1.xml', 'ppt/slides/slide2.xml'),
+}
+
+
+def random_text(rng, words):
+    return ' '.join(rng.choice(RANDOM_WORDS) for _ in range(words))
+
+
+def random_markup(rng, text):
+    """text in XML, with tags and comments cutting through words at random."""
+    parts = ['<text:p>']
+    for char in text:
+        if rng.random() < 0.05:
+            parts.append(rng.choice(('<text:span>', '</text:span>', '<w:t xml:space="preserve">', '<!-- nota -->')))
+        parts.append(char)
+    parts.append('</text:p>')
+    return ''.join(parts)
+
+
+def random_document(rng, ext, depth=0):
+    """Bytes of a random document of type ext, and the words in its body."""
+    words = random_text(rng, rng.randint(0, 30))
+    members = RANDOM_MEMBERS[ext]
+    cut = sorted(rng.randint(0, len(words)) for _ in members[1:])
+    bodies = [words[start:end] for start, end in zip([0] + cut, cut + [len(words)])]
+    meta = 'meta.xml' if ext in ('odt', 'ods') else 'docProps/core.xml'
+
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, 'w', rng.choice((zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED))) as zf:
+        for name, body in zip(members, bodies):
+            zf.writestr(name, random_markup(rng, body))
+        if rng.random() < 0.9:
+            zf.writestr(meta, f'<meta><dc:title>{random_text(rng, 2)}</dc:title></meta>')
+        if ext == 'docx' and depth < 4 and rng.random() < 0.3:
+            embedded, _ = random_document(rng, 'docx', depth + 1)
+            zf.writestr('word/embeddings/object.docx', embedded)
+    return data.getvalue(), words
+
+
+def damage(rng, data):
+    """data broken in one of the ways documents are found broken."""
+    how = rng.choice(('truncate', 'flip', 'garbage', 'empty', 'utf8'))
+    if how == 'truncate':
+        return data[: rng.randint(0, len(data))]
+    if how == 'flip':
+        position = rng.randrange(len(data))
+        return data[:position] + bytes([data[position] ^ 0xFF]) + data[position + 1 :]
+    if how == 'garbage':
+        return bytes(rng.randrange(256) for _ in range(rng.randint(1, 200)))
+    if how == 'empty':
+        return b''
+    # invalid UTF-8 does not stop a document from being searched
+    return data.replace(b'</text:p>', b'\xff\xfe</text:p>', 1)
+
+
+def make_random_tree(directory, rng, files=20):
+    """Random, sometimes broken, documents and archives; returns the words used."""
+    words = []
+    for i in range(files):
+        ext = rng.choice(tuple(RANDOM_MEMBERS) + ('zip',))
+        if ext == 'zip':
+            data = io.BytesIO()
+            with zipfile.ZipFile(data, 'w', rng.choice((zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED))) as zf:
+                for j in range(rng.randint(0, 3)):
+                    member_ext = rng.choice(tuple(RANDOM_MEMBERS))
+                    member, member_words = random_document(rng, member_ext)
+                    zf.writestr(f'dir/doc{j}.{member_ext}', member)
+                    words.append(member_words)
+                if rng.random() < 0.3:
+                    inner, inner_words = random_document(rng, 'odt')
+                    nested = io.BytesIO()
+                    with zipfile.ZipFile(nested, 'w') as nested_zf:
+                        nested_zf.writestr('inner.odt', inner)
+                    zf.writestr('nested.zip', nested.getvalue())
+                    words.append(inner_words)
+            data = data.getvalue()
+        else:
+            data, document_words = random_document(rng, ext)
+            words.append(document_words)
+
+        if rng.random() < 0.15:
+            data = damage(rng, data)
+        path = os.path.join(str(directory), f'd{i % 3}', f'doc{i}.{ext}')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fp:
+            fp.write(data)
+
+    return words
+
+
+def random_query(rng, words):
+    """(mode, text) often hitting the words of a random tree."""
+    text = rng.choice(words) if words and rng.random() < 0.8 else random_text(rng, 2)
+    if text and rng.random() < 0.7:
+        start = rng.randrange(len(text))
+        text = text[start : start + rng.randint(1, 15)]
+    if rng.random() < 0.3:
+        text = text.upper()
+    return rng.choice(('or', 'and', 'phrase')), text
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+from odfinder.cache import TextCache, extract_cached
+from odfinder.documents import Document
+from odfinder.query import Query
+from tests.samples import make_odt
+
+
+class _Stat:
+    def __init__(self, size=1, mtime_ns=1):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+
+
+class TestTextCache:
+    def test_round_trip(self):
+        cache = TextCache(1024 * 1024)
+        cache.put('a.odt', _Stat(), Document('Migración'.encode(), 'Título'.encode()))
+        assert cache.get('a.odt', _Stat()) == Document('Migración'.encode(), 'Título'.encode())
+        assert cache.hits == 1
+        assert cache.bytes > 0
+
+    def test_miss_on_changed_file(self):
+        cache = TextCache(1024 * 1024)
+        cache.put('a.odt', _Stat(), Document(b'text', b''))
+        assert cache.get('a.odt', _Stat(mtime_ns=2)) is None
+        assert cache.get('b.odt', _Stat()) is None
+        assert cache.misses == 2
+
+    def test_replacing_entry_keeps_byte_count(self):
+        cache = TextCache(1024 * 1024)
+        cache.put('a.odt', _Stat(), Document(b'text', b''))
+        size = cache.bytes
+        cache.put('a.odt', _Stat(mtime_ns=2), Document(b'text', b''))
+        assert cache.bytes == size
+        assert len(cache) == 1
+
+    def test_lru_eviction(self):
+        document = Document(' '.join(str(i) for i in range(2000)).encode(), b'')
+        cache = TextCache(1)
+        cache.put('probe', _Stat(), document)
+        assert len(cache) == 0  # larger than the whole budget
+
+        cache = TextCache(1024 * 1024)
+        cache.put('probe', _Stat(), document)
+        cache = TextCache(cache.bytes * 2)
+        cache.put('a', _Stat(), document)
+        cache.put('b', _Stat(), document)
+        cache.get('a', _Stat())
+        cache.put('c', _Stat(), document)
+        assert cache.get('b', _Stat()) is None
+        assert cache.get('a', _Stat()) is not None
+        assert cache.evictions == 1
+        assert cache.bytes <= cache.max_bytes
+
+    def test_content_with_nul_bytes(self):
+        cache = TextCache(1024 * 1024)
+        cache.put('a.odt', _Stat(), Document(b'a\0b', b'\0'))
+        assert cache.get('a.odt', _Stat()) == Document(b'a\0b', b'\0')
+
+    def test_folded_text_is_kept(self):
+        cache = TextCache(1024 * 1024)
+        cache.put('a.odt', _Stat(), Document(b'A', b'', b'a'))
+        assert cache.get('a.odt', _Stat()).folded == b'a'
+
+    def test_shrink(self):
+        cache = TextCache(1024 * 1024)
+        for path in 'abc':
+            cache.put(path, _Stat(), Document(path.encode() * 1000, b''))
+        cache.shrink(cache.bytes - 1)
+        assert len(cache) == 2
+        assert cache.get('a', _Stat()) is None
+        assert cache.bytes <= cache.max_bytes
+
+    def test_relieve_keeps_a_floor_and_restores(self):
+        cache = TextCache(8 * 1024 * 1024)
+        for _ in range(40):
+            cache.relieve(True)
+        assert cache.max_bytes == 1024 * 1024
+        cache.relieve(False)
+        assert cache.max_bytes == 8 * 1024 * 1024
+
+    def test_summary(self):
+        cache = TextCache(1024)
+        assert cache.summary()[1] == 'Cache hits: 0, misses: 0, evictions: 0'
+
+
+class TestExtractCached:
+    def test_without_cache(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        assert extract_cached(None, str(tmp_path / 'a.odt'))[0].startswith('Migración'.encode())
+
+    def test_second_read_is_a_hit(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        cache = TextCache(1024 * 1024)
+        first = extract_cached(cache, str(tmp_path / 'a.odt'))
+        second = extract_cached(cache, str(tmp_path / 'a.odt'))
+        assert first == second
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_modified_file_is_extracted_again(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        cache = TextCache(1024 * 1024)
+        extract_cached(cache, str(tmp_path / 'a.odt'))
+        make_odt(tmp_path / 'a.odt', content_xml='<p>otro</p>')
+        os.utime(tmp_path / 'a.odt', (1, 1))
+        assert extract_cached(cache, str(tmp_path / 'a.odt'))[0] == b'otro'
+
+    def test_partial_documents_are_not_cached(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        cache = TextCache(1024 * 1024)
+        assert extract_cached(cache, str(tmp_path / 'a.odt'), Query('and', 'author:nadie'))[0] is None
+        assert len(cache) == 0
+
+    def test_folded_on_first_accent_insensitive_search(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        cache = TextCache(1024 * 1024)
+        assert extract_cached(cache, str(tmp_path / 'a.odt')).folded is None
+        folded = extract_cached(cache, str(tmp_path / 'a.odt'), Query('or', 'x', fold=True)).folded
+        assert folded.startswith(b'migracion exitosa')
+        assert cache.get(str(tmp_path / 'a.odt'), os.stat(tmp_path / 'a.odt')).folded == folded
+
+    def test_unsupported_files_are_not_cached(self, tmp_path):
+        (tmp_path / 'a.txt').write_text('text')
+        cache = TextCache(1024 * 1024)
+        assert extract_cached(cache, str(tmp_path / 'a.txt')) is None
+        assert cache.misses == 0
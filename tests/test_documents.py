@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+
+import io
+import zipfile
+
+import pytest
+
+from odfinder.documents import (
+    Budget,
+    BudgetExceeded,
+    Cancelled,
+    Document,
+    describe_error,
+    extract_text,
+    is_body_member,
+    is_embedding,
+    iter_archive,
+    meta_member,
+    open_nested,
+    read_body,
+    searchable_text,
+)
+from odfinder.query import Query
+from tests.samples import CONTENT_XML, DOCX_CORE_XML, DOCX_DOCUMENT_XML, META_XML, make_docx, make_odt, make_pptx
+
+
+class TestMembers:
+    def test_odf_body(self):
+        assert is_body_member('content.xml', 'odt')
+        assert is_body_member('Object 1/content.xml', 'odt')
+        assert not is_body_member('styles.xml', 'odt')
+
+    def test_ooxml_body(self):
+        assert is_body_member('word/document.xml', 'docx')
+        assert is_body_member('xl/sharedStrings.xml', 'xlsx')
+        assert not is_body_member('word/styles.xml', 'docx')
+
+    def test_pptx_body(self):
+        assert is_body_member('ppt/slides/slide1.xml', 'pptx')
+        assert not is_body_member('ppt/slideLayouts/slideLayout1.xml', 'pptx')
+
+    def test_meta_member(self):
+        assert meta_member('ods') == 'meta.xml'
+        assert meta_member('xlsx') == 'docProps/core.xml'
+
+
+class TestExtractText:
+    def test_odt(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        content, meta_xml, folded = extract_text(str(tmp_path / 'a.odt'))
+        assert content == 'Migración exitosa a GTK4 con búsquedas avanzadas'.encode()
+        assert meta_xml == META_XML.encode()
+        assert folded is None
+
+    def test_docx(self, tmp_path):
+        make_docx(tmp_path / 'a.docx')
+        expected = Document('Informe de auditoría'.encode(), DOCX_CORE_XML.encode())
+        assert extract_text(str(tmp_path / 'a.docx')) == expected
+
+    def test_pptx(self, tmp_path):
+        make_pptx(tmp_path / 'a.pptx')
+        assert extract_text(str(tmp_path / 'a.pptx'))[0] == b'Diapositiva sobre rendimiento'
+
+    def test_unsupported(self, tmp_path):
+        (tmp_path / 'a.txt').write_text('text')
+        assert extract_text(str(tmp_path / 'a.txt')) is None
+
+    def test_not_a_zip(self, tmp_path):
+        (tmp_path / 'a.odt').write_text('text')
+        assert extract_text(str(tmp_path / 'a.odt')) is None
+
+    def test_missing_meta(self, tmp_path):
+        with zipfile.ZipFile(str(tmp_path / 'a.odt'), 'w') as zf:
+            zf.writestr('content.xml', CONTENT_XML)
+        with pytest.raises(KeyError):
+            extract_text(str(tmp_path / 'a.odt'))
+
+    def test_corrupt_member(self, tmp_path):
+        with zipfile.ZipFile(str(tmp_path / 'a.odt'), 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr('content.xml', CONTENT_XML)
+            zf.writestr('meta.xml', META_XML)
+        data = bytearray((tmp_path / 'a.odt').read_bytes())
+        data[60:64] = b'\xff\xff\xff\xff'  # inside the deflated content.xml
+        (tmp_path / 'a.odt').write_bytes(bytes(data))
+        with pytest.raises(zipfile.BadZipfile):
+            extract_text(str(tmp_path / 'a.odt'))
+
+    def test_unknown_compression(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        data = bytearray((tmp_path / 'a.odt').read_bytes())
+        # compression method 99 in the central directory entries
+        entry = data.find(b'PK\x01\x02')
+        while entry != -1:
+            data[entry + 10 : entry + 12] = b'\x63\x00'
+            entry = data.find(b'PK\x01\x02', entry + 1)
+        (tmp_path / 'a.odt').write_bytes(bytes(data))
+        with pytest.raises(zipfile.BadZipfile):
+            extract_text(str(tmp_path / 'a.odt'))
+
+    def test_missing_file(self, tmp_path):
+        with pytest.raises(IOError):
+            extract_text(str(tmp_path / 'missing.odt'))
+
+    def test_body_skipped_when_metadata_rejects(self, tmp_path, monkeypatch):
+        make_odt(tmp_path / 'a.odt')
+        monkeypatch.setattr('odfinder.documents.read_body', lambda zf, ext: pytest.fail('body inflated'))
+        document = extract_text(str(tmp_path / 'a.odt'), Query('or', 'title:informe migración'))
+        assert document == Document(None, META_XML.encode())
+
+    def test_body_skipped_for_metadata_only_query(self, tmp_path, monkeypatch):
+        make_odt(tmp_path / 'a.odt')
+        monkeypatch.setattr('odfinder.documents.read_body', lambda zf, ext: pytest.fail('body inflated'))
+        assert extract_text(str(tmp_path / 'a.odt'), Query('or', 'title:prueba')) == Document(None, META_XML.encode())
+
+    def test_body_read_for_accepted_metadata(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        content = extract_text(str(tmp_path / 'a.odt'), Query('or', 'title:prueba migración')).content
+        assert content.startswith('Migración'.encode())
+
+    def test_searchable_text(self):
+        assert searchable_text(Document(b'Hello', b'<dc:title>World</dc:title>')) == b'hello world'
+        assert searchable_text(Document(None, b'<dc:title>World</dc:title>')) == b' world'
+
+    def test_folded_for_accent_insensitive_query(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        document = extract_text(str(tmp_path / 'a.odt'), Query('or', 'migracion', fold=True))
+        assert document.folded.startswith(b'migracion exitosa a gtk4 con busquedas')
+        assert searchable_text(document, folded=True) is document.folded
+
+    def test_invalid_utf8_is_searched(self, tmp_path):
+        make_odt(tmp_path / 'a.odt', content_xml=b'<p>caf\xe9 ol\xc3\xa9</p>')
+        document = extract_text(str(tmp_path / 'a.odt'))
+        assert document[0] == b'caf\xe9 ol\xc3\xa9'
+        assert Query('or', 'olé').match_document(document)
+
+
+    def test_dotted_capital_i(self, tmp_path):
+        make_odt(tmp_path / 'a.odt', content_xml='<p>Viaje a İstanbul</p>')
+        document = extract_text(str(tmp_path / 'a.odt'))
+        assert Query('or', 'İstanbul').match_document(document)
+        assert Query('phrase', 'a İSTANBUL').match_document(document)
+
+
+class TestBudget:
+    def test_no_limits(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        assert extract_text(str(tmp_path / 'a.odt'), budget=Budget())[0].startswith('Migración'.encode())
+
+    def test_declared_size_over_limit(self, tmp_path):
+        make_odt(tmp_path / 'a.odt', content_xml='<p>' + 'x' * 5000 + '</p>')
+        with pytest.raises(BudgetExceeded) as err:
+            extract_text(str(tmp_path / 'a.odt'), budget=Budget(max_size=1000))
+        assert err.value.category == 'size'
+
+    def test_inflated_size_counted_while_reading(self, tmp_path, monkeypatch):
+        make_odt(tmp_path / 'a.odt', content_xml='<p>' + 'x' * 5000 + '</p>')
+        monkeypatch.setattr('odfinder.documents.CHUNK_SIZE', 100)
+        with zipfile.ZipFile(str(tmp_path / 'a.odt')) as zf:
+            meter = Budget(max_size=1000).meter(zf)
+            monkeypatch.setattr(meter, 'declare', lambda infos: None)  # a lying central directory
+            with pytest.raises(BudgetExceeded):
+                read_body(zf, 'odt', meter)
+        assert meter.inflated <= 1100
+
+    def test_member_count(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        with pytest.raises(BudgetExceeded) as err:
+            extract_text(str(tmp_path / 'a.odt'), budget=Budget(max_members=1))
+        assert err.value.category == 'members'
+
+    def test_time(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        with pytest.raises(BudgetExceeded) as err:
+            extract_text(str(tmp_path / 'a.odt'), budget=Budget(max_time=-1))
+        assert err.value.category == 'time'
+
+    def test_cancelled_inside_member(self, tmp_path, monkeypatch):
+        make_odt(tmp_path / 'a.odt', content_xml='<p>' + 'x' * 5000 + '</p>')
+        monkeypatch.setattr('odfinder.documents.CHUNK_SIZE', 100)
+        checks = []
+
+        def cancelled():
+            checks.append(1)
+            return len(checks) > 3
+
+        with pytest.raises(Cancelled):
+            extract_text(str(tmp_path / 'a.odt'), budget=Budget(cancelled=cancelled))
+        assert len(checks) == 4
+
+
+def _sample(maker, path, *args):
+    maker(path, *args)
+    return path.read_bytes()
+
+
+@pytest.fixture()
+def archive(tmp_path):
+    """outer.zip: a compressed and a stored document, a text file and an archive inside."""
+    inner = tmp_path / 'inner.zip'
+    with zipfile.ZipFile(inner, 'w') as zf:
+        zf.writestr('c.odt', _sample(make_odt, tmp_path / 'c.odt', CONTENT_XML.replace('Migración', 'Anidado')))
+
+    outer = tmp_path / 'outer.zip'
+    with zipfile.ZipFile(outer, 'w') as zf:
+        zf.writestr('dir/a.odt', _sample(make_odt, tmp_path / 'a.odt'), zipfile.ZIP_DEFLATED)
+        zf.writestr('b.docx', _sample(make_docx, tmp_path / 'b.docx'), zipfile.ZIP_STORED)
+        zf.writestr('notes.txt', 'migración')
+        zf.writestr('inner.zip', inner.read_bytes(), zipfile.ZIP_STORED)
+    return str(outer)
+
+
+class TestNested:
+    def test_embedding_members(self):
+        assert is_embedding('word/embeddings/Microsoft_Excel_Worksheet.xlsx', 'docx')
+        assert is_embedding('ppt/embeddings/Document1.docx', 'pptx')
+        assert not is_embedding('word/embeddings/oleObject1.bin', 'docx')
+        assert not is_embedding('Object 1/content.xml', 'odt')
+
+    def test_embedded_documents_searched(self, tmp_path):
+        embedded = _sample(make_docx, tmp_path / 'embedded.docx', DOCX_DOCUMENT_XML.replace('Informe', 'Incrustado'))
+        outer = tmp_path / 'outer.docx'
+        make_docx(outer)
+        with zipfile.ZipFile(outer, 'a') as zf:
+            zf.writestr('word/embeddings/Microsoft_Word_Document.docx', embedded)
+        assert b'Incrustado' in extract_text(str(outer)).content
+        assert b'Incrustado' not in extract_text(str(outer), budget=Budget(max_depth=0)).content
+
+    def test_broken_embedding_ignored(self, tmp_path):
+        outer = tmp_path / 'outer.docx'
+        make_docx(outer)
+        with zipfile.ZipFile(outer, 'a') as zf:
+            zf.writestr('word/embeddings/broken.docx', b'not a zip')
+        assert b'auditor' in extract_text(str(outer)).content
+
+    def test_archive_members(self, archive):
+        members = {path: document for path, document, error in iter_archive(archive)}
+        assert sorted(members) == [
+            archive + '!/b.docx',
+            archive + '!/dir/a.odt',
+            archive + '!/inner.zip!/c.odt',
+        ]
+        assert b'Anidado' in members[archive + '!/inner.zip!/c.odt'].content
+        assert b'auditor' in members[archive + '!/b.docx'].content
+
+    def test_depth_limit(self, archive):
+        paths = [path for path, _, _ in iter_archive(archive, budget=Budget(max_depth=1))]
+        assert archive + '!/inner.zip!/c.odt' not in paths
+        assert list(iter_archive(archive, budget=Budget(max_depth=0))) == []
+
+    def test_count_limit(self, archive):
+        members = list(iter_archive(archive, budget=Budget(max_nested=2)))
+        assert len(members) == 3
+        path, document, error = members[-1]
+        assert (path, document, error.category) == (archive, None, 'nested')
+
+    def test_size_limit(self, archive):
+        errors = [error for _, _, error in iter_archive(archive, budget=Budget(max_nested_size=10))]
+        assert {error.category for error in errors} == {'size'}
+
+    def test_broken_member_reported(self, tmp_path):
+        outer = tmp_path / 'outer.zip'
+        with zipfile.ZipFile(outer, 'w') as zf:
+            zf.writestr('broken.odt', b'not a zip')
+            zf.writestr('a.odt', _sample(make_odt, tmp_path / 'a.odt'))
+        (broken, document, error), (_, good, _) = iter_archive(str(outer))
+        assert broken.endswith('!/broken.odt') and document is None
+        assert isinstance(error, zipfile.BadZipfile)
+        assert good is not None
+
+    def test_extract_nested_path(self, archive):
+        assert b'Anidado' in extract_text(archive + '!/inner.zip!/c.odt').content
+        with pytest.raises(KeyError):
+            extract_text(archive + '!/missing.odt')
+
+    def test_stored_members_read_in_place(self, archive):
+        with zipfile.ZipFile(archive) as zf:
+            with open_nested(zf, zf.getinfo('b.docx')) as stored:
+                assert not isinstance(stored.fp, io.BytesIO)
+                assert 'word/document.xml' in stored.namelist()
+            with open_nested(zf, zf.getinfo('dir/a.odt')) as compressed:
+                assert isinstance(compressed.fp, io.BytesIO)
+
+
+class TestDescribeError:
+    def test_budget_messages(self):
+        assert describe_error('a.odt', BudgetExceeded('size', 2 * 1024 * 1024)) == (
+            "Warning: 'a.odt' skipped, inflated size over 2 MiB"
+        )
+        assert 'more than 5 members' in describe_error('a.odt', BudgetExceeded('members', 5))
+        assert 'over 1.5 seconds' in describe_error('a.odt', BudgetExceeded('time', 1.5))
+
+    def test_missing_member(self):
+        assert describe_error('a.odt', KeyError('meta.xml')) == "Warning: 'meta.xml' not found in 'a.odt'"
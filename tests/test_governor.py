@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from odfinder.governor import Governor, TokenBucket, current_rss, set_idle_priority
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket:
+    def test_burst_within_capacity_is_free(self):
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+        assert bucket.take(60) == 0
+        assert bucket.take(40) == 0
+
+    def test_debt_is_waited_off(self):
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+        bucket.take(100)
+        assert bucket.take(50) == pytest.approx(0.5)
+        assert bucket.take(300) == pytest.approx(3)
+
+    def test_refills_up_to_capacity(self):
+        clock = FakeClock()
+        bucket = TokenBucket(100, clock=clock, sleep=clock.sleep)
+        bucket.take(100)
+        clock.now += 10
+        assert bucket.take(100) == 0
+        assert bucket.take(100) == pytest.approx(1)
+
+    def test_long_run_rate(self):
+        clock = FakeClock()
+        bucket = TokenBucket(10, clock=clock, sleep=clock.sleep)
+        for _ in range(100):
+            bucket.take(5)
+        # one second of burst, then 10 per second
+        assert clock.now == pytest.approx(49)
+
+
+class TestGovernor:
+    def test_no_limits(self):
+        governor = Governor()
+        governor.before_read(10**9)
+        governor.after_document(10)
+        assert governor.waited == 0
+        assert governor.memory_exceeded() is False
+        assert governor.bytes_read == 10**9
+
+    def test_read_rate(self):
+        clock = FakeClock()
+        governor = Governor(max_read_rate=1, clock=clock, sleep=clock.sleep)
+        for _ in range(4):
+            governor.before_read(500 * 1000)
+        assert governor.waited == pytest.approx(1)
+
+    def test_cpu_share(self):
+        clock = FakeClock()
+        governor = Governor(max_cpu=50, clock=clock, sleep=clock.sleep)
+        governor.after_document(0.5)
+        governor.after_document(1)
+        assert governor.waited == pytest.approx(2)
+
+    def test_memory(self):
+        assert Governor(max_rss=1).memory_exceeded() is True
+        governor = Governor(max_rss=1024 * 1024)
+        assert governor.memory_exceeded() is False
+        assert governor.peak_rss == pytest.approx(current_rss(), rel=0.5)
+
+    def test_summary(self):
+        lines = Governor(max_cpu=50).summary()
+        assert lines[0].startswith('CPU: ')
+        assert lines[1] == 'Throttled: 0.0 s, memory pressure: 0'
+
+
+def test_set_idle_priority(monkeypatch):
+    niceness = []
+    monkeypatch.setattr('os.nice', lambda increment: niceness.append(increment) or 0)
+    monkeypatch.setattr('platform.machine', lambda: 'vax')
+    assert set_idle_priority() is False
+    assert niceness == [0, 19]
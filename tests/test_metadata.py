@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from odfinder.documents import Document
+from odfinder.metadata import parse_filter, parse_metadata, split_filters
+from odfinder.query import Query
+
+ODF_META = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<office:document-meta xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:meta="urn:oasis:names:tc:opendocument:xmlns:meta:1.0">'
+    '<office:meta>'
+    '<dc:title>Informe anual</dc:title>'
+    '<meta:initial-creator>Ana García</meta:initial-creator>'
+    '<dc:creator>Luis Pérez</dc:creator>'
+    '<meta:keyword>finanzas</meta:keyword><meta:keyword>2025</meta:keyword>'
+    '<meta:creation-date>2024-11-02T09:00:00</meta:creation-date>'
+    '<dc:date>2025-03-15T12:30:00</dc:date>'
+    '</office:meta></office:document-meta>'
+)
+
+OOXML_CORE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties"'
+    ' xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/">'
+    '<dc:title>Auditoría</dc:title><dc:creator>Marta López</dc:creator>'
+    '<cp:keywords>riesgos, control</cp:keywords>'
+    '<dcterms:created>2023-01-10T08:00:00Z</dcterms:created>'
+    '<dcterms:modified>2024-06-01T08:00:00Z</dcterms:modified>'
+    '</cp:coreProperties>'
+)
+
+
+class TestParseMetadata:
+    def test_odf(self):
+        metadata = parse_metadata(ODF_META)
+        assert metadata['title'] == ['Informe anual']
+        assert metadata['author'] == ['Ana García', 'Luis Pérez']
+        assert metadata['keywords'] == ['finanzas', '2025']
+        assert metadata['created'] == ['2024-11-02T09:00:00']
+        assert metadata['modified'] == ['2025-03-15T12:30:00']
+
+    def test_ooxml(self):
+        metadata = parse_metadata(OOXML_CORE)
+        assert metadata['author'] == ['Marta López']
+        assert metadata['modified'] == ['2024-06-01T08:00:00Z']
+
+    def test_malformed(self):
+        assert parse_metadata('<office:meta><dc:title>') == {}
+
+
+class TestParseFilter:
+    @pytest.mark.parametrize('term', ['informe', 'http://example.org', 'title:', 'modified>ayer', 'author>b'])
+    def test_plain_terms(self, term):
+        assert parse_filter(term) is None
+
+    @pytest.mark.parametrize(
+        'term, expected',
+        [
+            ('author:garcía', True),
+            ('author:GARCÍA', True),
+            ('author:gómez', False),
+            ('title=informe', False),
+            ('title:anual', True),
+            ('keywords=finanzas', True),
+            ('modified>2025-01-01', True),
+            ('modified<2025-01-01', False),
+            ('modified:2025-03', True),
+            ('created>=2024-11-02', True),
+            ('created<=2024', True),
+            ('subject:nada', False),
+        ],
+    )
+    def test_match(self, term, expected):
+        assert parse_filter(term).match(parse_metadata(ODF_META)) is expected
+
+
+class TestSplitFilters:
+    def test_without_filters_keeps_text(self):
+        assert split_filters('  hello   world ') == ([], '  hello   world ')
+
+    def test_split(self):
+        filters, body = split_filters('author:garcia informe modified>2025-01-01 anual')
+        assert [f.field for f in filters] == ['author', 'modified']
+        assert body == 'informe anual'
+
+
+class TestQueryWithFilters:
+    def test_filters_narrow_or_queries(self):
+        query = Query('or', 'author:garcía informe nada')
+        assert query.match_document(Document('nada que ver'.encode(), ODF_META.encode())) is True
+        assert query.match_document(Document('nada que ver'.encode(), OOXML_CORE.encode())) is False
+
+    def test_metadata_only_query(self):
+        query = Query('and', 'author:lópez modified>=2024')
+        assert query.needs_body is False
+        assert query.match_document(Document(None, OOXML_CORE.encode())) is True
+        assert query.match_document(Document(None, ODF_META.encode())) is False
+
+    def test_skipped_body_does_not_match_body_terms(self):
+        assert Query('or', 'author:garcía informe').match_document(Document(None, ODF_META.encode())) is False
+
+    def test_phrase_after_filters(self):
+        query = Query('phrase', 'title:informe sobre migración')
+        assert query.terms == ['sobre migración']
+        assert query.match_document(Document('Informe sobre migración'.encode(), ODF_META.encode())) is True
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+import pytest
+
+from odfinder.normalize import _fold_run, fold, fold_text, original_span
+
+
+class TestFold:
+    def test_accents_and_case(self):
+        assert fold('Migración ÉXITO Ñandú'.encode()) == b'migracion exito nandu'
+
+    def test_casefold_and_compatibility_forms(self):
+        assert fold('Straße ﬁn ² İ'.encode()) == b'strasse fin 2 i'
+
+    def test_decomposed_input(self):
+        assert fold('migración'.encode()) == b'migracion'
+
+    def test_ascii_only(self):
+        assert fold(b'Hello World') == b'hello world'
+
+    def test_invalid_utf8_kept(self):
+        assert fold(b'Caf\xe9 \xc3\x89') == b'caf\xe9 e'
+
+    def test_same_as_folding_text(self):
+        text = 'Ærø ÇA VA ﬀ Σίσυφος Ǆ'
+        assert fold(text.encode()).decode() == fold_text(text)
+
+    @pytest.mark.parametrize(
+        'data',
+        [
+            'ΣΊΣΥΦΟΣ Ωώ ǅ İı'.encode(),
+            # bytes that only meet once the mark between them is removed
+            b'\xc3\xcc\x81\xa9 \xc3\xa9',
+            b'\xc3 \xa9 ma\xc3\xb1ana',
+            # one translate() pass, with '¡' and '“' sharing bytes with 'á' and 'À'
+            '¡Ésta ÀRBOL más “grande”! Σ'.encode(),
+            'café ¿qué? año Straße'.encode(),
+            b'\xc3\xa9 \xc3 \x80',
+        ],
+    )
+    def test_same_as_folding_run_by_run(self, data):
+        expected = re.sub(rb'[\x80-\xff]+', lambda match: _fold_run(match.group()), data.lower())
+        assert fold(data) == expected
+
+
+class TestOriginalSpan:
+    @pytest.mark.parametrize(
+        'term, expected',
+        [
+            (b'migracion', 'Migración'),
+            (b'exito', 'ÉXITO'),
+            (b'strasse', 'Straße'),
+            (b'ss', 'ß'),
+            (b'fin', 'ﬁn'),
+            (b'on e', 'ón É'),
+        ],
+    )
+    def test_maps_back(self, term, expected):
+        data = 'Migración ÉXITO Straße ﬁn'.encode()
+        start = fold(data).find(term)
+        begin, end = original_span(data, start, start + len(term))
+        assert data[begin:end].decode() == expected
+
+    def test_ascii_offsets_unchanged(self):
+        assert original_span(b'Hello World', 6, 11) == (6, 11)
@@ -1,54 +1,23 @@
 # -*- coding: utf-8 -*-
 
+import json
 import os
 import shutil
+import threading
+import time
 import zipfile
 
 import pytest
 
 from odfinder.odfinder_app import ODFinderApp, parse_args
+from odfinder.query import Query
+from odfinder.records import FAILED, MATCHED
+from odfinder.server import QueryServer
+from odfinder.shard import ShardServer, build_shard
+from tests.samples import CONTENT_XML, make_docx, make_odt, make_pptx
 
 # ── Fixtures ────────────────────────────────────────────────────────
 
-CONTENT_XML = (
-    '<?xml version="1.0" encoding="UTF-8"?>'
-    '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
-    ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0">'
-    '<office:body><office:text>'
-    '<text:p>Migración exitosa a GTK4 con búsquedas avanzadas</text:p>'
-    '</office:text></office:body></office:document-content>'
-)
-
-META_XML = (
-    '<?xml version="1.0" encoding="UTF-8"?>'
-    '<office:document-meta xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"'
-    ' xmlns:dc="http://purl.org/dc/elements/1.1/">'
-    '<office:meta><dc:title>Documento de prueba</dc:title></office:meta>'
-    '</office:document-meta>'
-)
-
-DOCX_DOCUMENT_XML = (
-    '<?xml version="1.0" encoding="UTF-8"?>'
-    '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
-    '<w:body><w:p><w:r><w:t>Informe de auditoría</w:t></w:r></w:p></w:body></w:document>'
-)
-
-DOCX_CORE_XML = (
-    '<?xml version="1.0" encoding="UTF-8"?>'
-    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties"'
-    ' xmlns:dc="http://purl.org/dc/elements/1.1/">'
-    '<dc:title>Auditoría</dc:title></cp:coreProperties>'
-)
-
-PPTX_SLIDE_XML = (
-    '<?xml version="1.0" encoding="UTF-8"?>'
-    '<p:sld xmlns:p="http://schemas.openxmlformats.org/presentationml/2006/main"'
-    ' xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main">'
-    '<p:cSld><p:spTree><p:sp><p:txBody><a:p><a:r>'
-    '<a:t>Diapositiva sobre rendimiento</a:t>'
-    '</a:r></a:p></p:txBody></p:sp></p:spTree></p:cSld></p:sld>'
-)
-
 
 @pytest.fixture()
 def tmp_docs(tmp_path):
@@ -58,26 +27,8 @@ def tmp_docs(tmp_path):
     return docs_dir
 
 
-def _make_odt(path, content_xml=CONTENT_XML, meta_xml=META_XML):
-    with zipfile.ZipFile(str(path), 'w') as zf:
-        zf.writestr('content.xml', content_xml)
-        zf.writestr('meta.xml', meta_xml)
-
-
-def _make_docx(path, document_xml=DOCX_DOCUMENT_XML, core_xml=DOCX_CORE_XML):
-    with zipfile.ZipFile(str(path), 'w') as zf:
-        zf.writestr('word/document.xml', document_xml)
-        zf.writestr('docProps/core.xml', core_xml)
-
-
-def _make_pptx(path, slide_xml=PPTX_SLIDE_XML, core_xml=DOCX_CORE_XML):
-    with zipfile.ZipFile(str(path), 'w') as zf:
-        zf.writestr('ppt/slides/slide1.xml', slide_xml)
-        zf.writestr('docProps/core.xml', core_xml)
-
-
-def _make_app(content, mode='or', path='.'):
-    return ODFinderApp({'content': content, 'mode': mode, 'path': path})
+def _make_app(content, mode='or', path='.', **options):
+    return ODFinderApp({'content': content, 'mode': mode, 'path': path, **options})
 
 
 # ── Console mode detection ──────────────────────────────────────────
@@ -145,43 +96,56 @@ class TestMatch:
 class TestProcessFile:
     def test_odt_match(self, tmp_docs):
         odt = tmp_docs / 'test.odt'
-        _make_odt(odt)
+        make_odt(odt)
         app = _make_app(['migración'])
         assert app.process_file(str(odt)) is True
         assert app.ooo_count == 1
 
     def test_odt_no_match(self, tmp_docs):
         odt = tmp_docs / 'test.odt'
-        _make_odt(odt)
+        make_odt(odt)
         app = _make_app(['inexistente'])
         assert app.process_file(str(odt)) is False
 
     def test_docx_match(self, tmp_docs):
         docx = tmp_docs / 'report.docx'
-        _make_docx(docx)
+        make_docx(docx)
         app = _make_app(['auditoría'])
         assert app.process_file(str(docx)) is True
         assert app.ooo_count == 1
 
     def test_docx_no_match(self, tmp_docs):
         docx = tmp_docs / 'report.docx'
-        _make_docx(docx)
+        make_docx(docx)
         app = _make_app(['inexistente'])
         assert app.process_file(str(docx)) is False
 
     def test_pptx_match(self, tmp_docs):
         pptx = tmp_docs / 'slides.pptx'
-        _make_pptx(pptx)
+        make_pptx(pptx)
         app = _make_app(['rendimiento'])
         assert app.process_file(str(pptx)) is True
         assert app.ooo_count == 1
 
     def test_pptx_no_match(self, tmp_docs):
         pptx = tmp_docs / 'slides.pptx'
-        _make_pptx(pptx)
+        make_pptx(pptx)
         app = _make_app(['inexistente'])
         assert app.process_file(str(pptx)) is False
 
+    def test_unreadable_file_warns(self, tmp_docs):
+        app = _make_app(['anything'])
+        assert app.process_file(str(tmp_docs / 'missing.odt')) is False
+        assert len(app.warnings) == 1
+        assert 'missing.odt' in app.warnings[0]
+
+    def test_not_a_zip_ignored(self, tmp_docs):
+        odt = tmp_docs / 'fake.odt'
+        odt.write_text('plain text')
+        app = _make_app(['plain'])
+        assert app.process_file(str(odt)) is False
+        assert app.warnings == []
+
     def test_unsupported_extension_ignored(self, tmp_docs):
         txt = tmp_docs / 'readme.txt'
         txt.write_text('some text')
@@ -202,7 +166,7 @@ class TestProcessFile:
 
     def test_corrupt_zip_returns_false(self, tmp_docs, monkeypatch):
         odt = tmp_docs / 'corrupt.odt'
-        _make_odt(odt)
+        make_odt(odt)
         app = _make_app(['anything'])
         def mock_zipfile(*args, **kwargs):
             raise zipfile.BadZipfile("mocked corrupt zip")
@@ -212,9 +176,54 @@ class TestProcessFile:
         assert "corrupt.odt" in app.warnings[0]
         assert "mocked corrupt zip" in app.warnings[0]
 
+    def test_gui_session_reuses_extracted_text(self, tmp_docs):
+        odt = tmp_docs / 'test.odt'
+        make_odt(odt)
+        app = _make_app([])
+        app.search_query = lambda: Query('or', 'migración')
+        assert app.process_file(str(odt)) is True
+        assert app.process_file(str(odt)) is True
+        assert app.text_cache.hits == 1
+        assert app.ooo_count == 2
+
+    def test_console_search_has_no_cache(self):
+        assert _make_app(['word']).text_cache is None
+        assert _make_app([], cache_size=0).text_cache is None
+
+    def test_ignore_accents(self, tmp_docs):
+        odt = tmp_docs / 'test.odt'
+        make_odt(odt)
+        assert _make_app(['MIGRACION'], ignore_accents=True).process_file(str(odt)) is True
+        assert _make_app(['MIGRACION']).process_file(str(odt)) is False
+
+    def test_metadata_query(self, tmp_docs):
+        odt = tmp_docs / 'test.odt'
+        make_odt(odt)
+        assert _make_app(['title:prueba']).process_file(str(odt)) is True
+        assert _make_app(['title:informe']).process_file(str(odt)) is False
+        assert _make_app(['title:prueba', 'migración'], mode='and').process_file(str(odt)) is True
+        assert _make_app(['title:prueba', 'inexistente'], mode='and').process_file(str(odt)) is False
+
+    def test_over_budget_document_skipped(self, tmp_docs):
+        odt = tmp_docs / 'big.odt'
+        make_odt(odt, content_xml='<p>' + 'migración ' * 200000 + '</p>')
+        app = _make_app(['migración'], max_file_size=1)
+        assert app.process_file(str(odt)) is False
+        assert app.skipped['size'] == 1
+        assert 'big.odt' in app.warnings[0]
+        assert 'Skipped over budget: 1 (size 1, members 0, time 0)' in app.stats_summary()
+
+    def test_cancelled_during_extraction(self, tmp_docs):
+        odt = tmp_docs / 'test.odt'
+        make_odt(odt)
+        app = _make_app(['migración'])
+        app.cancellable.cancel()
+        assert app.process_file(str(odt)) is False
+        assert app.warnings == []
+
     def test_and_mode_across_content_and_meta(self, tmp_docs):
         odt = tmp_docs / 'test.odt'
-        _make_odt(odt)
+        make_odt(odt)
         app = _make_app(['migración', 'prueba'], mode='and')
         # 'migración' in content.xml, 'prueba' in meta.xml
         assert app.process_file(str(odt)) is True
@@ -225,8 +234,8 @@ class TestProcessFile:
 
 class TestRecursiveSearch:
     def test_finds_matching_files(self, tmp_docs, capsys):
-        _make_odt(tmp_docs / 'a.odt')
-        _make_odt(tmp_docs / 'b.odt')
+        make_odt(tmp_docs / 'a.odt')
+        make_odt(tmp_docs / 'b.odt')
         app = _make_app(['migración'], path=str(tmp_docs))
         app.recursive_search(None, None, str(tmp_docs))
         captured = capsys.readouterr()
@@ -235,31 +244,375 @@ class TestRecursiveSearch:
         assert app.match_count == 2
 
     def test_skips_non_matching_files(self, tmp_docs, capsys):
-        _make_odt(tmp_docs / 'a.odt')
+        make_odt(tmp_docs / 'a.odt')
         app = _make_app(['inexistente'], path=str(tmp_docs))
         app.recursive_search(None, None, str(tmp_docs))
         captured = capsys.readouterr()
         assert captured.out == ''
         assert app.match_count == 0
 
+    def test_jsonl_output_with_snippets(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        app = _make_app(['exitosa'], path=str(tmp_docs), format='jsonl', snippets=2, context=10)
+        app.recursive_search(None, None, str(tmp_docs))
+        record = json.loads(capsys.readouterr().out)
+        assert record['path'].endswith('a.odt')
+        assert record['snippets'] == [{'before': 'Migración ', 'match': 'exitosa', 'after': ' a GTK4 co…'}]
+
+    def test_text_output_with_snippets(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        app = _make_app(['gtk4'], path=str(tmp_docs), snippets=1, context=6)
+        app.recursive_search(None, None, str(tmp_docs))
+        assert capsys.readouterr().out.splitlines()[1] == '    …osa a GTK4 con b…'
+        # the hit found by the search is reused, the document read from cache
+        assert list(app.hits.values()) == [[(21, 25)]]
+        assert app.text_cache.hits == 1
+
+    def test_window_snippets_built_by_a_worker(self, tmp_docs, monkeypatch):
+        odt = str(tmp_docs / 'a.odt')
+        make_odt(odt)
+        app = _make_app(['gtk4'], path=str(tmp_docs), context=6)
+        monkeypatch.setattr('odfinder.odfinder_app.GLib.idle_add', lambda callback, *args: callback(*args))
+        app.tree_matches = type('View', (), {'queue_draw': lambda self: None})()
+        app.build_snippets(None, None, (odt, app.generation))
+        assert app._snippet_markup[odt] == '…osa a <b>GTK4</b> con b…'
+
+        # under the limits of the search, and dropped once superseded
+        app._snippet_markup.clear()
+        app.budget.max_size = 1
+        app.build_snippets(None, None, (odt, app.generation))
+        assert app._snippet_markup[odt] == ''
+        app._snippet_markup.clear()
+        app.build_snippets(None, None, (odt, app.generation - 1))
+        assert odt not in app._snippet_markup
+
+    def test_no_hits_kept_without_snippets(self, tmp_docs):
+        make_odt(tmp_docs / 'a.odt')
+        app = _make_app(['gtk4'], path=str(tmp_docs))
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.hits == {}
+
+    def test_top_k_ranking(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'once.odt', content_xml='<p>informe y otras cosas</p>')
+        make_odt(tmp_docs / 'often.odt', content_xml='<p>informe informe informe</p>')
+        make_odt(tmp_docs / 'none.odt', content_xml='<p>nada</p>')
+        make_odt(tmp_docs / 'twice.odt', content_xml='<p>informe informe cosas</p>')
+        app = _make_app(['informe'], path=str(tmp_docs), top=2, format='jsonl')
+        app.recursive_search(None, None, str(tmp_docs))
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert [os.path.basename(record['path']) for record in records] == ['often.odt', 'twice.odt']
+        assert [record['rank'] for record in records] == [1, 2]
+        assert records[0]['score'] > records[1]['score']
+        assert app.match_count == 3
+
+    def test_top_k_ranking_snapshots(self, tmp_docs, capsys, monkeypatch):
+        monkeypatch.setattr('odfinder.odfinder_app.STABLE_AFTER', 1)
+        make_odt(tmp_docs / 'a.odt', content_xml='<p>informe</p>')
+        make_odt(tmp_docs / 'b.odt', content_xml='<p>informe informe</p>')
+        make_odt(tmp_docs / 'c.odt', content_xml='<p>nada</p>')
+        make_odt(tmp_docs / 'd.odt', content_xml='<p>nada</p>')
+        app = _make_app(['informe'], path=str(tmp_docs), top=2, format='jsonl')
+        app.recursive_search(None, None, str(tmp_docs))
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        # a document that leaves the top k unchanged shows it
+        snapshots = [record for record in records if 'ranking' in record]
+        assert snapshots and all(snapshot['final'] is False for snapshot in snapshots)
+        assert all(set(entry) == {'path', 'rank', 'score'} for snapshot in snapshots for entry in snapshot['ranking'])
+        # the final ranking follows, one result per line
+        final = records[len(snapshots) :]
+        assert [os.path.basename(record['path']) for record in final] == ['b.odt', 'a.odt']
+
+    def test_top_k_stops_early_on_newest_first_scan(self, tmp_docs, capsys):
+        now = time.time()
+        for i in range(5):
+            make_odt(tmp_docs / f'doc{i}.odt', content_xml='<p>' + 'prueba ' * 50 + '</p>')
+            os.utime(tmp_docs / f'doc{i}.odt', (now - i * 10 * 365 * 86400,) * 2)
+        # 'prueba' is the title too: the newest is as good as any can be
+        app = _make_app(['prueba'], path=str(tmp_docs), top=1, order='mtime-desc')
+        app.recursive_search(None, None, str(tmp_docs))
+        assert capsys.readouterr().out.strip().endswith('doc0.odt')
+        assert app.ooo_count < 5
+        assert app.previous_run is None  # incomplete, not reused by narrowing
+
+    def test_deadline_returns_partial_results(self, tmp_docs, capsys):
+        for name in ('a.odt', 'b.odt', 'c.odt'):
+            make_odt(tmp_docs / name)
+        app = _make_app(['migración'], path=str(tmp_docs), deadline=1e-9, format='jsonl')
+        app.recursive_search(None, None, str(tmp_docs))
+        lines = capsys.readouterr().out.splitlines()
+        # the walk itself stops at the deadline
+        assert json.loads(lines[-1]) == {
+            'coverage': {'scanned': 0, 'estimated_total': None, 'skipped_roots': [str(tmp_docs)], 'complete': False}
+        }
+        assert app.previous_run is None
+
+    def test_deadline_stops_an_ordered_walk(self, tmp_docs, monkeypatch):
+        for name in ('a.odt', 'b.odt', 'c.odt'):
+            make_odt(tmp_docs / name)
+        (tmp_docs / 'sub').mkdir()
+        make_odt(tmp_docs / 'sub' / 'd.odt')
+        app = _make_app(['migración'], path=str(tmp_docs), deadline=60, order='mtime-desc', top=2)
+        # the deadline passes while the first directory is read
+        checks = iter([False, True])
+        monkeypatch.setattr(app, 'past_deadline', lambda: next(checks, True))
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.coverage.scanned == 0
+        assert app.coverage.complete is False
+        assert app.coverage.progress[0].finished is False
+
+    def test_stop_ends_an_ordered_walk(self, tmp_docs, monkeypatch):
+        for name in ('a.odt', 'b.odt', 'c.odt'):
+            make_odt(tmp_docs / name)
+        (tmp_docs / 'sub').mkdir()
+        make_odt(tmp_docs / 'sub' / 'd.odt')
+        app = _make_app(['migración'], path=str(tmp_docs), order='mtime-desc', top=2)
+        checks = []
+
+        def stop_requested():
+            # Stop is pressed while the first directory is read
+            checks.append(None)
+            if len(checks) == 2:
+                app.cancellable.cancel()
+            return app.cancellable.is_cancelled()
+
+        monkeypatch.setattr(app, 'stop_requested', stop_requested)
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.coverage.progress[0].finished is False
+        # cancelled, not complete: nothing kept for narrowing the next query
+        assert app.previous_run is None
+        assert not app.cancellable.is_cancelled()
+
+    def test_interrupted_document_not_counted(self):
+        app = _make_app(['migración'])
+        app.deadline_at = time.monotonic() - 1
+        app.count_scanned()
+        assert app.coverage.scanned == 0
+
+    def test_deadline_not_reached(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        missing = str(tmp_docs / 'missing')
+        app = _make_app(['migración'], deadline=60)
+        app.recursive_search(None, None, [str(tmp_docs), missing])
+        assert capsys.readouterr().err.splitlines() == [
+            'Searched 1 of about 1 files (100%)',
+            f'Skipped roots: {missing}',
+            'Results complete',
+        ]
+
+    def test_governed_search(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        make_odt(tmp_docs / 'b.odt')
+        app = _make_app(['migración'], path=str(tmp_docs), max_read_rate=1000, max_rss=1, stats=True)
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.match_count == 2
+        assert app.governor.bytes_read == sum(os.path.getsize(tmp_docs / name) for name in ('a.odt', 'b.odt'))
+        assert app.governor.memory_pressure == 2
+        assert 'memory pressure: 2' in capsys.readouterr().err
+
     def test_subdirectory_traversal(self, tmp_docs, capsys):
         subdir = tmp_docs / 'subdir'
         subdir.mkdir()
-        _make_odt(subdir / 'deep.odt')
+        make_odt(subdir / 'deep.odt')
         app = _make_app(['migración'], path=str(tmp_docs))
         app.recursive_search(None, None, str(tmp_docs))
         captured = capsys.readouterr()
         assert 'deep.odt' in captured.out
         assert app.match_count == 1
 
+    def test_ordered_search_prints_stats(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        make_odt(tmp_docs / 'b.odt')
+        app = _make_app(['migración'], path=str(tmp_docs), order='mtime-desc', stats=True)
+        app.recursive_search(None, None, str(tmp_docs))
+        captured = capsys.readouterr()
+        assert app.match_count == 2
+        assert 'Files scanned: 2' in captured.err
+        assert 'Time to first result:' in captured.err
+
+    def test_readahead_search(self, tmp_docs, capsys):
+        for name in ('a.odt', 'b.odt', 'c.docx'):
+            (make_docx if name.endswith('docx') else make_odt)(tmp_docs / name)
+        (tmp_docs / 'notes.txt').write_text('migración')
+        app = _make_app(['migración', 'auditoría'], path=str(tmp_docs), readahead=2)
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.match_count == 3
+        assert app.ooo_count == 3
+
+    def test_records_of_results_and_unreadable_files(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        make_odt(tmp_docs / 'b.odt')
+        with zipfile.ZipFile(tmp_docs / 'broken.odt', 'w') as zf:
+            zf.writestr('content.xml', CONTENT_XML)
+        app = _make_app(['migración'], path=str(tmp_docs), stats=True)
+        app.recursive_search(None, None, str(tmp_docs))
+        assert sorted(app.records.paths(MATCHED)) == [str(tmp_docs / 'a.odt'), str(tmp_docs / 'b.odt')]
+        assert list(app.records.paths(FAILED)) == [str(tmp_docs / 'broken.odt')]
+        matched = next(record for record in app.records if record.status == MATCHED)
+        assert matched.size == os.path.getsize(matched.path)
+        assert 'Unreadable documents: 1' in capsys.readouterr().err
+
+    def test_documents_inside_archives(self, tmp_docs, tmp_path, capsys):
+        make_odt(tmp_path / 'a.odt')
+        with zipfile.ZipFile(tmp_docs / 'outer.zip', 'w') as zf:
+            zf.write(tmp_path / 'a.odt', 'dir/a.odt')
+            zf.writestr('broken.odt', b'not a zip')
+        app = _make_app(['exitosa'], path=str(tmp_docs), format='jsonl', snippets=1, context=4)
+        app.recursive_search(None, None, str(tmp_docs))
+        record = json.loads(capsys.readouterr().out)
+        assert record['path'] == str(tmp_docs / 'outer.zip') + '!/dir/a.odt'
+        assert record['snippets'][0]['match'] == 'exitosa'
+        assert list(app.records.paths(FAILED)) == [str(tmp_docs / 'outer.zip') + '!/broken.odt']
+        assert app.ooo_count == 1
+
+    def test_archives_ignored_at_depth_zero(self, tmp_docs, tmp_path, capsys):
+        make_odt(tmp_path / 'a.odt')
+        with zipfile.ZipFile(tmp_docs / 'outer.zip', 'w') as zf:
+            zf.write(tmp_path / 'a.odt', 'a.odt')
+        app = _make_app(['exitosa'], path=str(tmp_docs), max_depth=0)
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.match_count == 0
+
+    def test_several_roots_merged(self, tmp_path, capsys):
+        for name in ('one', 'two'):
+            (tmp_path / name).mkdir()
+            make_odt(tmp_path / name / 'a.odt')
+            make_docx(tmp_path / name / 'b.docx')
+        roots = [str(tmp_path / 'one'), str(tmp_path / 'two')]
+        app = _make_app(['migración', 'auditoría'], path=roots, workers=3, per_mount_workers=1)
+        app.recursive_search(None, None, roots)
+        assert sorted(capsys.readouterr().out.split()) == sorted(
+            str(tmp_path / name / doc) for name in ('one', 'two') for doc in ('a.odt', 'b.docx')
+        )
+        assert app.ooo_count == 4
+
+    def test_overlapping_roots_searched_once(self, tmp_docs, capsys):
+        (tmp_docs / 'sub').mkdir()
+        make_odt(tmp_docs / 'sub' / 'a.odt')
+        make_odt(tmp_docs / 'b.odt')
+        roots = [str(tmp_docs / 'sub'), str(tmp_docs), str(tmp_docs) + os.sep]
+        app = _make_app(['migración'], path=roots)
+        app.recursive_search(None, None, roots)
+        assert app.match_count == 2
+        assert app.ooo_count == 2
+
     def test_cancellation(self, tmp_docs, capsys):
-        _make_odt(tmp_docs / 'a.odt')
+        make_odt(tmp_docs / 'a.odt')
         app = _make_app(['migración'], path=str(tmp_docs))
         app.cancellable.cancel()
         app.recursive_search(None, None, str(tmp_docs))
         assert app.match_count == 0
 
 
+# ── superseding and refining searches ───────────────────────────────
+
+
+class TestLiveSearch:
+    def test_narrowed_query_checks_previous_hits_only(self, tmp_docs, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        make_docx(tmp_docs / 'b.docx')
+        app = _make_app(['migración', 'auditoría'], path=str(tmp_docs))
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.match_count == 2
+
+        checked = []
+        process_file = app.process_file
+        app.process_file = lambda filename: checked.append(filename) or process_file(filename)
+        app.options['mode'] = 'and'
+        app.options['content'] = ['auditoría', 'informe']
+        app.match_count = 0
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.match_count == 1
+        assert sorted(os.path.basename(f) for f in checked) == ['a.odt', 'b.docx']
+
+        checked.clear()
+        app.options['content'] = ['auditoría', 'informe de']
+        app.recursive_search(None, None, str(tmp_docs))
+        assert [os.path.basename(f) for f in checked] == ['b.docx']
+
+    def test_wider_query_rescans(self, tmp_docs):
+        make_odt(tmp_docs / 'a.odt')
+        make_docx(tmp_docs / 'b.docx')
+        app = _make_app(['auditoría'], path=str(tmp_docs))
+        app.recursive_search(None, None, str(tmp_docs))
+        app.options['content'] = ['auditoría', 'migración']
+        app.match_count = 0
+        app.recursive_search(None, None, str(tmp_docs))
+        assert app.match_count == 2
+
+    def test_superseded_search_does_not_run(self, tmp_docs):
+        make_odt(tmp_docs / 'a.odt')
+        app = _make_app([], path=str(tmp_docs))
+        app.generation = 2
+        app.process_file = lambda filename: pytest.fail('superseded search ran')
+        app.recursive_search(None, None, str(tmp_docs), generation=1)
+        assert app.ooo_count == 0
+
+    def test_stale_rows_are_dropped(self):
+        app = _make_app([])
+        app.matches = []
+        app.run_generation = 1
+        app.add_line_to_results('old.odt')
+        app.generation = app.run_generation = 2
+        app.add_line_to_results('new.odt')
+        assert app.matches == [['new.odt']]
+
+
+# ── query server client ─────────────────────────────────────────────
+
+
+class TestRemoteSearch:
+    def test_search_through_server(self, tmp_docs, tmp_path, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        make_docx(tmp_docs / 'b.docx')
+        socket_path = str(tmp_path / 'odfinder.sock')
+        server = QueryServer(workers=2)
+        thread = threading.Thread(target=server.serve, args=(socket_path,), daemon=True)
+        thread.start()
+        assert server.ready.wait(5)
+
+        try:
+            app = _make_app(['auditoría'], path=str(tmp_docs), connect=socket_path)
+            app.recursive_search(None, None, str(tmp_docs))
+        finally:
+            server.shutdown()
+            thread.join(5)
+
+        captured = capsys.readouterr()
+        assert 'b.docx' in captured.out
+        assert app.match_count == 1
+        assert app.ooo_count == 2
+
+    def test_server_not_running(self, tmp_docs, tmp_path, capsys):
+        app = _make_app(['x'], path=str(tmp_docs), connect=str(tmp_path / 'missing.sock'))
+        app.recursive_search(None, None, str(tmp_docs))
+        assert 'cannot connect' in capsys.readouterr().out
+        assert app.match_count == 0
+
+    def test_search_through_shards(self, tmp_docs, tmp_path, capsys):
+        make_odt(tmp_docs / 'a.odt')
+        make_docx(tmp_docs / 'b.docx')
+        index = str(tmp_path / 'shard.db')
+        build_shard(index, [str(tmp_docs)])
+        socket_path = str(tmp_path / 'shard.sock')
+        shard_server = ShardServer(index)
+        thread = threading.Thread(target=shard_server.serve, args=(socket_path,), daemon=True)
+        thread.start()
+        assert shard_server.ready.wait(5)
+
+        missing = str(tmp_path / 'missing.sock')
+        try:
+            app = _make_app(['auditoría'], path='/nonexistent', shard_server=[socket_path, missing], top=5)
+            app.recursive_search(None, None, '/nonexistent')
+        finally:
+            shard_server.shutdown()
+            thread.join(5)
+
+        captured = capsys.readouterr()
+        assert captured.out.splitlines()[-1] == str(tmp_docs / 'b.docx')
+        assert f'partial results, shard {missing} left out' in captured.out
+        assert app.ooo_count == 2
+
+
 # ── parse_args() ────────────────────────────────────────────────────
 
 
@@ -269,12 +622,20 @@ class TestParseArgs:
         args = parse_args()
         assert args['mode'] == 'or'
         assert args['content'] == []
-        assert args['path'] == os.getenv('HOME')
+        assert args['path'] == [os.getenv('HOME')]
+        assert args['per_mount_workers'] == 2
+        assert args['max_depth'] == 3
+        assert args['order'] == 'walk'
+        assert args['stats'] is False
+        assert args['cache_size'] == 64
+        assert args['live_search'] is True
+        assert args['format'] == 'text'
+        assert args['snippets'] is None
 
     def test_custom_args(self, monkeypatch):
         monkeypatch.setattr('sys.argv', ['odfinder', '-p', '/tmp', '-m', 'and', 'word1', 'word2'])
         args = parse_args()
-        assert args['path'] == '/tmp'
+        assert args['path'] == ['/tmp']
         assert args['mode'] == 'and'
         assert args['content'] == ['word1', 'word2']
 
@@ -284,6 +645,23 @@ class TestParseArgs:
         assert args['mode'] == 'phrase'
         assert args['content'] == ['hello', 'world']
 
+    def test_order_and_stats(self, monkeypatch):
+        monkeypatch.setattr('sys.argv', ['odfinder', '--order', 'mtime-desc', '--stats', 'word'])
+        args = parse_args()
+        assert args['order'] == 'mtime-desc'
+        assert args['stats'] is True
+
+    def test_server_options(self, monkeypatch):
+        monkeypatch.setattr('sys.argv', ['odfinder', '--serve', '/tmp/odfinder.sock', '--workers', '8'])
+        args = parse_args()
+        assert args['serve'] == '/tmp/odfinder.sock'
+        assert args['workers'] == 8
+        assert args['connect'] is None
+
+    def test_deadline(self, monkeypatch):
+        monkeypatch.setattr('sys.argv', ['odfinder', '--deadline', '2.5', 'word'])
+        assert parse_args()['deadline'] == 2.5
+
     def test_invalid_mode_exits(self, monkeypatch):
         monkeypatch.setattr('sys.argv', ['odfinder', '-m', 'invalid'])
         with pytest.raises(SystemExit):
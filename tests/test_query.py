@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from odfinder.query import Query, compile_query
+
+
+class TestQuery:
+    def test_or_mode(self):
+        query = Query('or', 'hello missing')
+        assert query.match('hello world') is True
+        assert Query('or', 'missing').match('hello world') is False
+
+    def test_and_mode(self):
+        assert Query('and', 'hello world').match('hello world') is True
+        assert Query('and', 'hello missing').match('hello world') is False
+
+    def test_phrase_mode(self):
+        assert Query('phrase', 'hello world').match('say hello world') is True
+        assert Query('phrase', 'world hello').match('say hello world') is False
+
+    def test_terms_are_lowercased(self):
+        assert Query('and', 'HELLO World').terms == ['hello', 'world']
+
+    def test_empty_query_matches(self):
+        assert Query('or', '').match('anything') is True
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            Query('xor', 'hello')
+
+    def test_search_spans(self):
+        assert Query('and', 'world hello').search('hello world') == [(6, 11), (0, 5)]
+        assert Query('or', 'missing world hello').search('hello world') == [(6, 11)]
+        assert Query('and', 'hello missing').search('hello world') is None
+
+    def test_count(self):
+        assert Query('or', 'ab Cd').count(b'ab ab cd abab') == [4, 1]
+        assert Query('or', '').count(b'anything') == [0]
+
+
+class TestBytesMatch:
+    def test_ascii(self):
+        assert Query('and', 'Hello world').match(b'say hello world') is True
+        assert Query('or', 'missing').match(b'say hello world') is False
+
+    def test_non_ascii_case_variants(self):
+        # bytes.lower() leaves non-ASCII letters alone
+        text = 'MIGRACIÓN ÉXITO'.encode().lower()
+        assert Query('phrase', 'migración éxito').match(text) is True
+        assert Query('or', 'Migración').match(text) is True
+
+    def test_character_with_longer_lowercase_matches_itself(self):
+        text = 'Viaje a İstanbul'.encode().lower()
+        assert Query('or', 'İstanbul').match(text) is True
+        assert Query('or', 'İSTANBUL').match(text) is True
+        assert Query('or', 'istanbul').match(text) is False  # as with str.lower()
+
+    def test_kelvin_sign_lowercases_to_k(self):
+        assert Query('or', 'k').match('\u212a'.encode()) is True
+
+    def test_memoryview(self):
+        assert Query('or', 'olé').match(memoryview('olé'.encode())) is True
+
+    def test_invalid_utf8(self):
+        assert Query('or', 'olé').match(b'caf\xe9 ol\xc3\xa9') is True
+
+    def test_same_result_as_str(self):
+        text = 'Ñandú ΣΟΦΊΑ straße İstanbul'
+        for term in ('ñandú', 'σοφία', 'ΣΟΦΊΑ', 'strasse', 'straße', 'istanbul', 'İstanbul', 'İSTANBUL', 'andú s'):
+            query = Query('phrase', term)
+            assert query.match(text.encode().lower()) is query.match(text.lower()), term
+
+    def test_fold(self):
+        query = Query('phrase', 'MIGRACION éxito', fold=True)
+        assert query.terms == ['migracion exito']
+        assert query.match(b'la migracion exito') is True
+        assert query.match('la migracion exito') is True
+        assert Query('or', 'migración').match(b'la migracion') is False
+
+
+class TestCompileQuery:
+    def test_cached(self):
+        assert compile_query('or', 'cached') is compile_query('or', 'cached')
+
+
+class TestNarrows:
+    @pytest.mark.parametrize(
+        'new, old, expected',
+        [
+            (('and', 'informe anual'), ('and', 'informe'), True),
+            (('and', 'informes'), ('and', 'informe'), True),
+            (('and', 'informe'), ('and', 'informe anual'), False),
+            (('and', 'informe anual'), ('or', 'anual memoria'), True),
+            (('and', 'informe'), ('or', 'anual memoria'), False),
+            (('or', 'informe'), ('or', 'informe anual'), True),
+            (('or', 'informe memoria'), ('or', 'informe anual'), False),
+            (('or', 'informe anual'), ('and', 'informe'), False),
+            (('or', 'informe informes'), ('and', 'informe'), True),
+            (('phrase', 'informe anual 2025'), ('phrase', 'informe anual'), True),
+            (('phrase', 'informe anual'), ('and', 'anual informe'), True),
+            (('and', 'informe author:garcía'), ('and', 'informe'), True),
+            (('and', 'informe'), ('and', 'informe author:garcía'), False),
+            (('and', 'informe'), ('or', ''), True),
+        ],
+    )
+    def test_narrows(self, new, old, expected):
+        assert Query(*new).narrows(Query(*old)) is expected
+
+    def test_fold_must_agree(self):
+        assert Query('and', 'informe', fold=True).narrows(Query('and', 'informe')) is False
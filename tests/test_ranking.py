@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+from odfinder.ranking import RECENCY_HALF_LIFE, Candidate, Ranker
+
+NOW = 10 * RECENCY_HALF_LIFE
+
+
+def _candidate(path, frequencies, length=1000, title=False, mtime=NOW):
+    return Candidate(path, frequencies, length, title, mtime)
+
+
+def _ranker(k=3, terms=1, documents=100):
+    ranker = Ranker(k, terms, now=NOW)
+    for _ in range(documents):
+        ranker.observe()
+    return ranker
+
+
+class TestScore:
+    def test_more_occurrences_score_higher(self):
+        ranker = _ranker()
+        assert ranker.score(_candidate('a', [5])) > ranker.score(_candidate('b', [1]))
+
+    def test_term_frequency_saturates(self):
+        ranker = _ranker()
+        gain_low = ranker.score(_candidate('a', [2])) - ranker.score(_candidate('a', [1]))
+        gain_high = ranker.score(_candidate('a', [21])) - ranker.score(_candidate('a', [20]))
+        assert gain_high < gain_low / 10
+
+    def test_longer_documents_score_lower(self):
+        ranker = _ranker()
+        ranker.add(_candidate('average', [1]))
+        assert ranker.score(_candidate('a', [3], length=500)) > ranker.score(_candidate('b', [3], length=5000))
+
+    def test_rare_terms_weigh_more(self):
+        ranker = _ranker(terms=2)
+        for i in range(20):
+            ranker.add(_candidate(f'common{i}', [1, 0]))
+        assert ranker.score(_candidate('a', [0, 1])) > ranker.score(_candidate('b', [1, 0]))
+
+    def test_title_and_recency_boosts(self):
+        ranker = _ranker()
+        assert ranker.score(_candidate('a', [1], title=True)) > ranker.score(_candidate('b', [1]))
+        old = _candidate('old', [1], mtime=NOW - 2 * RECENCY_HALF_LIFE)
+        assert ranker.score(_candidate('new', [1])) > ranker.score(old)
+
+
+class TestRanker:
+    def test_keeps_best_k(self):
+        ranker = _ranker(k=2)
+        for path, frequency in (('a', 1), ('b', 4), ('c', 2), ('d', 3)):
+            ranker.add(_candidate(path, [frequency]))
+        assert len(ranker) == 2
+        assert [path for path, _ in ranker.ranking()] == ['b', 'd']
+
+    def test_stable_for_counts_scans_without_changes(self):
+        ranker = _ranker(k=1, documents=0)
+        ranker.observe()
+        assert ranker.add(_candidate('a', [3])) is True
+        assert ranker.stable_for == 0
+        ranker.observe()
+        assert ranker.add(_candidate('b', [1])) is False
+        assert ranker.stable_for == 1
+
+    def test_top_k_rescored_only_when_estimates_grow(self):
+        ranker = _ranker(k=10, documents=0)
+        scored = []
+        score = ranker.score
+        ranker.score = lambda candidate: scored.append(candidate) or score(candidate)
+        for i in range(2000):
+            ranker.observe()
+            ranker.add(_candidate(str(i), [1 + i % 7], length=500 + i % 300))
+        assert len(scored) < 2000 * 2
+
+        ranking = ranker.ranking()
+        assert [round(s, 9) for _, s in ranking] == sorted((round(s, 9) for _, s in ranking), reverse=True)
+        assert {path for path, _ in ranking} <= {str(i) for i in range(2000) if i % 7 == 6}
+
+    def test_settled_needs_newest_first_scan(self):
+        ranker = _ranker(k=1)
+        ranker.add(_candidate('a', [50], title=True))
+        assert ranker.settled() is False
+
+    def test_settled_once_later_documents_cannot_win(self):
+        ranker = _ranker(k=1)
+        ranker.add(_candidate('a', [50], title=True))
+        ranker.observe(mtime=NOW)
+        assert ranker.settled() is False
+        ranker.observe(mtime=NOW - 20 * RECENCY_HALF_LIFE)
+        # nearly saturated and recent: old documents cannot catch up
+        assert ranker.settled() is True
+
+        ranker = _ranker(k=1)
+        ranker.add(_candidate('a', [1], title=True, mtime=NOW))
+        ranker.observe(mtime=NOW - 20 * RECENCY_HALF_LIFE)
+        assert ranker.settled() is False
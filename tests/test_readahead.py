@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+
+from odfinder.readahead import Prefetcher, locality_key, physical_offset, prefetch
+
+
+def _make_files(directory, names):
+    paths = []
+    for name in names:
+        path = directory / name
+        path.write_bytes(name.encode() * 100)
+        paths.append(str(path))
+    return paths
+
+
+class TestLocality:
+    def test_physical_offset_is_int_or_none(self, tmp_path):
+        path = _make_files(tmp_path, ['a.odt'])[0]
+        offset = physical_offset(path)
+        assert offset is None or isinstance(offset, int)
+
+    def test_physical_offset_missing_file(self, tmp_path):
+        assert physical_offset(str(tmp_path / 'missing.odt')) is None
+
+    def test_locality_key_falls_back_to_inode(self, tmp_path, monkeypatch):
+        path = _make_files(tmp_path, ['a.odt'])[0]
+        monkeypatch.setattr('odfinder.readahead.physical_offset', lambda p: None)
+        dev, kind, ino = locality_key(path)
+        assert kind == 1
+        assert ino > 0
+
+    def test_prefetch_missing_file_is_silent(self, tmp_path):
+        prefetch(str(tmp_path / 'missing.odt'))
+
+
+class TestPrefetcher:
+    def test_yields_every_path(self, tmp_path):
+        paths = _make_files(tmp_path, [f'{i}.odt' for i in range(10)] + ['notes.txt'])
+        result = list(Prefetcher(batch=3, workers=2).iter(paths))
+        assert sorted(result) == sorted(paths)
+
+    def test_keeps_order_without_reorder(self, tmp_path):
+        paths = _make_files(tmp_path, [f'{i}.odt' for i in range(10)])
+        assert list(Prefetcher(batch=4).iter(paths, reorder=False)) == paths
+
+    def test_reorder_follows_locality_inside_batch(self, tmp_path, monkeypatch):
+        paths = _make_files(tmp_path, ['c.odt', 'a.odt', 'b.odt', 'notes.txt'])
+        monkeypatch.setattr('odfinder.readahead.locality_key', lambda p: p)
+        result = list(Prefetcher(batch=4).iter(paths))
+        assert result == [paths[3], paths[1], paths[2], paths[0]]
+
+    def test_empty_input(self):
+        assert list(Prefetcher().iter([])) == []
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from odfinder.records import FAILED, MATCHED, SKIPPED, UNKNOWN, Record, RecordStore
+
+
+@pytest.fixture()
+def store():
+    store = RecordStore()
+    store.add('/docs/a.odt', 100, 10)
+    store.add('/docs/b.docx', status=FAILED)
+    store.add('/docs/sub/c.ods', 300, 30)
+    store.add('/docs/notes.txt', status=SKIPPED)
+    return store
+
+
+class TestRecordStore:
+    def test_records(self, store):
+        assert len(store) == 4
+        assert store[0] == Record('/docs/a.odt', 100, 10, 'odt', MATCHED)
+        assert store[1] == Record('/docs/b.docx', UNKNOWN, UNKNOWN, 'docx', FAILED)
+        assert store[-1].format == ''
+        with pytest.raises(IndexError):
+            store[4]
+
+    def test_directories_interned(self, store):
+        store.add('/docs/d.odt')
+        assert store._directories == ['/docs', '/docs/sub']
+
+    def test_paths_by_status(self, store):
+        assert list(store.paths(MATCHED)) == ['/docs/a.odt', '/docs/sub/c.ods']
+        assert list(store.paths()) == [record.path for record in store]
+        assert store.count(FAILED) == 1
+        assert list(store.paths(SKIPPED)) == ['/docs/notes.txt']
+
+    def test_relative_and_undecodable_paths(self):
+        store = RecordStore()
+        name = os.fsdecode(b'caf\xe9.odt')
+        store.add(name)
+        store.add('ñandú.odt')
+        assert list(store.paths()) == [name, 'ñandú.odt']
+
+    def test_append_to_model(self, store):
+        rows = []
+        store.append_to(rows)
+        assert rows == [['/docs/a.odt'], ['/docs/sub/c.ods']]
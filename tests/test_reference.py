@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+import random
+import zipfile
+
+import pytest
+
+from odfinder.documents import BudgetExceeded
+from odfinder.query import Query
+from odfinder.reference import compare, documents, fold, reference_match, reference_result, reference_text
+from tests.samples import CONTENT_XML, META_XML, make_odt, make_random_tree, random_query
+
+
+class TestReference:
+    def test_text(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        assert reference_text(str(tmp_path / 'a.odt')) == (
+            'migración exitosa a gtk4 con búsquedas avanzadas documento de prueba'
+        )
+
+    def test_not_a_document(self, tmp_path):
+        (tmp_path / 'a.odt').write_text('text')
+        assert reference_text(str(tmp_path / 'a.odt')) is None
+        assert reference_result(str(tmp_path / 'a.odt'), 'or', 'text') is False
+
+    def test_unreadable(self, tmp_path):
+        with zipfile.ZipFile(str(tmp_path / 'a.odt'), 'w') as zf:
+            zf.writestr('content.xml', CONTENT_XML)
+        assert reference_result(str(tmp_path / 'a.odt'), 'or', 'migración') is None
+
+    def test_modes(self):
+        assert reference_match('informe de auditoría', 'or', 'nada Auditoría')
+        assert not reference_match('informe de auditoría', 'and', 'nada auditoría')
+        assert reference_match('informe de auditoría', 'phrase', 'de audit')
+        assert not reference_match('informe de auditoría', 'phrase', 'informe auditoría')
+
+    def test_lower_as_str(self):
+        assert reference_match('viaje a İstanbul'.lower(), 'or', 'İstanbul')
+        assert not reference_match('viaje a İstanbul'.lower(), 'or', 'istanbul')
+
+    def test_fold(self):
+        assert fold('Ｃafé STRAẞE ﬁ') == 'cafe strasse fi'
+        assert reference_match('migración', 'or', 'MIGRACION', fold_accents=True)
+        assert not reference_match('migración', 'or', 'migracion')
+
+    def test_documents_inside_archives(self, tmp_path):
+        make_odt(tmp_path / 'a.odt')
+        with zipfile.ZipFile(str(tmp_path / 'b.zip'), 'w') as zf:
+            zf.write(str(tmp_path / 'a.odt'), 'dir/c.odt')
+            zf.writestr('notes.txt', 'text')
+        assert list(documents(str(tmp_path))) == [str(tmp_path / 'a.odt'), str(tmp_path / 'b.zip') + '!/dir/c.odt']
+        assert list(documents(str(tmp_path), nested=False)) == [str(tmp_path / 'a.odt')]
+
+
+class TestEngines:
+    @pytest.mark.parametrize(
+        'content, query',
+        [
+            # words cut by tags, comments and member boundaries
+            ('<p>migra<span>ción</span></p>', 'migración'),
+            ('<p>au<!-- nota -->ditoría</p>', 'auditoría'),
+            ('<p>AT&amp;T &lt;b&gt;</p>', 'at&amp;t &lt;b'),
+            (b'<p>caf\xe9 ol\xc3\xa9</p>', 'olé'),
+            ('<p>ÁRBOL</p>', 'árbol'),
+            ('<p>Viaje a İstanbul</p>', 'İSTANBUL'),
+        ],
+    )
+    def test_agree_on_edge_cases(self, tmp_path, content, query):
+        make_odt(tmp_path / 'a.odt', content_xml=content, meta_xml=META_XML)
+        for fold_accents in (False, True):
+            for mode in ('or', 'and', 'phrase'):
+                assert compare(str(tmp_path), Query(mode, query, fold_accents)) == []
+
+    def test_crash_is_a_mismatch(self, tmp_path, monkeypatch):
+        make_odt(tmp_path / 'a.odt')
+        monkeypatch.setattr('odfinder.reference.extract_text', lambda path, query: 1 / 0)
+        mismatches = compare(str(tmp_path), Query('or', 'migración'), engines=['extract'])
+        assert mismatches == [('extract', str(tmp_path / 'a.odt'), True, "ZeroDivisionError('division by zero')")]
+
+    def test_documents_over_budget_left_out(self, tmp_path, monkeypatch):
+        make_odt(tmp_path / 'a.odt')
+
+        def over_budget(path, query):
+            raise BudgetExceeded('size', 1)
+
+        monkeypatch.setattr('odfinder.reference.extract_text', over_budget)
+        assert compare(str(tmp_path), Query('or', 'migración'), engines=['extract']) == []
+
+    @pytest.mark.parametrize('seed', range(12))
+    def test_random_trees(self, tmp_path, monkeypatch, seed):
+        rng = random.Random(seed)
+        if seed % 2:
+            # members read a few bytes at a time, across every boundary
+            monkeypatch.setattr('odfinder.documents.CHUNK_SIZE', rng.randint(1, 16))
+        words = make_random_tree(tmp_path, rng, files=12)
+        for _ in range(4):
+            mode, text = random_query(rng, words)
+            query = Query(mode, text, rng.random() < 0.5)
+            assert compare(str(tmp_path), query) == [], (seed, mode, text, query.fold)
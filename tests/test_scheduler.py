@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+
+import pytest
+
+from odfinder.scheduler import (
+    ORDERS,
+    Coverage,
+    ScanProgress,
+    iter_files,
+    merge_roots,
+    scan_documents,
+    unique_roots,
+    walk_files,
+)
+
+
+@pytest.fixture()
+def tree(tmp_path):
+    """Documents with known sizes and modification times."""
+    (tmp_path / 'sub').mkdir()
+    files = {
+        'old.odt': (300, 1000),
+        'sub/new.docx': (100, 3000),
+        'mid.ods': (200, 2000),
+        'notes.txt': (10, 4000),
+    }
+    for name, (size, mtime) in files.items():
+        path = tmp_path / name
+        path.write_bytes(b'x' * size)
+        os.utime(path, (mtime, mtime))
+    return tmp_path
+
+
+def _names(paths, root):
+    return [os.path.relpath(p, root) for p in paths]
+
+
+class TestScanDocuments:
+    def test_only_supported_documents(self, tree):
+        names = sorted(_names((e.path for e in scan_documents(str(tree))), tree))
+        assert names == ['mid.ods', 'old.odt', os.path.join('sub', 'new.docx')]
+
+    def test_missing_directory_yields_nothing(self, tmp_path):
+        assert list(scan_documents(str(tmp_path / 'missing'))) == []
+
+
+class TestIterFiles:
+    def test_walk_yields_every_file(self, tree):
+        assert len(list(iter_files(str(tree), 'walk'))) == 4
+
+    def test_mtime_desc(self, tree):
+        names = _names(iter_files(str(tree), 'mtime-desc'), tree)
+        assert names == [os.path.join('sub', 'new.docx'), 'mid.ods', 'old.odt']
+
+    def test_size_asc(self, tree):
+        names = _names(iter_files(str(tree), 'size-asc'), tree)
+        assert names == [os.path.join('sub', 'new.docx'), 'mid.ods', 'old.odt']
+
+    def test_path(self, tree):
+        names = _names(iter_files(str(tree), 'path'), tree)
+        assert names == ['mid.ods', 'old.odt', os.path.join('sub', 'new.docx')]
+
+    def test_small_window_still_yields_everything(self, tree):
+        for order in ORDERS:
+            assert len(list(iter_files(str(tree), order, window=1))) >= 3
+
+    def test_unbounded_window_is_exact(self, tree):
+        names = _names(iter_files(str(tree), 'mtime-desc', window=None), tree)
+        assert names == [os.path.join('sub', 'new.docx'), 'mid.ods', 'old.odt']
+
+    def test_stop_ends_the_walk(self, tree):
+        for order in ORDERS:
+            progress = ScanProgress(str(tree))
+            assert list(iter_files(str(tree), order, window=None, progress=progress, stop=lambda: True)) == []
+            assert progress.visited == 0
+
+
+class TestRoots:
+    def test_unique_roots_by_inode(self, tree, tmp_path):
+        os.symlink(tree / 'sub', tmp_path / 'link')
+        paths = [str(tree), str(tree / 'sub'), str(tmp_path / 'link'), str(tree / 'missing'), str(tree) + os.sep]
+        assert unique_roots(paths) == [str(tree), str(tree / 'sub')]
+
+    def test_visited_directories_shared(self, tree):
+        visited = set()
+        inner = list(iter_files(str(tree / 'sub'), 'path', visited=visited))
+        outer = list(iter_files(str(tree), 'path', visited=visited))
+        assert _names(inner + outer, tree) == [os.path.join('sub', 'new.docx'), 'mid.ods', 'old.odt']
+
+    def test_merge_roots_yields_every_file_once(self, tree):
+        results = list(merge_roots([str(tree / 'sub'), str(tree)], os.path.getsize, workers=2))
+        assert sorted(_names((path for path, _ in results), tree)) == [
+            'mid.ods',
+            'notes.txt',
+            'old.odt',
+            os.path.join('sub', 'new.docx'),
+        ]
+        assert dict(results)[str(tree / 'mid.ods')] == 200
+
+    def test_slow_walk_holds_up_no_other_root(self, tree, monkeypatch):
+        release = threading.Event()
+
+        def slow_walk(root, *args, **kwargs):
+            if root == str(tree / 'sub'):
+                release.wait(5)
+            yield from iter_files(root, *args, **kwargs)
+
+        monkeypatch.setattr('odfinder.scheduler.iter_files', slow_walk)
+        results = merge_roots([str(tree / 'sub'), str(tree)], os.path.getsize, workers=2)
+        first, _ = next(results)
+        release.set()
+        assert os.path.dirname(first) == str(tree)
+        assert len({first} | {path for path, _ in results}) == 4
+
+    def test_per_mount_limit(self, tree):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def process(path):
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.01)
+            with lock:
+                running[0] -= 1
+
+        # every file of the tree is on one filesystem
+        list(merge_roots([str(tree)], process, workers=4, per_mount=1))
+        assert running[1] == 1
+
+
+class TestCoverage:
+    def test_finished_walk_counts_every_file(self, tree):
+        progress = ScanProgress(str(tree))
+        list(iter_files(str(tree), 'path', progress=progress))
+        assert progress.finished
+        assert progress.estimate() == 3
+
+    def test_estimate_from_visited_directories(self, tree):
+        progress = ScanProgress(str(tree))
+        files = walk_files(str(tree), progress=progress)
+        next(files)
+        # 3 files in the root, so about as many in 'sub'
+        assert progress.estimate() == 6
+        files.close()
+        assert not progress.finished
+
+    def test_roots_not_reached_are_skipped(self, tree):
+        coverage = Coverage()
+        coverage.missing_roots = [str(tree / 'missing')]
+        list(iter_files(str(tree), progress=coverage.walk(str(tree))))
+        coverage.walk(str(tree / 'sub'))
+        coverage.scanned = 2
+        coverage.complete = False
+        assert coverage.as_dict() == {
+            'scanned': 2,
+            'estimated_total': 4,
+            'skipped_roots': [str(tree / 'missing'), str(tree / 'sub')],
+            'complete': False,
+        }
+        assert coverage.summary()[0] == 'Searched 2 of about 4 files (50%)'
+
+    def test_merge_roots_follows_coverage(self, tree):
+        coverage = Coverage()
+        list(merge_roots([str(tree / 'sub'), str(tree)], os.path.getsize, workers=2, coverage=coverage))
+        assert [progress.finished for progress in coverage.progress] == [True, True]
+        assert coverage.skipped_roots == []
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+import errno
+import os
+import socket
+import stat
+import threading
+
+import pytest
+
+from odfinder.governor import Governor
+from odfinder.server import FairScheduler, QueryServer, SearchJob, listen, query
+from tests.samples import make_docx, make_odt
+
+
+@pytest.fixture()
+def tree(tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    make_odt(docs / 'a.odt')
+    make_odt(docs / 'b.odt')
+    make_docx(docs / 'c.docx')
+    (docs / 'notes.txt').write_text('migración')
+    return docs
+
+
+@pytest.fixture()
+def query_server():
+    server = QueryServer(workers=2)
+    yield server
+    server.scheduler.close()
+
+
+def _search(server, **request):
+    messages = []
+    summary = server.search(request, messages.append)
+    return messages, summary
+
+
+class TestQueryServer:
+    def test_matches(self, query_server, tree):
+        messages, summary = _search(query_server, path=str(tree), mode='or', content='migración')
+        matches = sorted(os.path.basename(m['match']) for m in messages if 'match' in m)
+        assert matches == ['a.odt', 'b.odt']
+        assert summary == {'done': True, 'files': 3, 'matches': 2}
+        assert messages[-1] == summary
+
+    def test_deadline_reports_coverage(self, query_server, tree):
+        _, summary = _search(query_server, path=str(tree), content='migración', deadline=60)
+        assert summary['complete'] is True
+        assert summary['coverage']['scanned'] == 4
+
+        _, summary = _search(query_server, path=str(tree), content='migración', deadline=0)
+        assert summary['complete'] is False
+        assert summary['matches'] == 0
+        assert summary['coverage']['scanned'] == 0
+
+    def test_workers_share_the_governor(self, tree):
+        governor = Governor(max_read_rate=1000, max_rss=1)
+        server = QueryServer(workers=2, governor=governor)
+        try:
+            _, summary = _search(server, path=str(tree), content='migración')
+        finally:
+            server.scheduler.close()
+        assert summary['matches'] == 2
+        assert governor.bytes_read == sum(os.path.getsize(tree / name) for name in ('a.odt', 'b.odt', 'c.docx'))
+        assert governor.memory_pressure == 3
+
+    def test_index_is_reused(self, query_server, tree, monkeypatch):
+        _search(query_server, path=str(tree), content='migración')
+        assert len(query_server.cache) == 3
+
+        def fail(filename):
+            raise AssertionError('document extracted again')
+
+        monkeypatch.setattr('odfinder.cache.extract_text', fail)
+        _, summary = _search(query_server, path=str(tree), mode='and', content='auditoría')
+        assert summary['matches'] == 1
+
+    def test_modified_document_is_extracted_again(self, query_server, tree):
+        _search(query_server, path=str(tree), content='migración')
+        make_odt(tree / 'a.odt', content_xml='<text:p>Nuevo contenido</text:p>')
+        os.utime(tree / 'a.odt', (1, 1))
+        _, summary = _search(query_server, path=str(tree), content='migración')
+        assert summary['matches'] == 1
+
+    def test_warnings(self, query_server, tree):
+        (tree / 'broken.docx').write_bytes(b'PK\x05\x06' + b'\0' * 18)
+        messages, _ = _search(query_server, path=str(tree), content='x')
+        assert any('broken.docx' in m.get('warning', '') for m in messages)
+
+    def test_budget(self, tree):
+        server = QueryServer(workers=1, max_members=1)
+        try:
+            messages, summary = _search(server, path=str(tree), content='migración')
+        finally:
+            server.scheduler.close()
+        assert summary['matches'] == 0
+        assert sum('more than 1 members' in m.get('warning', '') for m in messages) == 3
+
+    def test_unknown_mode(self, query_server, tree):
+        messages, summary = _search(query_server, path=str(tree), mode='xor', content='x')
+        assert 'error' in summary
+
+    def test_missing_path(self, query_server, tmp_path):
+        _, summary = _search(query_server, path=str(tmp_path / 'missing'), content='x')
+        assert 'error' in summary
+
+    def test_concurrent_searches(self, query_server, tree):
+        results = []
+
+        def run():
+            results.append(_search(query_server, path=str(tree), content='migración')[1])
+
+        threads = [threading.Thread(target=run) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert [r['matches'] for r in results] == [2] * 5
+
+
+class TestFairScheduler:
+    def test_round_robin_between_jobs(self):
+        order = []
+        release = threading.Event()
+
+        def process(job, item):
+            release.wait()
+            order.append(item)
+            job.file_done(True, False)
+
+        scheduler = FairScheduler(process, workers=1)
+        first = SearchJob(None, [f'a{i}' for i in range(4)], lambda m: None)
+        second = SearchJob(None, ['b0', 'b1'], lambda m: None)
+        scheduler.submit(first)
+        scheduler.submit(second)
+        release.set()
+        first.done.wait(5)
+        second.done.wait(5)
+        scheduler.close()
+        assert order.index('b0') < order.index('a2')
+        assert order.index('b1') < order.index('a3')
+
+    def test_empty_job_completes(self):
+        scheduler = FairScheduler(lambda job, item: None, workers=1)
+        job = SearchJob(None, [], lambda m: None)
+        scheduler.submit(job)
+        assert job.done.wait(5)
+        scheduler.close()
+
+
+class TestSocket:
+    def test_client_round_trip(self, query_server, tree, tmp_path):
+        socket_path = str(tmp_path / 'odfinder.sock')
+        thread = threading.Thread(target=query_server.serve, args=(socket_path,), daemon=True)
+        thread.start()
+        assert query_server.ready.wait(5)
+
+        try:
+            messages = list(query(socket_path, {'path': str(tree), 'content': 'migración'}))
+            assert sum('match' in m for m in messages) == 2
+            assert messages[-1]['done'] is True
+        finally:
+            query_server.shutdown()
+            thread.join(5)
+        assert not os.path.exists(socket_path)
+
+    def test_socket_private(self, query_server, tmp_path):
+        socket_path = str(tmp_path / 'odfinder.sock')
+        server = listen(socket_path, query_server)
+        try:
+            assert stat.S_IMODE(os.stat(socket_path).st_mode) == 0o600
+        finally:
+            server.server_close()
+
+    def test_stale_socket_replaced(self, query_server, tmp_path):
+        socket_path = str(tmp_path / 'odfinder.sock')
+        stale = socket.socket(socket.AF_UNIX)
+        stale.bind(socket_path)
+        stale.close()
+
+        server = listen(socket_path, query_server)
+        server.server_close()
+
+    def test_live_socket_kept(self, query_server, tree, tmp_path):
+        socket_path = str(tmp_path / 'odfinder.sock')
+        thread = threading.Thread(target=query_server.serve, args=(socket_path,), daemon=True)
+        thread.start()
+        assert query_server.ready.wait(5)
+
+        try:
+            with pytest.raises(OSError) as raised:
+                listen(socket_path, query_server)
+            assert raised.value.errno == errno.EADDRINUSE
+            # still answered by the first server
+            messages = list(query(socket_path, {'path': str(tree), 'content': 'migración'}))
+            assert messages[-1]['done'] is True
+        finally:
+            query_server.shutdown()
+            thread.join(5)
+
+    def test_other_file_kept(self, query_server, tmp_path):
+        path = tmp_path / 'notes.txt'
+        path.write_text('keep me')
+        with pytest.raises(FileExistsError):
+            listen(str(path), query_server)
+        assert path.read_text() == 'keep me'
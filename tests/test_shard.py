@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import zipfile
+import zlib
+
+import pytest
+
+from odfinder.ranking import Ranker
+from odfinder.shard import Gather, ShardServer, build_shard, shard_of
+from tests.samples import CONTENT_XML, make_docx, make_odt
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture()
+def tree(tmp_path):
+    docs = tmp_path / 'docs'
+    docs.mkdir()
+    for i in range(6):
+        make_odt(docs / f'plain{i}.odt')
+    make_odt(docs / 'often.odt', CONTENT_XML.replace('exitosa', 'exitosa exitosa exitosa'))
+    make_docx(docs / 'report.docx')
+    (docs / 'notes.txt').write_text('exitosa')
+    return docs
+
+
+def _build(tmp_path, tree, shards):
+    indexes = []
+    for shard in range(shards):
+        index = str(tmp_path / f'shard{shard}.db')
+        build_shard(index, [str(tree)], shard, shards)
+        indexes.append(index)
+    return indexes
+
+
+def _paths(index):
+    with sqlite3.connect(index) as db:
+        return {os.path.basename(os.fsdecode(path)) for (path,) in db.execute('SELECT path FROM documents')}
+
+
+@pytest.fixture()
+def shard_processes(tmp_path, tree):
+    """One shard server process over TCP and one over a Unix socket."""
+    processes = []
+    addresses = []
+    for index, listen in zip(_build(tmp_path, tree, 2), ('127.0.0.1:0', str(tmp_path / 'shard1.sock'))):
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'odfinder.shard', 'serve', '--index', index, '--listen', listen],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        processes.append(process)
+        addresses.append(process.stdout.readline().split()[-1])
+    yield addresses
+    for process in processes:
+        process.terminate()
+        process.wait()
+        process.stdout.close()
+
+
+class TestBuild:
+    def test_shard_of_is_crc32(self):
+        assert shard_of('/docs/a.odt', 4) == zlib.crc32(b'/docs/a.odt') % 4
+
+    def test_hash_partition_keeps_every_document_once(self, tmp_path, tree):
+        first, second = (_paths(index) for index in _build(tmp_path, tree, 2))
+        assert not first & second
+        assert first | second == {f'plain{i}.odt' for i in range(6)} | {'often.odt', 'report.docx'}
+
+    def test_rebuild_reads_only_changes(self, tmp_path, tree):
+        index = str(tmp_path / 'shard.db')
+        assert build_shard(index, [str(tree)])['added'] == 8
+        os.unlink(tree / 'plain0.odt')
+        make_odt(tree / 'plain1.odt', CONTENT_XML.replace('exitosa', 'fallida'))
+        os.utime(tree / 'plain1.odt', ns=(0, 0))
+        counts = build_shard(index, [str(tree), str(tree)])
+        assert (counts['updated'], counts['removed'], counts['unchanged'], counts['added']) == (1, 1, 6, 0)
+
+    def test_documents_no_longer_extracted_are_dropped(self, tmp_path, tree):
+        index = str(tmp_path / 'shard.db')
+        build_shard(index, [str(tree)])
+        (tree / 'plain0.odt').write_bytes(b'not a zip any more')
+        with zipfile.ZipFile(tree / 'plain1.odt', 'w') as zf:
+            zf.writestr('content.xml', CONTENT_XML)
+        counts = build_shard(index, [str(tree)], warn=lambda message: None)
+        assert (counts['failed'], counts['removed'], counts['unchanged']) == (1, 2, 6)
+        assert not {'plain0.odt', 'plain1.odt'} & _paths(index)
+
+    def test_broken_documents_warn(self, tmp_path, tree):
+        with zipfile.ZipFile(tree / 'broken.odt', 'w') as zf:
+            zf.writestr('content.xml', CONTENT_XML)
+        warnings = []
+        counts = build_shard(str(tmp_path / 'shard.db'), [str(tree)], warn=warnings.append)
+        assert (counts['added'], counts['failed']) == (8, 1)
+        assert 'broken.odt' in warnings[0]
+
+
+class TestShardServer:
+    def test_matches(self, tmp_path, tree):
+        (index,) = _build(tmp_path, tree, 1)
+        messages = []
+        summary = ShardServer(index).search({'mode': 'or', 'content': 'auditoría'}, messages.append)
+        assert [os.path.basename(m['match']) for m in messages if 'match' in m] == ['report.docx']
+        assert summary == {'done': True, 'files': 8, 'matches': 1}
+
+    def test_ignore_accents(self, tmp_path, tree):
+        (index,) = _build(tmp_path, tree, 1)
+        summary = ShardServer(index).search({'content': 'AUDITORIA', 'ignore_accents': True}, lambda message: None)
+        assert summary['matches'] == 1
+
+    def test_top_sends_statistics_and_candidates(self, tmp_path, tree):
+        (index,) = _build(tmp_path, tree, 1)
+        messages = []
+        ShardServer(index).search({'content': 'exitosa', 'top': 2}, messages.append)
+        statistics = next(m['statistics'] for m in messages if 'statistics' in m)
+        assert (statistics['documents'], statistics['matched']) == (8, 7)
+        matches = [m for m in messages if 'match' in m]
+        assert len(matches) == 2
+        assert os.path.basename(matches[0]['match']) == 'often.odt'
+        assert matches[0]['candidate']['frequencies'] == [3]
+
+    def test_missing_index(self, tmp_path):
+        summary = ShardServer(str(tmp_path / 'missing.db')).search({'content': 'x'}, lambda message: None)
+        assert 'error' in summary
+        assert not os.path.exists(tmp_path / 'missing.db')
+
+    @pytest.mark.parametrize('listen, warned', [('127.0.0.1:0', False), ('0.0.0.0:0', True)])
+    def test_warns_when_reachable_from_other_hosts(self, tmp_path, tree, listen, warned):
+        (index,) = _build(tmp_path, tree, 1)
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'odfinder.shard', 'serve', '--index', index, '--listen', listen],
+            cwd=ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        try:
+            assert process.stdout.readline().startswith('Listening on ')
+        finally:
+            process.terminate()
+            _, err = process.communicate()
+        assert ('reachable from other hosts' in err) is warned
+
+
+class TestGather:
+    def test_merges_shard_processes(self, shard_processes, tree):
+        gather = Gather(shard_processes, {'mode': 'or', 'content': 'exitosa'}, timeout=10)
+        assert sorted(os.path.basename(path) for path in gather) == sorted(
+            [f'plain{i}.odt' for i in range(6)] + ['often.odt']
+        )
+        assert (gather.files, gather.matches, gather.partial) == (8, 7, False)
+
+    def test_top_k_across_shards(self, shard_processes):
+        ranker = Ranker(1, 1)
+        gather = Gather(shard_processes, {'content': 'exitosa'}, timeout=10, ranker=ranker)
+        assert [os.path.basename(path) for path in gather] == ['often.odt']
+        assert [os.path.basename(path) for path, _ in ranker.ranking()] == ['often.odt']
+        assert ranker.documents == 8
+
+    def test_unreachable_shard_gives_partial_results(self, shard_processes, tmp_path):
+        dead = str(tmp_path / 'dead.sock')
+        gather = Gather(shard_processes + [dead], {'content': 'auditoría'}, timeout=10)
+        assert [os.path.basename(path) for path in gather] == ['report.docx']
+        assert gather.partial
+        assert list(gather.missing) == [dead]
+
+    def test_silent_shard_times_out(self, tmp_path):
+        address = str(tmp_path / 'silent.sock')
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as silent:
+            silent.bind(address)
+            silent.listen(1)
+            gather = Gather([address], {'content': 'x'}, timeout=0.2)
+            assert list(gather) == []
+        assert 'no answer' in gather.missing[address]
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+from odfinder.documents import Document, fold_document
+from odfinder.query import Query
+from odfinder.snippets import Snippet, make_snippets, snippets_markup, snippets_text
+
+DOCUMENT = Document(
+    ('Primera parte del informe. La MIGRACIÓN a GTK4 fue un éxito. Última   parte.').encode(),
+    b'<dc:title>Informe anual</dc:title>',
+)
+
+
+class TestMakeSnippets:
+    def test_context_around_hit(self):
+        snippets = make_snippets(Query('or', 'gtk4'), DOCUMENT, context=8)
+        assert snippets == [Snippet('…ACIÓN a ', 'GTK4', ' fue un …')]
+
+    def test_recorded_spans_are_used(self):
+        query = Query('and', 'gtk4 éxito')
+        spans = query.search_document(DOCUMENT)
+        assert [snippet.match for snippet in make_snippets(query, DOCUMENT, spans)] == ['GTK4', 'éxito']
+
+    def test_capped(self):
+        query = Query('and', 'primera gtk4 éxito')
+        assert len(make_snippets(query, DOCUMENT, limit=2)) == 2
+
+    def test_more_hits_than_terms(self):
+        snippets = make_snippets(Query('or', 'parte'), DOCUMENT, context=8)
+        assert snippets == [Snippet('Primera ', 'parte', ' del inf…'), Snippet('… Última ', 'parte', '. Inform…')]
+        assert len(make_snippets(Query('or', 'parte'), DOCUMENT, limit=1)) == 1
+
+    def test_start_and_end_of_text(self):
+        snippets = make_snippets(Query('or', 'primera'), DOCUMENT, context=8)
+        assert snippets == [Snippet('', 'Primera', ' parte d…')]
+
+    def test_whitespace_collapsed(self):
+        snippets = make_snippets(Query('or', 'última'), DOCUMENT, context=20)
+        assert snippets[0].after == ' parte. Informe anua…'
+
+    def test_hit_in_metadata(self):
+        snippets = make_snippets(Query('or', 'anual'), DOCUMENT, context=8)
+        assert snippets == [Snippet('…Informe ', 'anual', '')]
+
+    def test_folded_hits_map_to_original_text(self):
+        query = Query('phrase', 'migracion a gtk4', fold=True)
+        snippets = make_snippets(query, fold_document(DOCUMENT), context=4)
+        assert snippets == [Snippet('… La ', 'MIGRACIÓN a GTK4', ' fue…')]
+
+    def test_overlapping_hits_shown_once(self):
+        query = Query('and', 'migración migr')
+        assert len(make_snippets(query, DOCUMENT)) == 1
+
+    def test_empty_query_has_no_snippets(self):
+        assert make_snippets(Query('or', ''), DOCUMENT) == []
+
+
+class TestFormatting:
+    def test_text(self):
+        snippets = [Snippet('a ', 'b', ' c')]
+        assert snippets_text(snippets) == ['a b c']
+        assert snippets_text(snippets, bold=True) == ['a \x1b[1mb\x1b[0m c']
+
+    def test_markup_is_escaped(self):
+        snippets = [Snippet('<a> ', 'b&c', ''), Snippet('', 'd', '')]
+        assert snippets_markup(snippets) == '&lt;a&gt; <b>b&amp;c</b>\n<b>d</b>'
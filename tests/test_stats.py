@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+from odfinder.stats import SearchStats
+
+
+class TestSearchStats:
+    def test_no_results(self):
+        stats = SearchStats()
+        stats.stop()
+        assert stats.first_result is None
+        assert stats.milestone_result is None
+        assert 'Time to first result: -' in stats.summary(0)
+
+    def test_first_and_milestone_result(self):
+        stats = SearchStats(milestone=3)
+        for _ in range(3):
+            stats.add_result()
+        stats.stop()
+        assert stats.first_result is not None
+        assert stats.milestone_result >= stats.first_result
+        assert stats.results == 3
+
+    def test_summary_lines(self):
+        stats = SearchStats(milestone=5)
+        stats.add_result()
+        stats.stop()
+        lines = stats.summary(7)
+        assert lines[0] == 'Files scanned: 7'
+        assert lines[1] == 'Matches: 1'
+        assert lines[4].startswith('Time to 5 results: ')
+
+    def test_start_resets(self):
+        stats = SearchStats()
+        stats.add_result()
+        stats.start()
+        assert stats.results == 0
+        assert stats.first_result is None
@@ -69,6 +69,11 @@ class TestRemoveXmlMarkup:
     def test_attributes_in_tags(self):
         assert remove_xml_markup('<p class="intro">content</p>') == 'content'
 
+    def test_bytes(self):
+        xml = '<!-- nota --><p>migración</p><p>x</p>'.encode()
+        assert remove_xml_markup(xml) == 'migraciónx'.encode()
+        assert remove_xml_markup(xml, replace_with_space=True) == ' migración  x '.encode()
+
     def test_real_odt_fragment(self):
         xml = (
             '<office:body><office:text>'